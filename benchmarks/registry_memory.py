@@ -0,0 +1,65 @@
+"""Memory and tools/list cost of large command catalogs.
+
+Generates a config file with --commands commands, each with --prompts
+prompts drawn from a small shared set (as generated catalogs usually
+repeat them), loads it and reports the memory held by the configuration
+and its tool registry per thousand commands, plus the size and time of a
+paginated and a full tools/list response.
+
+    python benchmarks/registry_memory.py [--commands 5000] [--prompts 10] [--page-size 100]
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+import mcp.types as types
+
+from mcp2serial.server import Config
+
+
+def write_catalog(path: str, commands: int, prompts: int, page_size: int) -> None:
+    lines = [f"tools_page_size: {page_size}\nserial:\n  port: LOOP_BACK\ncommands:\n"]
+    for i in range(commands):
+        prompt_list = ", ".join(f'"Prompt {j} for command group {i % 50}"' for j in range(prompts))
+        lines.append(f'  cmd{i}:\n    command: "CMD{i} {{value}}"\n    need_parse: true\n'
+                     f'    prompts: [{prompt_list}]\n')
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("".join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure tool registry memory per thousand commands")
+    parser.add_argument("--commands", type=int, default=5000)
+    parser.add_argument("--prompts", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalog_config.yaml")
+        write_catalog(path, args.commands, args.prompts, args.page_size)
+        Config.from_file(path)  # 预先生成编译缓存，只测量配置对象本身
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        config = Config.from_file(path)
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+    def serialize(page_size):
+        start = time.perf_counter()
+        tools, next_cursor = config.registry.page(None, page_size)
+        payload = types.ListToolsResult(tools=tools, nextCursor=next_cursor).model_dump_json(exclude_none=True)
+        return time.perf_counter() - start, len(payload)
+
+    print(f"{args.commands} commands, {args.prompts} prompts each: "
+          f"{used / args.commands * 1000 / 1024:.0f} KiB per 1000 commands")
+    for label, page_size in (("one page", args.page_size), ("full list", 0)):
+        elapsed, size = serialize(page_size)
+        print(f"tools/list {label}: {size / 1024:.0f} KiB in {elapsed * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""End-to-end benchmark of tool calls through handle_call_tool.
+
+Runs the same workload against a LOOP_BACK device and against the
+mcp2serial.simulator device on a pseudo-terminal, optionally answering after a fixed delay, and
+prints one JSON object per setup: latency percentiles, calls and bytes per
+second, and memory allocated per call (from a separate tracemalloc pass, so
+tracing does not distort the timings). Compare the output of two releases
+to catch regressions.
+
+    python benchmarks/request_path.py [--calls 2000] [--concurrency 1] [--delay-ms 0 --delay-ms 5]
+                                      [--setup loopback --setup pty] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from mcp2serial import server
+from mcp2serial.server import Config, Command, DevicePool
+
+
+def make_config(port: str) -> Config:
+    commands = {
+        "set_pwm": Command(command="PWM {frequency}", need_parse=False, prompts=[]),
+        "get_pico_info": Command(command="PICO_INFO", need_parse=True, prompts=[]),
+    }
+    return Config(port=port, read_timeout=1.0, response_start_string="OK", commands=commands)
+
+
+def workload(calls: int):
+    """Alternating write and query calls, like a typical control session."""
+    for i in range(calls):
+        if i % 2:
+            yield "get_pico_info", {}
+        else:
+            yield "set_pwm", {"frequency": str(i % 101)}
+
+
+async def run_calls(calls: int, concurrency: int) -> list:
+    """Latency in seconds of every call."""
+    latencies = []
+    queue = list(workload(calls))
+    queue.reverse()
+
+    async def worker():
+        while queue:
+            name, arguments = queue.pop()
+            start = time.perf_counter()
+            result = await server.handle_call_tool(name, arguments)
+            latencies.append(time.perf_counter() - start)
+            if server.is_error_result(result):
+                raise RuntimeError(f"{name} failed: {result[0].text}")
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latencies
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def bench(setup: str, delay_ms: float, calls: int, concurrency: int) -> dict:
+    device = None
+    if setup == "pty":
+        # 模拟器依赖 POSIX 伪终端，只在需要时导入
+        from mcp2serial.simulator import DeviceSimulator
+        device = DeviceSimulator(latency=delay_ms / 1000)
+    if device:
+        device.start()
+    server.config = make_config(device.port if device else "LOOP_BACK")
+    server.device_pool = DevicePool()
+    try:
+        asyncio.run(run_calls(min(calls, 50), concurrency))  # 预热：建立连接、编译模板
+        connection = server.device_pool.connections["default"]
+        bytes_before = connection.capture.total_bytes
+
+        start = time.perf_counter()
+        latencies = asyncio.run(run_calls(calls, concurrency))
+        elapsed = time.perf_counter() - start
+        transferred = connection.capture.total_bytes - bytes_before
+
+        tracemalloc.start()
+        before_current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        asyncio.run(run_calls(calls, concurrency))
+        after_current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        server.device_pool.close()
+        if device:
+            device.stop()
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 4)
+    return {
+        "setup": setup,
+        "delay_ms": delay_ms if device else 0,
+        "calls": calls,
+        "concurrency": concurrency,
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 0.50)),
+            "p90": ms(percentile(latencies, 0.90)),
+            "p99": ms(percentile(latencies, 0.99)),
+            "max": ms(latencies[-1]),
+            "mean": ms(statistics.fmean(latencies)),
+        },
+        "calls_per_second": round(calls / elapsed, 1),
+        "bytes_per_second": round(transferred / elapsed, 1),
+        "alloc": {
+            "peak_kib": round((peak - before_current) / 1024, 1),
+            "retained_bytes_per_call": round((after_current - before_current) / calls, 1),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tool calls end to end")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=1, help="Tool calls in flight at once")
+    parser.add_argument("--setup", action="append", choices=["loopback", "pty"],
+                        help="Setups to run (default: both)")
+    parser.add_argument("--delay-ms", action="append", type=float,
+                        help="Response delay of the pty device (default: 0 and 5)")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    setups = args.setup or ["loopback", "pty"]
+    delays = args.delay_ms or [0.0, 5.0]
+    results = []
+    for setup in setups:
+        for delay_ms in (delays if setup == "pty" else [0.0]):
+            result = bench(setup, delay_ms, args.calls, args.concurrency)
+            print(json.dumps(result))
+            results.append(result)
+
+    if args.output:
+        report = {
+            "version": server.VERSION,
+            "python": platform.python_version(),
+            "platform": sys.platform,
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Cold start time of the server module.
+
+Each sample imports mcp2serial.server in a fresh interpreter, the way an MCP
+client spawns the server for a session, and reports the wall time of the
+import alone (interpreter startup excluded).
+
+    python benchmarks/startup.py [--runs 20]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import mcp2serial.server; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def measure(runs: int) -> list:
+    """Import times in seconds, one per fresh interpreter."""
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], check=True,
+                                capture_output=True, text=True).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure mcp2serial cold start time")
+    parser.add_argument("--runs", type=int, default=20, help="Number of fresh interpreters to start")
+    args = parser.parse_args()
+    samples = sorted(measure(args.runs))
+    print(f"import mcp2serial.server over {args.runs} runs: "
+          f"min {samples[0] * 1000:.1f} ms, median {statistics.median(samples) * 1000:.1f} ms, "
+          f"max {samples[-1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -32,6 +32,7 @@ import uos
 import machine
 import gc
 import sys
+import micropython
 
 # 初始化 LED 引脚
 led = Pin("LED", Pin.OUT)
@@ -60,6 +61,65 @@ def toggle_led(timer):
 timer = Timer()
 timer.init(period=10, mode=Timer.PERIODIC, callback=toggle_led)
 
+# ---------------- 波特率 ----------------
+# 通过 UART 连接主机时（例如 GP0/GP1 接 USB 转串口）设置 UART 编号，命令和 REPL 都经过该 UART。
+# 使用 USB 虚拟串口时保持 None：波特率对 USB 无效，BAUD 命令只应答不切换
+UART_ID = None
+BAUD_RATES = (9600, 19200, 38400, 57600, 115200, 230400, 460800, 921600)
+# 切换后在该时间内没有收到新速率下的有效命令，恢复原速率（主机验证失败时依赖此回退）
+BAUD_CONFIRM_MS = 2000
+
+baud_rate = 115200
+baud_fallback = None  # 等待确认期间为切换前的速率
+baud_timer = Timer()
+uart = None
+if UART_ID is not None:
+    uart = machine.UART(UART_ID, baudrate=baud_rate)
+    uos.dupterm(uart)
+
+def set_baud(rate):
+    global baud_rate
+    if uart is not None:
+        # 应答发送完毕后再切换，否则主机收到的应答不完整
+        while not uart.txdone():
+            pass
+        uart.init(baudrate=rate)
+    baud_rate = rate
+
+def revert_baud(timer):
+    global baud_fallback
+    if baud_fallback is not None:
+        set_baud(baud_fallback)
+        baud_fallback = None
+
+def confirm_baud():
+    global baud_fallback
+    if baud_fallback is not None:
+        baud_fallback = None
+        baud_timer.deinit()
+
+# "BAUD" 应答当前速率；"BAUD <rate>" 先应答 OK <rate>，再切换到该速率
+def handle_baud(command):
+    global baud_fallback
+    parts = command.split()
+    if len(parts) == 1:
+        confirm_baud()
+        print(f"OK {baud_rate}")
+        return
+    try:
+        rate = int(parts[1])
+    except ValueError:
+        rate = None
+    if rate not in BAUD_RATES:
+        print("NG")
+        return
+    print(f"OK {rate}")
+    if uart is not None and rate != baud_rate:
+        if baud_fallback is None:
+            baud_fallback = baud_rate
+        set_baud(rate)
+        baud_timer.init(period=BAUD_CONFIRM_MS, mode=Timer.ONE_SHOT, callback=revert_baud)
+
 print("Program started. Send commands in format 'PWM <duty>' or 'PICO_INFO'.")
 
 # 定义一个函数来获取开发板信息
@@ -86,31 +146,156 @@ def get_pico_info():
     )
     return info
 
+# 执行一条文本命令，返回应答文本；未知命令返回 None
+def handle_command(command):
+    global duty
+
+    if command.startswith("PWM"):
+        try:
+            duty_value = float(command.split(" ")[1])
+
+            # 检查占空比是否在 0 到 100 范围内
+            if 0 <= duty_value <= 100:
+                duty = int(duty_value)  # 更新占空比例值
+                return "OK"
+            return "NG"
+        except (IndexError, ValueError):
+            return "NG"
+
+    elif command.strip() == "PICO_INFO":
+        info = get_pico_info()
+        return f"OK {info}"
+
+    return None
+
+# ---------------- 二进制帧模式 ----------------
+# 帧格式：COBS(负载 + CRC16) + 0x00
+# 请求负载：[序号][命令文本]；应答负载：[序号][状态][应答文本]
+STATUS_OK = 0x00
+STATUS_NG = 0x01
+STATUS_NAK = 0x02
+
+def crc16(data):
+    # CRC-16/CCITT-FALSE，与主机端 binascii.crc_hqx(data, 0xFFFF) 一致
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
+
+def cobs_encode(data):
+    out = bytearray()
+    block = bytearray()
+    for byte in data:
+        if byte == 0:
+            out.append(len(block) + 1)
+            out += block
+            block = bytearray()
+        else:
+            block.append(byte)
+            if len(block) == 254:
+                out.append(255)
+                out += block
+                block = bytearray()
+    out.append(len(block) + 1)
+    out += block
+    return out
+
+def cobs_decode(data):
+    # 编码错误时返回 None
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        code = data[i]
+        if code == 0 or i + code > len(data):
+            return None
+        out += data[i + 1:i + code]
+        i += code
+        if code < 255 and i < len(data):
+            out.append(0)
+    return out
+
+def send_frame(payload):
+    crc = crc16(payload)
+    frame = cobs_encode(bytes(payload) + bytes([crc >> 8, crc & 0xFF]))
+    sys.stdout.buffer.write(bytes(frame) + b"\x00")
+
+def binary_loop():
+    # 二进制数据中可能出现 0x03，关闭 Ctrl-C 中断
+    micropython.kbd_intr(-1)
+    last_seq = None
+    last_payload = None
+    frame = bytearray()
+    while True:
+        byte = sys.stdin.buffer.read(1)
+        if not byte:
+            continue
+        if byte != b"\x00":
+            frame += byte
+            continue
+        raw = bytes(frame)
+        frame = bytearray()
+        if not raw.strip():
+            continue
+        if raw.strip() == b"BINARY":
+            # 主机重新连接时会再次发送切换命令
+            print("OK")
+            continue
+        if raw.strip().startswith(b"BAUD"):
+            # 波特率命令以文本行发送，在二进制模式下同样有效
+            handle_baud(raw.strip().decode())
+            continue
+
+        data = cobs_decode(raw)
+        if data is None or len(data) < 3 or crc16(data[:-2]) != (data[-2] << 8 | data[-1]):
+            send_frame(bytes([0xFF, STATUS_NAK]))  # 请求损坏，主机会重发
+            continue
+
+        seq = data[0]
+        if seq == last_seq:
+            # 重发的请求：只重发上次的应答，不重复执行命令
+            send_frame(last_payload)
+            continue
+
+        reply = handle_command(bytes(data[1:-2]).decode())
+        confirm_baud()
+        status = STATUS_OK if reply and reply.startswith("OK") else STATUS_NG
+        last_seq = seq
+        last_payload = bytes([seq, status]) + (reply or "NG").encode()
+        send_frame(last_payload)
+
 # 主循环接收用户输入命令
+# 命令可以带流水线标签 "#<序号> "，应答时原样带回该标签，主机据此匹配应答
 while True:
     try:
-        user_input = input()  # 从串口接收用户输入
+        user_input = input().lstrip("\x00")  # 从串口接收用户输入，忽略二进制帧分隔符
+
+        if user_input.strip() == "BINARY":
+            # 切换到二进制帧模式，直到重启
+            print("OK")
+            binary_loop()
 
-        if user_input.startswith("PWM"):
-            try:
-                duty_value = float(user_input.split(" ")[1])
+        if user_input.strip().split(" ", 1)[0] == "BAUD":
+            handle_baud(user_input.strip())
+            continue
 
-                # 检查占空比是否在 0 到 100 范围内
-                if 0 <= duty_value <= 100:
-                    duty = int(duty_value)  # 更新占空比例值
-                    print("OK")
-                else:
-                    print("NG")
-            except (IndexError, ValueError):
-                print("NG")
+        tag = ""
+        if user_input.startswith("#"):
+            tag, _, user_input = user_input.partition(" ")
+            tag += " "
 
-        elif user_input.strip() == "PICO_INFO":
-            info = get_pico_info()
-            print(f"OK {info}")
+        reply = handle_command(user_input)
+        if reply is not None:
+            confirm_baud()
+            print(f"{tag}{reply}")
+        elif tag:
+            # 带标签的未知命令必须应答，否则主机要等到超时
+            print(f"{tag}NG")
 
     except KeyboardInterrupt:
         print("\nProgram interrupted by user.")
         break
-
-
-
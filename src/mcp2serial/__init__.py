@@ -38,9 +38,12 @@ def main():
     parser.add_argument('--config', 
                        default="default",
                        help='Configuration name (without _config.yaml suffix)')
+    parser.add_argument('--log-level',
+                       default=None,
+                       help='Log level (DEBUG, INFO, WARNING, ERROR), overrides the config file')
     
     args = parser.parse_args()
-    asyncio.run(server.main(args.config))
+    asyncio.run(server.main(args.config, args.log_level))
 
 
 # Expose important items at package level
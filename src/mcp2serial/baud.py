@@ -0,0 +1,135 @@
+# ====================================================
+# Project: MCP2Serial
+# Description: A protocol conversion tool that enables 
+#              hardware devices to communicate with 
+#              large language models (LLM) through serial ports.
+# Repository: https://github.com/mcp2everything/mcp2serial.git
+# License: MIT License
+# Author: mcp2everything
+# Copyright (c) 2024 mcp2everything
+#
+# Permission is hereby granted, free of charge, to any person 
+# obtaining a copy of this software and associated documentation 
+# files (the "Software"), to deal in the Software without restriction, 
+# including without limitation the rights to use, copy, modify, merge, 
+# publish, distribute, sublicense, and/or sell copies of the Software, 
+# and to permit persons to whom the Software is furnished to do so, 
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be 
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. 
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, 
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS 
+# IN THE SOFTWARE.
+"""Baud-rate detection and negotiated rate switching.
+
+The reference firmware understands two control lines:
+
+    BAUD            -> OK <current rate>
+    BAUD <rate>     -> OK <rate>, then the UART switches to <rate>
+                       (NG if the rate is not supported)
+
+After a switch the firmware waits CONFIRM_TIMEOUT for a command it
+recognises at the new rate and otherwise returns to the previous rate, so
+a host whose verification round trip fails can simply go back.
+"""
+from typing import Any, Callable, Iterable, List, Optional
+import logging
+import time
+
+from .binary import FRAME_DELIMITER
+
+logger = logging.getLogger(__name__)
+
+BAUD_COMMAND = "BAUD"
+STANDARD_BAUD_RATES = (9600, 19200, 38400, 57600, 115200, 230400, 460800, 921600)
+# 收到切换应答后等待设备重新配置 UART 的时间（秒）
+SWITCH_SETTLE_DELAY = 0.05
+# 固件切换后等待确认的时间（秒），与 firmware/src/main.py 中的 BAUD_CONFIRM_MS 一致
+CONFIRM_TIMEOUT = 2.0
+
+Read = Callable[[], bytes]
+Write = Callable[[bytes], Any]
+
+
+def request(read: Read, write: Write, line: bytes, expected: bytes, timeout: float) -> Optional[bytes]:
+    """Send a control line and return the first reply line starting with expected or NG (None on timeout).
+
+    The line is framed like the BINARY switch, so it also reaches firmware
+    that is in binary mode, and preceded by a line break that ends any
+    garbage the device received at a wrong rate.
+    """
+    write(b"\r\n" + FRAME_DELIMITER + line + b"\r\n" + FRAME_DELIMITER)
+    buffer = b""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        buffer += read()
+        while b"\n" in buffer:
+            reply, buffer = buffer.split(b"\n", 1)
+            # 只保留最后一个帧分隔符之后的内容，丢弃错误波特率下的乱码或二进制帧
+            reply = reply.rsplit(FRAME_DELIMITER, 1)[-1].strip()
+            if reply != line and (reply.startswith(expected) or reply.startswith(b"NG")):
+                return reply
+    return None
+
+
+def detect(port: Any, rates: Iterable[int], read: Read, write: Write,
+           probe: bytes, expected: bytes, timeout: float) -> Optional[int]:
+    """Find the rate the device answers the probe at, trying rates in order.
+
+    Leaves the port at the detected rate, or at its original rate if none answered.
+    """
+    original = port.baudrate
+    for rate in rates:
+        port.baudrate = rate
+        port.reset_input_buffer()
+        if request(read, write, probe, expected, timeout) is not None:
+            logger.debug(f"Device answered at {rate} baud")
+            return rate
+    port.baudrate = original
+    return None
+
+
+def negotiate(port: Any, rate: int, read: Read, write: Write,
+              probe: bytes, expected: bytes, timeout: float) -> bool:
+    """Ask the device to switch to rate and verify the new rate with a probe round trip.
+
+    Returns False, with host and device back at the original rate, if the
+    device declines or the round trip at the new rate fails.
+    """
+    original = port.baudrate
+    if rate == original:
+        return True
+    reply = request(read, write, f"{BAUD_COMMAND} {rate}".encode(), b"OK", timeout)
+    if reply is None or not reply.startswith(b"OK"):
+        logger.info(f"Device declined to switch to {rate} baud: {reply!r}")
+        return False
+    time.sleep(SWITCH_SETTLE_DELAY)
+    switched_at = time.monotonic()
+    port.baudrate = rate
+    port.reset_input_buffer()
+    if request(read, write, probe, expected, timeout) is not None:
+        return True
+
+    # 设备在 CONFIRM_TIMEOUT 内没有收到新速率下的有效命令，会自行恢复原速率
+    logger.warning(f"No answer at {rate} baud, falling back to {original}")
+    port.baudrate = original
+    time.sleep(max(0.0, switched_at + CONFIRM_TIMEOUT + SWITCH_SETTLE_DELAY - time.monotonic()))
+    port.reset_input_buffer()
+    if request(read, write, probe, expected, timeout) is None:
+        logger.warning(f"Device did not answer at {original} baud after the fallback")
+    return False
+
+
+def candidates(*rates: Optional[int], extra: Iterable[int] = ()) -> List[int]:
+    """Distinct rates in order of preference, skipping None."""
+    result: List[int] = []
+    for rate in (*rates, *extra):
+        if rate and rate not in result:
+            result.append(rate)
+    return result
@@ -0,0 +1,170 @@
+# ====================================================
+# Project: MCP2Serial
+# Description: A protocol conversion tool that enables 
+#              hardware devices to communicate with 
+#              large language models (LLM) through serial ports.
+# Repository: https://github.com/mcp2everything/mcp2serial.git
+# License: MIT License
+# Author: mcp2everything
+# Copyright (c) 2024 mcp2everything
+#
+# Permission is hereby granted, free of charge, to any person 
+# obtaining a copy of this software and associated documentation 
+# files (the "Software"), to deal in the Software without restriction, 
+# including without limitation the rights to use, copy, modify, merge, 
+# publish, distribute, sublicense, and/or sell copies of the Software, 
+# and to permit persons to whom the Software is furnished to do so, 
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be 
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. 
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, 
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS 
+# IN THE SOFTWARE.
+"""Binary framed protocol: COBS-encoded frames with a CRC16 trailer.
+
+Each frame on the wire is COBS(payload + CRC16) followed by a 0x00 delimiter,
+so a receiver can always resynchronise at the next zero byte after line
+noise. The CRC is CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), big-endian.
+
+Request payload:  [seq][command bytes]
+Response payload: [seq][status][data]
+
+The device answers a corrupted request with STATUS_NAK and the host sends
+the request again with the same sequence number. A device that sees the
+same sequence number twice replays its previous response instead of
+executing the command again.
+"""
+from typing import Callable, List, Optional
+from dataclasses import dataclass, field
+import binascii
+import time
+
+STATUS_OK = 0x00
+STATUS_NG = 0x01
+STATUS_NAK = 0x02
+
+FRAME_DELIMITER = b"\x00"
+# 切换到二进制模式的文本命令，设备回复以 OK 开头的文本行
+BINARY_MODE_COMMAND = b"BINARY"
+
+
+class FrameError(ValueError):
+    """Raised for frames with invalid COBS encoding, length or CRC."""
+
+
+def crc16(data: bytes) -> int:
+    """CRC-16/CCITT-FALSE of data."""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def cobs_encode(data: bytes) -> bytes:
+    """Consistent Overhead Byte Stuffing; the result contains no zero bytes."""
+    out = bytearray()
+    for block in data.split(b"\x00"):
+        # 每段最多 254 个非零字节
+        while len(block) >= 254:
+            out.append(255)
+            out += block[:254]
+            block = block[254:]
+        out.append(len(block) + 1)
+        out += block
+    return bytes(out)
+
+
+def cobs_decode(data: bytes) -> bytes:
+    """Inverse of cobs_encode. Raises FrameError on malformed input."""
+    out = bytearray()
+    i = 0
+    length = len(data)
+    while i < length:
+        code = data[i]
+        if code == 0:
+            raise FrameError("zero byte inside COBS frame")
+        end = i + code
+        if end > length:
+            raise FrameError("truncated COBS block")
+        out += data[i + 1:end]
+        i = end
+        if code < 255 and i < length:
+            out.append(0)
+    return bytes(out)
+
+
+def encode_frame(payload: bytes) -> bytes:
+    """Wire bytes for one frame: COBS(payload + CRC16) + delimiter."""
+    return cobs_encode(payload + crc16(payload).to_bytes(2, "big")) + FRAME_DELIMITER
+
+
+def decode_frame(raw: bytes) -> bytes:
+    """Payload of one received frame (without delimiter). Raises FrameError."""
+    data = cobs_decode(raw)
+    if len(data) < 3:
+        raise FrameError("frame too short")
+    payload, received_crc = data[:-2], int.from_bytes(data[-2:], "big")
+    if crc16(payload) != received_crc:
+        raise FrameError("CRC mismatch")
+    return payload
+
+
+@dataclass
+class BinaryResult:
+    """Outcome of one binary transaction."""
+    status: Optional[int] = None  # None 表示超时或重试后仍失败
+    data: bytes = b""
+    attempts: int = 0
+    crc_errors: int = 0
+    frames: List[bytes] = field(default_factory=list)  # 收到的原始帧，用于错误信息
+
+
+def transact(read: Callable[[], bytes], write: Callable[[bytes], None], seq: int, body: bytes,
+             timeout: float, max_retries: int) -> BinaryResult:
+    """Send one request frame and wait for the matching response.
+
+    read() returns whatever bytes are available (possibly none after a short
+    wait); write() sends bytes. Each attempt waits up to timeout seconds. The
+    request is sent again when the response fails its CRC check or the device
+    answers with STATUS_NAK.
+    """
+    result = BinaryResult()
+    request = encode_frame(bytes([seq]) + body)
+    pending = b""
+    while result.attempts <= max_retries:
+        result.attempts += 1
+        write(request)
+        deadline = time.monotonic() + timeout
+        retransmit = False
+        while not retransmit and time.monotonic() < deadline:
+            pending += read()
+            while not retransmit:
+                end = pending.find(FRAME_DELIMITER)
+                if end < 0:
+                    break
+                raw, pending = pending[:end], pending[end + 1:]
+                if not raw:
+                    continue
+                result.frames.append(raw)
+                try:
+                    payload = decode_frame(raw)
+                except FrameError:
+                    result.crc_errors += 1
+                    retransmit = True
+                    break
+                if len(payload) < 2:
+                    continue
+                if payload[1] == STATUS_NAK:
+                    retransmit = True
+                    break
+                if payload[0] != seq:
+                    continue  # 之前请求的迟到应答
+                result.status = payload[1]
+                result.data = payload[2:]
+                return result
+        if not retransmit:
+            return result  # 超时，不再重发
+    return result
@@ -0,0 +1,125 @@
+# ====================================================
+# Project: MCP2Serial
+# Description: A protocol conversion tool that enables 
+#              hardware devices to communicate with 
+#              large language models (LLM) through serial ports.
+# Repository: https://github.com/mcp2everything/mcp2serial.git
+# License: MIT License
+# Author: mcp2everything
+# Copyright (c) 2024 mcp2everything
+#
+# Permission is hereby granted, free of charge, to any person 
+# obtaining a copy of this software and associated documentation 
+# files (the "Software"), to deal in the Software without restriction, 
+# including without limitation the rights to use, copy, modify, merge, 
+# publish, distribute, sublicense, and/or sell copies of the Software, 
+# and to permit persons to whom the Software is furnished to do so, 
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be 
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. 
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, 
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS 
+# IN THE SOFTWARE.
+from typing import List, Tuple
+from array import array
+from datetime import datetime
+import threading
+import time
+
+TX = 0
+RX = 1
+DIRECTION_NAMES = ("TX", "RX")
+
+
+class TrafficCapture:
+    """Fixed-size recorder of raw serial traffic for one port.
+
+    Bytes go into a preallocated bytearray ring; a second, preallocated ring
+    of (timestamp, direction, offset, length) records marks where each read
+    or write begins. Recording copies the data once and allocates nothing,
+    so it can stay enabled in production. Old traffic is overwritten.
+    """
+
+    def __init__(self, size: int = 65536, max_records: int = 4096):
+        self.size = size
+        self.max_records = max_records
+        self._buffer = bytearray(size)
+        self._times = array('d', bytes(8 * max_records))
+        self._directions = bytearray(max_records)
+        self._offsets = array('q', bytes(8 * max_records))  # 记录在总字节流中的起始位置
+        self._lengths = array('q', bytes(8 * max_records))
+        self._position = 0  # 已写入的总字节数
+        self._count = 0  # 已写入的总记录数
+        self._lock = threading.Lock()
+
+    def record(self, direction: int, data: bytes) -> None:
+        """Append bytes sent (TX) or received (RX)."""
+        length = len(data)
+        if not length or not self.size:
+            return
+        view = memoryview(data)
+        if length > self.size:
+            view = view[-self.size:]
+            length = self.size
+        with self._lock:
+            start = self._position % self.size
+            first = min(length, self.size - start)
+            self._buffer[start:start + first] = view[:first]
+            if first < length:
+                self._buffer[:length - first] = view[first:]
+            index = self._count % self.max_records
+            self._times[index] = time.time()
+            self._directions[index] = direction
+            self._offsets[index] = self._position
+            self._lengths[index] = length
+            self._position += length
+            self._count += 1
+
+    @property
+    def total_bytes(self) -> int:
+        """Bytes recorded since the capture was created, including overwritten ones."""
+        return self._position
+
+    def snapshot(self, max_bytes: int = 0) -> List[Tuple[float, int, bytes]]:
+        """Most recent records, oldest first, limited to about max_bytes of data (0 = all)."""
+        records = []
+        total = 0
+        with self._lock:
+            oldest_kept = self._position - self.size
+            for n in range(self._count - 1, max(self._count - self.max_records, 0) - 1, -1):
+                index = n % self.max_records
+                offset, length = self._offsets[index], self._lengths[index]
+                if offset < oldest_kept:
+                    break  # 数据已被覆盖
+                if max_bytes and total + length > max_bytes:
+                    # 只保留该记录的末尾部分
+                    keep = max_bytes - total
+                    if keep <= 0:
+                        break
+                    offset, length = offset + length - keep, keep
+                start = offset % self.size
+                end = start + length
+                if end <= self.size:
+                    data = bytes(self._buffer[start:end])
+                else:
+                    data = bytes(self._buffer[start:]) + bytes(self._buffer[:end - self.size])
+                records.append((self._times[index], self._directions[index], data))
+                total += length
+                if max_bytes and total >= max_bytes:
+                    break
+        records.reverse()
+        return records
+
+    def dump(self, max_bytes: int = 0) -> str:
+        """Recent traffic as text, one line per read or write."""
+        lines = []
+        for timestamp, direction, data in self.snapshot(max_bytes):
+            when = datetime.fromtimestamp(timestamp).isoformat(timespec='microseconds')
+            lines.append(f"{when} {DIRECTION_NAMES[direction]} {len(data):5d} {data!r}")
+        return "\n".join(lines)
@@ -0,0 +1,128 @@
+# ====================================================
+# Project: MCP2Serial
+# Description: A protocol conversion tool that enables 
+#              hardware devices to communicate with 
+#              large language models (LLM) through serial ports.
+# Repository: https://github.com/mcp2everything/mcp2serial.git
+# License: MIT License
+# Author: mcp2everything
+# Copyright (c) 2024 mcp2everything
+#
+# Permission is hereby granted, free of charge, to any person 
+# obtaining a copy of this software and associated documentation 
+# files (the "Software"), to deal in the Software without restriction, 
+# including without limitation the rights to use, copy, modify, merge, 
+# publish, distribute, sublicense, and/or sell copies of the Software, 
+# and to permit persons to whom the Software is furnished to do so, 
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be 
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. 
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, 
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS 
+# IN THE SOFTWARE.
+from typing import Any, Optional, Tuple
+import hashlib
+import logging
+import marshal
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+# 缓存格式随 Python 版本和 marshal 格式变化，版本不同时重新解析
+CACHE_VERSION = (1, sys.version_info[:2], marshal.version)
+
+# 文件系统时间戳精度可能很粗（FAT 为 2 秒），修改时间离缓存写入时间太近时不能只信 mtime
+RACY_MARGIN_NS = 2 * 10**9
+
+
+def cache_path(path: str) -> str:
+    """Compiled cache file stored next to a config file: config.yaml -> .config.yaml.cache"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.cache")
+
+
+def _parse(content: bytes) -> Any:
+    """Parse YAML with the C loader when PyYAML was built with libyaml."""
+    import yaml  # 只在缓存未命中时需要
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    return yaml.load(content, Loader=loader)
+
+
+def _read_cache(path: str, mtime_ns: int, size: int, digest: Optional[bytes] = None) -> Tuple[bool, Any]:
+    """Look up the compiled cache of path by content hash, or by mtime and size when no hash is given.
+
+    mtime and size alone only count when the file was last modified well
+    before the cache was written; an edit within the same timestamp tick
+    would otherwise leave the cache looking current.
+
+    Returns:
+        Whether the cache is current, and the cached data
+    """
+    try:
+        with open(cache_path(path), 'rb') as f:
+            written_ns = os.fstat(f.fileno()).st_mtime_ns
+            entry = marshal.load(f)
+        version, cached_mtime, cached_size, cached_digest, data = entry
+    except (OSError, EOFError, ValueError, TypeError):
+        return False, None
+    if version != CACHE_VERSION:
+        return False, None
+    if digest is not None:
+        return cached_digest == digest, data
+    if cached_mtime + RACY_MARGIN_NS >= written_ns:
+        return False, data
+    return cached_mtime == mtime_ns and cached_size == size, data
+
+
+def _write_cache(path: str, mtime_ns: int, size: int, digest: bytes, data: Any) -> None:
+    """Store parsed data in the compiled cache of path, replacing it atomically."""
+    target = cache_path(path)
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        payload = marshal.dumps((CACHE_VERSION, mtime_ns, size, digest, data))
+    except ValueError:
+        # 含有 marshal 不支持的类型（例如日期），不缓存
+        logger.debug("Config %s cannot be cached", path)
+        return
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, target)
+    except OSError as e:
+        logger.debug("Could not write config cache %s: %s", target, e)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def load_yaml(path: str) -> Any:
+    """Parsed content of a YAML config file, served from its compiled cache when current.
+
+    The cache entry is keyed by the file's mtime, size and SHA-256. When mtime
+    and size match and the file was modified well before the cache was
+    written, the file is not read at all. Otherwise the content hash decides,
+    so a touched but unchanged file still hits the cache and a same-size edit
+    within one timestamp tick is still noticed. The cache
+    is marshal-encoded and written next to the file; when that directory is
+    not writable the file is simply parsed every time.
+    """
+    stat = os.stat(path)
+    hit, data = _read_cache(path, stat.st_mtime_ns, stat.st_size)
+    if hit:
+        return data
+    with open(path, 'rb') as f:
+        content = f.read()
+    digest = hashlib.sha256(content).digest()
+    hit, data = _read_cache(path, stat.st_mtime_ns, stat.st_size, digest)
+    if not hit:
+        data = _parse(content)
+    _write_cache(path, stat.st_mtime_ns, stat.st_size, digest, data)
+    return data
@@ -0,0 +1,131 @@
+# ====================================================
+# Project: MCP2Serial
+# Description: A protocol conversion tool that enables 
+#              hardware devices to communicate with 
+#              large language models (LLM) through serial ports.
+# Repository: https://github.com/mcp2everything/mcp2serial.git
+# License: MIT License
+# Author: mcp2everything
+# Copyright (c) 2024 mcp2everything
+#
+# Permission is hereby granted, free of charge, to any person 
+# obtaining a copy of this software and associated documentation 
+# files (the "Software"), to deal in the Software without restriction, 
+# including without limitation the rights to use, copy, modify, merge, 
+# publish, distribute, sublicense, and/or sell copies of the Software, 
+# and to permit persons to whom the Software is furnished to do so, 
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be 
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. 
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, 
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS 
+# IN THE SOFTWARE.
+from typing import Any, Dict, Hashable, Optional
+from collections import deque
+
+# 平滑系数与 TCP 重传超时估计相同（RFC 6298）
+EWMA_ALPHA = 0.125
+DEVIATION_BETA = 0.25
+DEVIATION_FACTOR = 4.0
+# 截止时间至少为最近响应时间 p99 的倍数，给偶尔变慢的命令留出余量
+PERCENTILE_HEADROOM = 1.5
+RECENT_SAMPLES = 64
+# 样本数达到该值前使用上限，避免第一次调用就按偶然的快速应答收紧
+WARMUP_SAMPLES = 5
+MAX_BACKOFF = 64
+
+
+class LatencyStats:
+    """Response-time statistics of one command: EWMA, mean deviation and recent percentiles."""
+
+    __slots__ = ("ewma", "deviation", "samples", "timeouts", "backoff", "recent")
+
+    def __init__(self):
+        self.ewma = 0.0
+        self.deviation = 0.0
+        self.samples = 0
+        self.timeouts = 0
+        self.backoff = 1  # 超时后截止时间翻倍，收到应答后恢复
+        self.recent: deque = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds: float) -> None:
+        if self.samples == 0:
+            self.ewma = seconds
+            self.deviation = seconds / 2
+        else:
+            self.deviation += DEVIATION_BETA * (abs(seconds - self.ewma) - self.deviation)
+            self.ewma += EWMA_ALPHA * (seconds - self.ewma)
+        self.samples += 1
+        self.backoff = 1
+        self.recent.append(seconds)
+
+    def timed_out(self) -> None:
+        self.timeouts += 1
+        self.backoff = min(self.backoff * 2, MAX_BACKOFF)
+
+    def percentile(self, q: float) -> float:
+        """q-quantile of the recent samples (0 when there are none)."""
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def deadline(self, minimum: float, maximum: float) -> float:
+        """Read deadline derived from the statistics, clamped to [minimum, maximum]."""
+        if self.samples < WARMUP_SAMPLES:
+            return maximum
+        estimate = max(self.ewma + DEVIATION_FACTOR * self.deviation,
+                       self.percentile(0.99) * PERCENTILE_HEADROOM)
+        return min(max(estimate * self.backoff, minimum), maximum)
+
+
+class AdaptiveDeadlines:
+    """Per-command read deadlines learned from the device's observed response times.
+
+    Only replies that arrive on the first attempt count as samples; a command
+    that times out doubles its deadline until it gets an answer again.
+    """
+
+    def __init__(self, minimum: float, maximum: float):
+        self.minimum = minimum
+        self.maximum = maximum
+        self._stats: Dict[Hashable, LatencyStats] = {}
+
+    def deadline(self, key: Hashable, maximum: Optional[float] = None) -> float:
+        """Deadline for a command; maximum overrides the device-wide upper bound."""
+        upper = self.maximum if maximum is None else maximum
+        stats = self._stats.get(key)
+        if stats is None:
+            return upper
+        return stats.deadline(min(self.minimum, upper), upper)
+
+    def observe(self, key: Hashable, seconds: float) -> None:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = LatencyStats()
+        stats.observe(seconds)
+
+    def timed_out(self, key: Hashable) -> None:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = LatencyStats()
+        stats.timed_out()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            str(key): {
+                "samples": stats.samples,
+                "timeouts": stats.timeouts,
+                "ewma_ms": round(stats.ewma * 1000, 3),
+                "deviation_ms": round(stats.deviation * 1000, 3),
+                "p99_ms": round(stats.percentile(0.99) * 1000, 3),
+                "deadline_ms": round(self.deadline(key) * 1000, 3)
+            }
+            for key, stats in list(self._stats.items())
+        }
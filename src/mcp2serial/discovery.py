@@ -0,0 +1,242 @@
+# ====================================================
+# Project: MCP2Serial
+# Description: A protocol conversion tool that enables 
+#              hardware devices to communicate with 
+#              large language models (LLM) through serial ports.
+# Repository: https://github.com/mcp2everything/mcp2serial.git
+# License: MIT License
+# Author: mcp2everything
+# Copyright (c) 2024 mcp2everything
+#
+# Permission is hereby granted, free of charge, to any person 
+# obtaining a copy of this software and associated documentation 
+# files (the "Software"), to deal in the Software without restriction, 
+# including without limitation the rights to use, copy, modify, merge, 
+# publish, distribute, sublicense, and/or sell copies of the Software, 
+# and to permit persons to whom the Software is furnished to do so, 
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be 
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. 
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, 
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS 
+# IN THE SOFTWARE.
+from typing import Any, Callable, Dict, Iterable, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+import json
+import logging
+import os
+import threading
+import time
+
+import serial
+
+logger = logging.getLogger(__name__)
+
+# 设备名到串口的映射缓存，重启后无需再次探测
+PORT_MAP_PATH = os.path.expanduser("~/.mcp2serial/port_map.json")
+MAX_PROBE_WORKERS = 8
+PROBE_POLL_INTERVAL = 0.01
+
+
+@dataclass
+class PortMatch:
+    """How to recognise a device among the serial ports of the host."""
+    vid: Optional[int] = None
+    pid: Optional[int] = None
+    serial_number: Optional[str] = None
+    identify: Optional[str] = None  # 发送给候选串口的识别命令，例如 PICO_INFO
+    identify_response: Optional[str] = None  # 识别命令的应答需以此开头，默认使用 response_start_string
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PortMatch':
+        return cls(
+            vid=_parse_id(data.get('vid')),
+            pid=_parse_id(data.get('pid')),
+            serial_number=data.get('serial_number'),
+            identify=data.get('identify'),
+            identify_response=data.get('identify_response')
+        )
+
+    def matches_hardware(self, port: Any) -> bool:
+        """Whether a list_ports entry has the configured USB ids."""
+        return ((self.vid is None or port.vid == self.vid)
+                and (self.pid is None or port.pid == self.pid)
+                and (self.serial_number is None or port.serial_number == self.serial_number))
+
+    def key(self) -> Dict[str, Any]:
+        """Fields a cached port map entry must agree with."""
+        return {"vid": self.vid, "pid": self.pid, "serial_number": self.serial_number, "identify": self.identify}
+
+
+def _parse_id(value: Any) -> Optional[int]:
+    """USB ids may be written as ints or hex strings such as "2E8A" or "0x2E8A"."""
+    if value is None or isinstance(value, int):
+        return value
+    return int(str(value), 16)
+
+
+class PortMap:
+    """Device-to-port assignments persisted as JSON."""
+
+    def __init__(self, path: str = PORT_MAP_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, device_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._read().get(device_name)
+
+    def put(self, device_name: str, entry: Optional[Dict[str, Any]]) -> None:
+        """Store an entry, or remove it when entry is None."""
+        with self._lock:
+            data = self._read()
+            if entry is None:
+                if data.pop(device_name, None) is None:
+                    return
+            else:
+                data[device_name] = entry
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning(f"Could not save port map {self.path}: {e}")
+
+
+# 已被某个设备占用的串口，避免两个设备探测或打开同一个串口
+_claimed: Dict[str, str] = {}
+_claimed_lock = threading.Lock()
+
+
+def claim(port: str, device_name: str) -> bool:
+    """Reserve a port for a device. Returns False if another device holds it."""
+    with _claimed_lock:
+        owner = _claimed.setdefault(port, device_name)
+        return owner == device_name
+
+
+def release(device_name: str) -> None:
+    """Release every port held by a device."""
+    with _claimed_lock:
+        for port in [port for port, owner in _claimed.items() if owner == device_name]:
+            del _claimed[port]
+
+
+def probe(port: str, baud_rate: int, request: bytes, expected: bytes, timeout: float,
+          open_port: Callable[..., Any] = serial.Serial) -> bool:
+    """Send the identify command to a port and check that a line starting with expected comes back."""
+    try:
+        connection = open_port(port=port, baudrate=baud_rate, timeout=PROBE_POLL_INTERVAL, write_timeout=timeout)
+    except (serial.SerialException, OSError) as e:
+        logger.debug(f"Probe of {port} failed to open: {e}")
+        return False
+    try:
+        connection.reset_input_buffer()
+        connection.write(request)
+        connection.flush()
+        echo = request.strip()
+        buffer = b""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            buffer += connection.read(connection.in_waiting or 1)
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                line = line.strip()
+                if line != echo and line.startswith(expected):
+                    return True
+        return False
+    except (serial.SerialException, OSError) as e:
+        logger.debug(f"Probe of {port} failed: {e}")
+        return False
+    finally:
+        connection.close()
+
+
+def find_port(device_name: str, match: PortMatch, baud_rate: int, request: Optional[bytes], expected: bytes,
+              timeout: float, port_map: Optional[PortMap] = None,
+              candidates: Optional[Iterable[Any]] = None,
+              open_port: Callable[..., Any] = serial.Serial) -> Optional[str]:
+    """Find and claim the port of a device.
+
+    A port remembered in the port map is reused without probing as long as it
+    is still present with the same USB ids. Otherwise the ports matching the
+    configured VID/PID/serial number are probed concurrently with the
+    identify command (request), and the first one that answers is claimed
+    and remembered. Without an identify command the first matching port in
+    name order is used.
+
+    Args:
+        request: Encoded identify command, or None to skip probing
+        expected: Prefix of the identify response
+        candidates: list_ports entries to consider, defaults to all ports of the host
+    """
+    if candidates is None:
+        from serial.tools import list_ports
+        candidates = list_ports.comports()
+    with _claimed_lock:
+        ports = sorted(
+            (port for port in candidates
+             if match.matches_hardware(port) and _claimed.get(port.device, device_name) == device_name),
+            key=lambda port: port.device
+        )
+    if not ports:
+        return None
+
+    if port_map is not None:
+        entry = port_map.get(device_name)
+        if entry is not None and entry.get("match") == match.key():
+            for port in ports:
+                if (port.device == entry.get("port") and port.serial_number == entry.get("serial_number")
+                        and claim(port.device, device_name)):
+                    logger.info(f"Using remembered port {port.device} for device {device_name}")
+                    return port.device
+
+    found = None
+    if request is None:
+        for port in ports:
+            if claim(port.device, device_name):
+                found = port
+                break
+    else:
+        logger.info(f"Probing {len(ports)} port(s) for device {device_name}: {', '.join(p.device for p in ports)}")
+        executor = ThreadPoolExecutor(max_workers=min(len(ports), MAX_PROBE_WORKERS))
+        try:
+            futures = {
+                executor.submit(probe, port.device, baud_rate, request, expected, timeout, open_port): port
+                for port in ports
+            }
+            for future in as_completed(futures):
+                port = futures[future]
+                if future.result() and claim(port.device, device_name):
+                    found = port
+                    break
+        finally:
+            # 找到后不再等待其余串口的探测超时
+            executor.shutdown(wait=False, cancel_futures=True)
+    if found is None:
+        return None
+
+    logger.info(f"Device {device_name} found on port {found.device}")
+    if port_map is not None:
+        port_map.put(device_name, {
+            "port": found.device,
+            "serial_number": found.serial_number,
+            "match": match.key()
+        })
+    return found.device
@@ -0,0 +1,166 @@
+# ====================================================
+# Project: MCP2Serial
+# Description: A protocol conversion tool that enables 
+#              hardware devices to communicate with 
+#              large language models (LLM) through serial ports.
+# Repository: https://github.com/mcp2everything/mcp2serial.git
+# License: MIT License
+# Author: mcp2everything
+# Copyright (c) 2024 mcp2everything
+#
+# Permission is hereby granted, free of charge, to any person 
+# obtaining a copy of this software and associated documentation 
+# files (the "Software"), to deal in the Software without restriction, 
+# including without limitation the rights to use, copy, modify, merge, 
+# publish, distribute, sublicense, and/or sell copies of the Software, 
+# and to permit persons to whom the Software is furnished to do so, 
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be 
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. 
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, 
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS 
+# IN THE SOFTWARE.
+from typing import Iterator, Optional, Sequence, Tuple
+from array import array
+
+# bytes.strip() 默认去掉的空白字符
+_WHITESPACE = frozenset(b" \t\n\r\x0b\x0c")
+
+
+class ReceiveBuffer:
+    """Reusable receive buffer that splits incoming bytes into lines in place.
+
+    Chunks read from the port are copied into one bytearray that only grows
+    when a transaction receives more than it has ever held. Line boundaries
+    are kept as offsets in a reusable array, and comparisons run against the
+    buffer directly, so bytes objects are only created for lines that are
+    actually handed out.
+    """
+
+    def __init__(self, size: int = 4096, max_lines: int = 64):
+        self._buffer = bytearray(size)
+        self._end = 0  # 已写入数据的结束位置
+        self._start = 0  # 下一行的起始位置
+        self._bounds = array('q', bytes(16 * max_lines))  # 已切分出的各行，依次存放 start, end
+        self._count = 0  # 已切分出的行数
+
+    def __len__(self) -> int:
+        """Number of complete lines split off so far."""
+        return self._count
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buffer)
+
+    def clear(self) -> None:
+        """Forget all data and lines, keeping the allocated memory."""
+        self._start = self._end = self._count = 0
+
+    def compact(self) -> None:
+        """Drop the lines already split off, keeping only the incomplete tail.
+
+        Offsets of earlier lines become invalid.
+        """
+        remaining = self._end - self._start
+        if remaining and self._start:
+            with memoryview(self._buffer) as view:
+                view[:remaining] = view[self._start:self._end]
+        self._start, self._end = 0, remaining
+        self._count = 0
+
+    def feed(self, data: bytes) -> None:
+        """Append received bytes."""
+        end = self._end + len(data)
+        if end > len(self._buffer):
+            # 容量不足时至少翻倍，之后的事务不再分配
+            self._buffer.extend(bytes(max(end, 2 * len(self._buffer)) - len(self._buffer)))
+        self._buffer[self._end:end] = data
+        self._end = end
+
+    def next_line(self) -> int:
+        """Split off the next complete line. Returns its index, or -1 if none is complete yet."""
+        newline = self._buffer.find(b"\n", self._start, self._end)
+        if newline < 0:
+            return -1
+        index = self._count
+        if 2 * index == len(self._bounds):
+            self._bounds.extend(self._bounds)  # 行数不足时翻倍，内容随后覆盖
+        self._bounds[2 * index] = self._start
+        self._bounds[2 * index + 1] = newline + 1
+        self._start = newline + 1
+        self._count += 1
+        return index
+
+    def _span(self, index: int) -> Tuple[int, int]:
+        return self._bounds[2 * index], self._bounds[2 * index + 1]
+
+    def _stripped_span(self, index: int) -> Tuple[int, int]:
+        start, end = self._span(index)
+        buffer = self._buffer
+        while start < end and buffer[start] in _WHITESPACE:
+            start += 1
+        while end > start and buffer[end - 1] in _WHITESPACE:
+            end -= 1
+        return start, end
+
+    def line(self, index: int) -> bytes:
+        """Copy of a line, including its line ending."""
+        start, end = self._span(index)
+        return bytes(self._buffer[start:end])
+
+    def line_equals(self, index: int, data: bytes) -> bool:
+        """Whether a line, stripped of surrounding whitespace, equals data."""
+        start, end = self._stripped_span(index)
+        return end - start == len(data) and self._buffer.startswith(data, start, end)
+
+    def line_startswith(self, index: int, prefix: bytes) -> bool:
+        """Whether a line, stripped of surrounding whitespace, starts with prefix."""
+        start, end = self._stripped_span(index)
+        return self._buffer.startswith(prefix, start, end)
+
+    def tail(self) -> Optional[bytes]:
+        """Copy of the bytes received after the last complete line, if any."""
+        if self._start == self._end:
+            return None
+        return bytes(self._buffer[self._start:self._end])
+
+    def lines(self) -> 'ReceivedLines':
+        """Sequence view of the lines split off so far, including an incomplete tail."""
+        return ReceivedLines(self, len(self), self.tail())
+
+
+class ReceivedLines(Sequence):
+    """Lines of one transaction, copied out of the receive buffer on access.
+
+    Only valid until the buffer is cleared or compacted, that is for the rest
+    of the transaction that produced it.
+    """
+
+    def __init__(self, buffer: ReceiveBuffer, count: int, tail: Optional[bytes] = None):
+        self._buffer = buffer
+        self._count = count
+        self._tail = tail
+
+    def __len__(self) -> int:
+        return self._count + (self._tail is not None)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index == self._count and self._tail is not None:
+            return self._tail
+        if not 0 <= index < self._count:
+            raise IndexError("line index out of range")
+        return self._buffer.line(index)
+
+    def __iter__(self) -> Iterator[bytes]:
+        for index in range(len(self)):
+            yield self[index]
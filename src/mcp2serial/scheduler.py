@@ -0,0 +1,177 @@
+# ====================================================
+# Project: MCP2Serial
+# Description: A protocol conversion tool that enables 
+#              hardware devices to communicate with 
+#              large language models (LLM) through serial ports.
+# Repository: https://github.com/mcp2everything/mcp2serial.git
+# License: MIT License
+# Author: mcp2everything
+# Copyright (c) 2024 mcp2everything
+#
+# Permission is hereby granted, free of charge, to any person 
+# obtaining a copy of this software and associated documentation 
+# files (the "Software"), to deal in the Software without restriction, 
+# including without limitation the rights to use, copy, modify, merge, 
+# publish, distribute, sublicense, and/or sell copies of the Software, 
+# and to permit persons to whom the Software is furnished to do so, 
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be 
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. 
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, 
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS 
+# IN THE SOFTWARE.
+from typing import Any, Callable, Dict, List, Optional
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from .metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# 优先级类别，数值越小越先执行
+PRIORITIES: Dict[str, int] = {
+    "high": 0,
+    "normal": 1,
+    "low": 2,
+}
+DEFAULT_PRIORITY = "normal"
+
+
+class QueueFullError(Exception):
+    """Raised when a device queue is saturated and a transaction is rejected or shed."""
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    enqueued_at: float = field(compare=False)
+    future: Future = field(compare=False)
+    fn: Callable[..., Any] = field(compare=False)
+    args: tuple = field(compare=False)
+
+
+@dataclass
+class SchedulerStats:
+    """Counters describing one device queue."""
+    depth: int = 0
+    max_depth_seen: int = 0
+    executed: int = 0
+    rejected: int = 0
+    shed: int = 0
+    last_wait: float = 0.0
+    max_wait: float = 0.0
+    total_wait: float = 0.0
+    wait: Histogram = field(default_factory=Histogram)  # 排队等待时间分布
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "max_depth_seen": self.max_depth_seen,
+            "executed": self.executed,
+            "rejected": self.rejected,
+            "shed": self.shed,
+            "last_wait_ms": round(self.last_wait * 1000, 3),
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "avg_wait_ms": round(self.total_wait / self.executed * 1000, 3) if self.executed else 0.0,
+        }
+
+
+class CommandScheduler:
+    """Priority queue in front of one device's I/O thread.
+
+    Transactions run one at a time on a dedicated worker thread, most urgent
+    priority first and in submission order within a priority. When the queue
+    holds max_depth jobs, a new job either displaces the least urgent queued
+    job (if it is more urgent) or is rejected with QueueFullError.
+    """
+
+    def __init__(self, name: str, max_depth: int = 0):
+        self.name = name
+        self.max_depth = max_depth  # 0 表示不限制队列长度
+        self.stats = SchedulerStats()
+        self._queue: List[_Job] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+
+    def submit(self, priority: int, fn: Callable[..., Any], *args: Any) -> Future:
+        """Queue fn(*args) for the worker thread and return its future."""
+        future: Future = Future()
+        job = _Job(priority, next(self._seq), time.monotonic(), future, fn, args)
+        with self._cond:
+            if self.max_depth and len(self._queue) >= self.max_depth:
+                victim = max(self._queue)
+                if job.priority >= victim.priority:
+                    self.stats.rejected += 1
+                    raise QueueFullError(
+                        f"queue for device {self.name} is full ({len(self._queue)}/{self.max_depth} pending)"
+                    )
+                # 新任务更紧急：丢弃队列中最不紧急、最晚提交的任务
+                self._queue.remove(victim)
+                heapq.heapify(self._queue)
+                self.stats.shed += 1
+                victim.future.set_exception(QueueFullError(
+                    f"shed from the queue of device {self.name} by a higher priority command"
+                ))
+            heapq.heappush(self._queue, job)
+            self.stats.depth = len(self._queue)
+            self.stats.max_depth_seen = max(self.stats.max_depth_seen, self.stats.depth)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"mcp2serial-io-{self.name}", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                job = heapq.heappop(self._queue)
+                self.stats.depth = len(self._queue)
+            # 调用方已取消的任务直接跳过
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            wait = time.monotonic() - job.enqueued_at
+            self.stats.executed += 1
+            self.stats.last_wait = wait
+            self.stats.total_wait += wait
+            self.stats.max_wait = max(self.stats.max_wait, wait)
+            self.stats.wait.observe(wait)
+            logger.debug("Device %s: job waited %.1f ms, %d still queued", self.name, wait * 1000, self.stats.depth)
+            try:
+                result = job.fn(*job.args)
+            except BaseException as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+
+    def close(self) -> None:
+        """Run the jobs still queued, then stop the worker thread."""
+        with self._cond:
+            thread = self._thread
+            self._closing = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join()
+        with self._cond:
+            # 允许关闭后再次提交任务（会重新启动工作线程）
+            self._thread = None
+            self._closing = False
@@ -27,40 +27,305 @@
 # ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS 
 # IN THE SOFTWARE.
 # ====================================================
-from typing import Any, Optional, Tuple, Dict, List
+from typing import Any, Optional, Sequence, Tuple, Dict, List
 import asyncio
 import serial
-import serial.tools.list_ports
 from mcp.server.models import InitializationOptions
 import mcp.types as types
 from mcp.server import NotificationOptions, Server
 import mcp.server.stdio
+from pydantic import AnyUrl
 import logging
-import yaml
+import logging.handlers
+import queue
 import os
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
+from types import MappingProxyType
+import base64
+import json
+import re
+import sys
+import threading
 import time
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError
+from .scheduler import CommandScheduler, QueueFullError, PRIORITIES, DEFAULT_PRIORITY
+from .cache import ResponseCache
+from .template import CommandTemplate, DEFAULT_LINE_ENDING, DEFAULT_ENCODING
+from .capture import TrafficCapture, TX, RX
+from .rxbuffer import ReceiveBuffer
+from .supervisor import Backoff, ConnectionSupervisor, DeviceUnavailableError
+from .discovery import PortMap, PortMatch
+from .configcache import load_yaml
+from .metrics import Histogram, PortMetrics, PrometheusText, ToolMetrics, SUCCESS, TIMEOUT, FAILURE
+from .tracing import Trace, Tracer, NULL_TRACE, TIMING_PREFIX
+from .deadline import AdaptiveDeadlines
+from . import metrics
+from . import discovery
+from . import binary
+from . import baud
 
-# 设置日志级别为 DEBUG
-logging.basicConfig(
-    level=logging.DEBUG,  # 改为 DEBUG 级别以显示更多信息
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DEFAULT_LOG_LEVEL = "INFO"
+
+def resolve_log_level(level: Any) -> Optional[int]:
+    """Numeric level for a level name such as "debug", None if it is not a known level."""
+    if not isinstance(level, str):
+        return None
+    numeric = logging.getLevelName(level.strip().upper())
+    return numeric if isinstance(numeric, int) else None
+
+def setup_logging(level: str = DEFAULT_LOG_LEVEL) -> logging.handlers.QueueListener:
+    """Route log records through a queue to a background thread that writes stderr.
+
+    Logging calls on the request path only enqueue the record, so slow log I/O
+    never stalls a serial transaction. The caller stops the returned listener
+    on shutdown to flush pending records. An unknown level falls back to INFO
+    with a warning.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    root = logging.getLogger()
+    for old_handler in root.handlers[:]:
+        root.removeHandler(old_handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    numeric = resolve_log_level(level)
+    root.setLevel(numeric if numeric is not None else DEFAULT_LOG_LEVEL)
+    listener.start()
+    if numeric is None:
+        logger.warning(f"Unknown log level {level!r}, using {DEFAULT_LOG_LEVEL}")
+    return listener
+
+def hex_dump(data: bytes) -> str:
+    """Bytes as '0x50 0x57 ...' for logs and error messages."""
+    return ' '.join(f'0x{b:02X}' for b in data)
+
 # 添加版本号常量
 VERSION = "0.1.0"  # 添加了自动\r\n和更详细的错误信息
 
+# 读取应答时的轮询间隔（秒），数据到达时 read() 会立即返回，该值只决定截止时间的检查精度
+READ_POLL_INTERVAL = 0.01
+
+# 流水线模式下命令和应答的标签格式：#<序号> <内容>
+PIPELINE_TAG_PATTERN = re.compile(rb'^#(\d+) ?(.*)$', re.DOTALL)
+PIPELINE_SEQ_MODULO = 100000
+
+# 内置批量执行工具名
+BATCH_TOOL = "batch"
+BATCH_INPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "commands": {
+            "type": "array",
+            "description": "Commands to execute in order",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "tool": {"type": "string", "description": "Name of a configured tool"},
+                    "arguments": {"type": "object", "description": "Arguments of the tool"}
+                },
+                "required": ["tool"]
+            }
+        },
+        "stop_on_error": {
+            "type": "boolean",
+            "description": "Skip the remaining commands after the first failure",
+            "default": False
+        }
+    },
+    "required": ["commands"]
+}
+
+# 内置原始收发数据查看工具名
+DUMP_TOOL = "dump_traffic"
+DUMP_INPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "device": {"type": "string", "description": "Device name, defaults to the first configured device"},
+        "max_bytes": {"type": "integer", "description": "Return at most this many recent bytes", "default": 4096}
+    }
+}
+DEFAULT_DUMP_BYTES = 4096
+
+# 命令参数的输入类型，所有工具共用，不可修改
+STRING_PARAM_SCHEMA = {"type": "string"}
+
+# 顶层 serial/commands 配置对应的设备名，其工具名不加设备前缀
+DEFAULT_DEVICE = "default"
+
 server = Server("mcp2serial")
 
-@dataclass
+@dataclass(slots=True)
 class Command:
     """Configuration for a serial command."""
     command: str
     need_parse: bool
-    prompts: List[str]
+    prompts: Sequence[str]
+    response_start_string: Optional[str] = None  # 覆盖 serial.response_start_string
+    read_timeout: Optional[float] = None  # 覆盖 serial.read_timeout
+    priority: str = DEFAULT_PRIORITY  # 排队优先级：high / normal / low
+    cache_ttl: Optional[float] = None  # 只读命令的结果缓存秒数，未设置则不缓存
+    line_ending: Optional[str] = None  # 覆盖设备的 line_ending
+    encoding: Optional[str] = None  # 覆盖设备的 encoding
+    response_format: str = "text"  # need_parse 时应答数据的返回格式：text / hex / base64
+    template: Optional[CommandTemplate] = field(default=None, repr=False, compare=False)  # 编译后的字节模板
 
-@dataclass
+@dataclass(slots=True)
+class DeviceConfig:
+    """Serial settings and command set for one device."""
+    name: str = DEFAULT_DEVICE
+    port: Optional[str] = None
+    baud_rate: int = 115200
+    timeout: float = 1.0
+    read_timeout: float = 1.0
+    response_start_string: str = "OK"
+    error_start_string: Optional[str] = "NG"  # 以此开头的应答行立即结束等待并报告失败，None 表示不识别
+    max_queue_depth: int = 32  # 等待执行的命令数上限，0 表示不限制
+    pipeline_depth: int = 0  # 大于1时启用流水线模式，最多同时等待该数量的应答
+    cache_size: int = 128  # 结果缓存的最大条目数
+    line_ending: str = DEFAULT_LINE_ENDING  # 自动添加在每条命令末尾
+    encoding: str = DEFAULT_ENCODING  # 命令和应答的字符编码
+    protocol: str = "text"  # text：文本行；binary：COBS 帧 + CRC16
+    max_retries: int = 2  # 二进制模式下 CRC 校验失败时的重发次数
+    capture_size: int = 65536  # 原始收发数据环形缓冲区的字节数，0 表示不记录
+    reconnect_delay: float = 0.5  # 断线后首次重连的等待秒数，之后逐次翻倍
+    reconnect_max_delay: float = 30.0  # 重连等待的上限秒数
+    health_check: Optional[str] = None  # 定期发送的探测命令，应答不以 response_start_string 开头即视为断线
+    health_check_interval: float = 5.0  # 检查串口设备节点和探测命令的间隔秒数
+    match: Optional[PortMatch] = None  # 未指定 port 时按 VID/PID/序列号和识别命令查找串口
+    adaptive_timeout: bool = False  # 按每条命令的实测响应时间确定读取截止时间
+    min_read_timeout: float = 0.05  # 自适应截止时间的下限秒数
+    max_read_timeout: Optional[float] = None  # 自适应截止时间的上限秒数，默认为 read_timeout
+    baud_rates: Tuple[int, ...] = ()  # 打开串口后按顺序尝试的候选波特率，空表示不自动检测
+    switch_baud_rate: Optional[int] = None  # 连接后请求设备切换到的波特率，验证失败时回退
+    baud_probe: Optional[str] = None  # 检测和验证波特率的命令，默认为 health_check 或 BAUD
+    commands: Dict[str, Command] = field(default_factory=dict)
+
+    def compile_command(self, command: Command) -> CommandTemplate:
+        """Compile a command template with this device's line ending and encoding."""
+        if self.protocol == "binary":
+            line_ending = ""  # 二进制帧自带分隔符
+        else:
+            line_ending = command.line_ending if command.line_ending is not None else self.line_ending
+        command.template = CommandTemplate(command.command, line_ending, command.encoding or self.encoding)
+        return command.template
+
+    def settings(self) -> Dict[str, Any]:
+        """Serial settings of the device, everything except its command set."""
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name != "commands"}
+
+@dataclass(frozen=True, slots=True)
+class ToolEntry:
+    """A configured command as exposed over MCP."""
+    name: str
+    device: DeviceConfig
+    command: Command
+    params: Tuple[str, ...]
+    tool: types.Tool
+
+class ToolRegistry:
+    """Immutable catalog of MCP tools, built once per loaded configuration.
+
+    Parameter lists, input schemas and Tool objects are computed up front so
+    list_tools and call_tool only do lookups.
+    """
+
+    def __init__(self, entries: Dict[str, ToolEntry]):
+        self._entries = MappingProxyType(entries)
+        tool_list = [entry.tool for entry in entries.values()]
+        if BATCH_TOOL not in entries:
+            tool_list.append(types.Tool(
+                name=BATCH_TOOL,
+                description="Execute several configured commands in one call and return one result per command",
+                inputSchema=BATCH_INPUT_SCHEMA
+            ))
+        if DUMP_TOOL not in entries:
+            tool_list.append(types.Tool(
+                name=DUMP_TOOL,
+                description="Show the most recent raw bytes sent to and received from a device",
+                inputSchema=DUMP_INPUT_SCHEMA
+            ))
+        self.tool_list: Tuple[types.Tool, ...] = tuple(tool_list)
+
+    @classmethod
+    def build(cls, devices: List[DeviceConfig], previous: Optional['ToolRegistry'] = None) -> 'ToolRegistry':
+        """Build the registry for a list of devices.
+
+        Commands of the top-level device keep their plain names; commands of
+        devices in the devices section are exposed as <device>_<command>.
+        Entries of a previous registry whose command and device settings are
+        unchanged are reused as they are instead of being compiled again.
+        """
+        entries: Dict[str, ToolEntry] = {}
+        for device in devices:
+            settings = device.settings() if previous is not None else None
+            for cmd_id, command in device.commands.items():
+                name = cmd_id if device.name == DEFAULT_DEVICE else f"{device.name}_{cmd_id}"
+                if name in entries:
+                    logger.warning(f"Duplicate tool name {name} on device {device.name}, ignored")
+                    continue
+                old = previous.get(name) if previous is not None else None
+                if old is not None and old.command == command and old.device.settings() == settings:
+                    entries[name] = old
+                    continue
+                # 编译命令模板，同时得到参数名
+                param_names = list(device.compile_command(command).params)
+                description = f"Execute {name} command"
+                if device.name != DEFAULT_DEVICE:
+                    description += f" on device {device.name}"
+                # 字段由本函数生成，无需 pydantic 校验和复制；所有参数共用同一个类型描述
+                tool = types.Tool.model_construct(
+                    name=name,
+                    description=description,
+                    inputSchema={
+                        "type": "object",
+                        "properties": {param: STRING_PARAM_SCHEMA for param in param_names},
+                        "required": param_names
+                    },
+                    prompts=command.prompts
+                )
+                entries[name] = ToolEntry(name, device, command, tuple(param_names), tool)
+        return cls(entries)
+
+    def get(self, name: str) -> Optional[ToolEntry]:
+        return self._entries.get(name)
+
+    def page(self, cursor: Optional[str], page_size: int) -> Tuple[List[types.Tool], Optional[str]]:
+        """One page of the tool list for tools/list pagination.
+
+        The cursor is the offset of the page as a string; an empty page size
+        returns every tool from the cursor on.
+
+        Returns:
+            The tools of the page, and the cursor of the next page (None on the last page)
+        """
+        start = 0
+        if cursor:
+            try:
+                start = int(cursor)
+            except ValueError:
+                start = -1
+            if not 0 <= start <= len(self.tool_list):
+                raise ValueError(f"Invalid cursor: {cursor!r}")
+        if page_size <= 0:
+            return list(self.tool_list[start:]), None
+        end = start + page_size
+        next_cursor = str(end) if end < len(self.tool_list) else None
+        return list(self.tool_list[start:end]), next_cursor
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+@dataclass(slots=True)
 class Config:
     """Configuration for MCP2Serial service."""
     port: Optional[str] = None
@@ -68,7 +333,112 @@ class Config:
     timeout: float = 1.0
     read_timeout: float = 1.0
     response_start_string: str = "OK"  # 新增：可配置的应答开始字符串
+    error_start_string: Optional[str] = "NG"
+    max_queue_depth: int = 32
+    pipeline_depth: int = 0
+    cache_size: int = 128
+    line_ending: str = DEFAULT_LINE_ENDING
+    encoding: str = DEFAULT_ENCODING
+    protocol: str = "text"
+    max_retries: int = 2
+    capture_size: int = 65536
+    reconnect_delay: float = 0.5
+    reconnect_max_delay: float = 30.0
+    health_check: Optional[str] = None
+    health_check_interval: float = 5.0
+    match: Optional[PortMatch] = None
+    adaptive_timeout: bool = False
+    min_read_timeout: float = 0.05
+    max_read_timeout: Optional[float] = None
+    baud_rates: Tuple[int, ...] = ()
+    switch_baud_rate: Optional[int] = None
+    baud_probe: Optional[str] = None
     commands: Dict[str, Command] = field(default_factory=dict)
+    devices: Dict[str, DeviceConfig] = field(default_factory=dict)  # devices 段中的设备
+    log_level: Optional[str] = None  # 顶层 log_level，例如 DEBUG / INFO / WARNING
+    path: Optional[str] = None  # 加载配置的文件，使用默认配置时为 None
+    tools_page_size: int = 0  # tools/list 每页的工具数，0 表示一次返回全部
+    metrics_file: Optional[str] = None  # 定期写入 Prometheus 文本格式指标的文件
+    metrics_port: Optional[int] = None  # 在 127.0.0.1 上提供 /metrics 的端口
+    metrics_interval: float = 10.0  # 写入指标文件的间隔秒数
+    trace_enabled: bool = False  # 记录每次串口事务各阶段的耗时
+    trace_file: Optional[str] = None  # 写入 Trace Event Format 事件的文件
+    trace_in_result: bool = False  # 在工具结果末尾附加耗时明细
+    _registry: Optional[ToolRegistry] = field(default=None, init=False, repr=False, compare=False)
+
+    def default_device(self) -> DeviceConfig:
+        """Device described by the top-level serial and commands sections."""
+        return DeviceConfig(
+            name=DEFAULT_DEVICE,
+            port=self.port,
+            baud_rate=self.baud_rate,
+            timeout=self.timeout,
+            read_timeout=self.read_timeout,
+            response_start_string=self.response_start_string,
+            error_start_string=self.error_start_string,
+            max_queue_depth=self.max_queue_depth,
+            pipeline_depth=self.pipeline_depth,
+            cache_size=self.cache_size,
+            line_ending=self.line_ending,
+            encoding=self.encoding,
+            protocol=self.protocol,
+            max_retries=self.max_retries,
+            capture_size=self.capture_size,
+            reconnect_delay=self.reconnect_delay,
+            reconnect_max_delay=self.reconnect_max_delay,
+            health_check=self.health_check,
+            health_check_interval=self.health_check_interval,
+            match=self.match,
+            adaptive_timeout=self.adaptive_timeout,
+            min_read_timeout=self.min_read_timeout,
+            max_read_timeout=self.max_read_timeout,
+            baud_rates=self.baud_rates,
+            switch_baud_rate=self.switch_baud_rate,
+            baud_probe=self.baud_probe,
+            commands=self.commands
+        )
+
+    def device_configs(self) -> List[DeviceConfig]:
+        """All configured devices, the top-level device first if it has commands."""
+        devices = list(self.devices.values())
+        if self.commands or not devices:
+            devices.insert(0, self.default_device())
+        return devices
+
+    @property
+    def registry(self) -> ToolRegistry:
+        """Tool registry of this configuration, built on first use."""
+        if self._registry is None:
+            self._registry = ToolRegistry.build(self.device_configs())
+        return self._registry
+
+    @staticmethod
+    def _load_commands(commands_data: Dict[str, Any]) -> Dict[str, Command]:
+        """Parse a commands section."""
+        commands = {}
+        for cmd_id, cmd_data in commands_data.items():
+            raw_command = cmd_data.get('command', '')
+            priority = cmd_data.get('priority', DEFAULT_PRIORITY)
+            if priority not in PRIORITIES:
+                raise ValueError(f"Invalid priority {priority!r} for command {cmd_id}, "
+                                 f"expected one of {', '.join(PRIORITIES)}")
+            commands[cmd_id] = Command(
+                command=raw_command,
+                need_parse=cmd_data.get('need_parse', False),
+                # 生成的大型配置中提示语大量重复，驻留后只保存一份
+                prompts=tuple(sys.intern(prompt) if isinstance(prompt, str) else prompt
+                              for prompt in cmd_data.get('prompts') or ()),
+                response_start_string=cmd_data.get('response_start_string'),
+                read_timeout=cmd_data.get('read_timeout'),
+                priority=priority,
+                cache_ttl=cmd_data.get('cache_ttl'),
+                line_ending=cmd_data.get('line_ending'),
+                encoding=cmd_data.get('encoding'),
+                response_format=cmd_data.get('response_format', 'text')
+            )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Loaded %d commands: %s", len(commands), ", ".join(commands))
+        return commands
 
     @staticmethod
     def load(config_path: str = "config.yaml") -> 'Config':
@@ -94,33 +464,7 @@ class Config:
         for path in config_paths:
             if os.path.exists(path):
                 try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        config_data = yaml.safe_load(f)
-                    logger.info(f"Loading configuration from {path}")
-                    
-                    # Load serial configuration
-                    serial_config = config_data.get('serial', {})
-                    config = Config(
-                        port=serial_config.get('port'),
-                        baud_rate=serial_config.get('baud_rate', 115200),
-                        timeout=serial_config.get('timeout', 1.0),
-                        read_timeout=serial_config.get('read_timeout', 1.0),
-                        response_start_string=serial_config.get('response_start_string', 'OK')  # 新增：加载应答开始字符串
-                    )
-
-                    # Load commands
-                    commands_data = config_data.get('commands', {})
-                    for cmd_id, cmd_data in commands_data.items():
-                        raw_command = cmd_data.get('command', '')
-                        logger.debug(f"Loading command {cmd_id}: {repr(raw_command)}")
-                        config.commands[cmd_id] = Command(
-                            command=raw_command,
-                            need_parse=cmd_data.get('need_parse', False),
-                            prompts=cmd_data.get('prompts', [])
-                        )
-                        logger.debug(f"Loaded command {cmd_id}: {repr(config.commands[cmd_id].command)}")
-
-                    return config
+                    return Config.from_file(path)
                 except Exception as e:
                     logger.warning(f"Error loading config from {path}: {e}")
                     continue
@@ -128,23 +472,234 @@ class Config:
         logger.info("No valid config file found, using defaults")
         return Config()
 
-config = Config.load()
+    @staticmethod
+    def from_file(path: str, previous: Optional[ToolRegistry] = None) -> 'Config':
+        """Load configuration from one YAML file. Raises if it cannot be parsed.
+
+        Args:
+            previous: Registry of the configuration being replaced; its unchanged tools are reused
+        """
+        # 重复启动时直接读取编译缓存，无需重新解析 YAML
+        config_data = load_yaml(path)
+        logger.info(f"Loading configuration from {path}")
+
+        # Load serial configuration
+        serial_config = config_data.get('serial', {})
+        config = Config(
+            port=serial_config.get('port'),
+            baud_rate=serial_config.get('baud_rate', 115200),
+            timeout=serial_config.get('timeout', 1.0),
+            read_timeout=serial_config.get('read_timeout', 1.0),
+            response_start_string=serial_config.get('response_start_string', 'OK'),  # 新增：加载应答开始字符串
+            error_start_string=serial_config.get('error_start_string', 'NG'),
+            max_queue_depth=serial_config.get('max_queue_depth', 32),
+            pipeline_depth=serial_config.get('pipeline_depth', 0),
+            cache_size=serial_config.get('cache_size', 128),
+            line_ending=serial_config.get('line_ending', DEFAULT_LINE_ENDING),
+            encoding=serial_config.get('encoding', DEFAULT_ENCODING),
+            protocol=serial_config.get('protocol', 'text'),
+            max_retries=serial_config.get('max_retries', 2),
+            capture_size=serial_config.get('capture_size', 65536),
+            reconnect_delay=serial_config.get('reconnect_delay', 0.5),
+            reconnect_max_delay=serial_config.get('reconnect_max_delay', 30.0),
+            health_check=serial_config.get('health_check'),
+            health_check_interval=serial_config.get('health_check_interval', 5.0),
+            match=PortMatch.from_dict(serial_config['match']) if serial_config.get('match') else None,
+            adaptive_timeout=serial_config.get('adaptive_timeout', False),
+            min_read_timeout=serial_config.get('min_read_timeout', 0.05),
+            max_read_timeout=serial_config.get('max_read_timeout'),
+            baud_rates=tuple(serial_config.get('baud_rates') or ()),
+            switch_baud_rate=serial_config.get('switch_baud_rate'),
+            baud_probe=serial_config.get('baud_probe')
+        )
+
+        config.log_level = config_data.get('log_level')
+        config.path = path
+        config.tools_page_size = config_data.get('tools_page_size', 0)
+        metrics_config = config_data.get('metrics') or {}
+        config.metrics_file = metrics_config.get('file')
+        config.metrics_port = metrics_config.get('http_port')
+        config.metrics_interval = metrics_config.get('interval', 10.0)
+        trace_config = config_data.get('trace') or {}
+        config.trace_enabled = trace_config.get('enabled', False)
+        config.trace_file = trace_config.get('file')
+        config.trace_in_result = trace_config.get('in_result', False)
+
+        # Load commands
+        config.commands = Config._load_commands(config_data.get('commands') or {})
+
+        # Load devices，未指定的串口参数继承 serial 段的设置（port 和 match 除外）
+        for device_name, device_data in (config_data.get('devices') or {}).items():
+            config.devices[device_name] = DeviceConfig(
+                name=device_name,
+                port=device_data.get('port'),
+                baud_rate=device_data.get('baud_rate', config.baud_rate),
+                timeout=device_data.get('timeout', config.timeout),
+                read_timeout=device_data.get('read_timeout', config.read_timeout),
+                response_start_string=device_data.get('response_start_string', config.response_start_string),
+                error_start_string=device_data.get('error_start_string', config.error_start_string),
+                max_queue_depth=device_data.get('max_queue_depth', config.max_queue_depth),
+                pipeline_depth=device_data.get('pipeline_depth', config.pipeline_depth),
+                cache_size=device_data.get('cache_size', config.cache_size),
+                line_ending=device_data.get('line_ending', config.line_ending),
+                encoding=device_data.get('encoding', config.encoding),
+                protocol=device_data.get('protocol', config.protocol),
+                max_retries=device_data.get('max_retries', config.max_retries),
+                capture_size=device_data.get('capture_size', config.capture_size),
+                reconnect_delay=device_data.get('reconnect_delay', config.reconnect_delay),
+                reconnect_max_delay=device_data.get('reconnect_max_delay', config.reconnect_max_delay),
+                health_check=device_data.get('health_check', config.health_check),
+                health_check_interval=device_data.get('health_check_interval', config.health_check_interval),
+                match=PortMatch.from_dict(device_data['match']) if device_data.get('match') else None,
+                adaptive_timeout=device_data.get('adaptive_timeout', config.adaptive_timeout),
+                min_read_timeout=device_data.get('min_read_timeout', config.min_read_timeout),
+                max_read_timeout=device_data.get('max_read_timeout', config.max_read_timeout),
+                baud_rates=tuple(device_data.get('baud_rates') or config.baud_rates),
+                switch_baud_rate=device_data.get('switch_baud_rate', config.switch_baud_rate),
+                baud_probe=device_data.get('baud_probe', config.baud_probe),
+                commands=Config._load_commands(device_data.get('commands') or {})
+            )
+            logger.info(f"Loaded device {device_name} with {len(config.devices[device_name].commands)} commands")
+
+        # 加载时一次性构建工具注册表
+        config._registry = ToolRegistry.build(config.device_configs(), previous)
+        logger.info(f"Registered {len(config.registry)} tools")
+        return config
+
+# 配置在 main() 中加载，导入模块时不读取任何文件
+config = Config()
+
+# 设备名到串口的映射，保存在 ~/.mcp2serial/port_map.json
+port_map = PortMap()
+
+# 串口事务分阶段计时，在 main() 中按 trace 配置启用
+tracer = Tracer()
+
+def is_error_result(result: list[types.TextContent]) -> bool:
+    """Whether a tool result is one of the server's error reports."""
+    return bool(result) and result[0].text.startswith(f"[MCP2Serial v{VERSION}]")
+
+@dataclass
+class PendingReply:
+    """A tagged command waiting for its reply in pipelined mode."""
+    seq: int
+    cmd_bytes: bytes
+    response_start: bytes
+    future: Future = field(default_factory=Future)  # 结果为 (responses, frame_end)
+    lines: List[bytes] = field(default_factory=list)
 
 class SerialConnection:
     """Serial port connection manager."""
     
-    def __init__(self):
+    def __init__(self, device: Optional[DeviceConfig] = None):
+        self.device: DeviceConfig = device or config.default_device()
         self.serial_port: Optional[serial.Serial] = None
-        self.baud_rate: int = config.baud_rate
-        self.timeout: float = 2.0  # 最大超时2秒
-        self.read_timeout: float = 1.0
+        self.baud_rate: int = self.device.baud_rate
+        self.timeout: float = self.device.timeout  # 写超时
+        self.read_timeout: float = self.device.read_timeout
+        # 启用 adaptive_timeout 时，每条命令的读取截止时间由实测响应时间确定
+        self.deadlines = AdaptiveDeadlines(
+            self.device.min_read_timeout,
+            self.device.max_read_timeout if self.device.max_read_timeout is not None else self.device.read_timeout
+        )
         self.is_loopback: bool = False  # 新增：标记是否为回环模式
+        # 每个串口一个专用 I/O 线程，按优先级依次执行事务，不阻塞事件循环
+        self.scheduler = CommandScheduler(self.device.name, self.device.max_queue_depth)
+        # 流水线模式：按序号等待应答的命令、在途窗口和后台读线程
+        self._pending: Dict[int, PendingReply] = {}
+        self._pending_lock = threading.Lock()
+        self._window = threading.BoundedSemaphore(max(self.device.pipeline_depth, 1))
+        self._next_seq = 0
+        self._reader: Optional[threading.Thread] = None
+        self._reader_stop = threading.Event()
+        # 只读命令的结果缓存，只在事件循环中访问
+        self.cache = ResponseCache(self.device.cache_size)
+        # 已切换到二进制模式的串口对象，重新连接后需要再次切换
+        self._binary_port: Optional[serial.Serial] = None
+        # 最近收发的原始字节，供 capture 资源和 dump_traffic 工具查看
+        self.capture = TrafficCapture(self.device.capture_size)
+        # I/O 线程复用的接收缓冲区
+        self._rx = ReceiveBuffer()
+        # 串口收发字节和次数
+        self.metrics = PortMetrics()
+        # 启用 trace 时各阶段（queue、write、read 等）的耗时直方图
+        self.phases: Dict[str, Histogram] = {}
+        # 断线检测：I/O 错误或定期检查发现断线后，在后台按指数退避重连，期间的调用立即失败
+        self.supervisor = ConnectionSupervisor(
+            self.device.name, self._reconnect, self._check_health,
+            Backoff(self.device.reconnect_delay, self.device.reconnect_max_delay),
+            self.device.health_check_interval
+        )
+        self._health_command: Optional[Command] = None
+        if self.device.health_check:
+            self._health_command = Command(command=self.device.health_check, need_parse=False, prompts=[])
+
+    def _port_read(self) -> bytes:
+        """Read whatever has arrived, waiting at most one poll interval, and record it."""
+        chunk = self.serial_port.read(self.serial_port.in_waiting or 1)
+        if chunk:
+            self.capture.record(RX, chunk)
+            self.metrics.reads += 1
+            self.metrics.bytes_read += len(chunk)
+        return chunk
+
+    def _port_write(self, data: bytes, trace: Trace = NULL_TRACE) -> int:
+        """Write and flush data, recording it."""
+        with trace.span("write"):
+            bytes_written = self.serial_port.write(data)
+        self.capture.record(TX, data)
+        self.metrics.writes += 1
+        self.metrics.bytes_written += bytes_written or 0
+        with trace.span("flush"):
+            self.serial_port.flush()
+        return bytes_written
 
     def connect(self) -> bool:
-        """Attempt to connect to an available serial port."""
+        """Attempt to connect to an available serial port.
+
+        A newly opened port is probed for the device's baud rate and switched
+        to switch_baud_rate if either is configured.
+        """
+        already_open = self.serial_port is not None and self.serial_port.is_open
+        connected = self._open_port()
+        if connected and not already_open and self.serial_port is not None:
+            self._tune_baud()
+        return connected
+
+    def _tune_baud(self) -> None:
+        """Detect the device's baud rate and negotiate a higher one, as configured. Runs on the I/O thread."""
+        target = self.device.switch_baud_rate
+        if not self.device.baud_rates and not target:
+            return
+        probe = (self.device.baud_probe or self.device.health_check or baud.BAUD_COMMAND).encode(self.device.encoding)
+        expected = self.device.response_start_string.encode(self.device.encoding)
+        # 先试上次成功的速率和配置的速率；设备未重启时可能仍在切换后的速率
+        rates = baud.candidates(self.baud_rate, self.device.baud_rate, target, extra=self.device.baud_rates)
+        try:
+            rate = baud.detect(self.serial_port, rates, self._port_read, self._port_write,
+                               probe, expected, self.read_timeout)
+            if rate is None:
+                logger.warning(f"Device {self.device.name} did not answer at any of {rates} baud, "
+                               f"keeping {self.serial_port.baudrate}")
+                return
+            if rate != self.baud_rate:
+                logger.info(f"Detected {rate} baud on device {self.device.name}")
+            self.baud_rate = rate
+            if target and rate != target:
+                if baud.negotiate(self.serial_port, target, self._port_read, self._port_write,
+                                  probe, expected, self.read_timeout):
+                    logger.info(f"Device {self.device.name} switched to {target} baud")
+                    self.baud_rate = target
+            # 切换前后可能残留应答或乱码
+            self.serial_port.reset_input_buffer()
+        except (serial.SerialException, OSError) as e:
+            logger.warning(f"Baud rate negotiation with device {self.device.name} failed: {e}")
+
+    def _open_port(self) -> bool:
+        """Open the configured, matching or first free serial port."""
         try:
             # 检查是否为回环模式
-            if config.port == "LOOP_BACK":
+            if self.device.port == "LOOP_BACK":
                 logger.info("Using LOOP_BACK mode")
                 self.is_loopback = True
                 return True
@@ -163,38 +718,47 @@ class SerialConnection:
                 self.serial_port = None
 
             # 尝试连接指定端口
-            if config.port:
-                logger.info(f"Attempting to connect to configured port: {config.port}")
+            if self.device.port:
+                logger.info(f"Attempting to connect to configured port: {self.device.port}")
                 try:
                     self.serial_port = serial.Serial(
-                        port=config.port,
+                        port=self.device.port,
                         baudrate=self.baud_rate,
-                        timeout=self.timeout
+                        timeout=READ_POLL_INTERVAL,
+                        write_timeout=self.timeout
                     )
-                    logger.info(f"Connected to configured port: {config.port}")
+                    logger.info(f"Connected to configured port: {self.device.port}")
                     return True
                 except serial.SerialException as e:
-                    logger.error(f"Failed to connect to configured port {config.port}: {str(e)}")
-                    raise ValueError(f"Serial port {config.port} not available: {str(e)}")
+                    logger.error(f"Failed to connect to configured port {self.device.port}: {str(e)}")
+                    raise ValueError(f"Serial port {self.device.port} not available: {str(e)}")
 
-            # 搜索可用端口
+            if self.device.match is not None:
+                return self._connect_matching()
+
+            # 搜索可用端口，跳过其他设备已占用的串口
             logger.info("No port configured, searching for available ports...")
-            ports = list(serial.tools.list_ports.comports())
+            from serial.tools import list_ports
+            ports = list(list_ports.comports())
             if not ports:
                 logger.error("No serial ports found")
                 raise ValueError("No serial ports available")
 
             logger.info(f"Found ports: {', '.join(p.device for p in ports)}")
             for port in ports:
+                if not discovery.claim(port.device, self.device.name):
+                    continue
                 try:
                     self.serial_port = serial.Serial(
                         port=port.device,
                         baudrate=self.baud_rate,
-                        timeout=self.timeout
+                        timeout=READ_POLL_INTERVAL,
+                        write_timeout=self.timeout
                     )
                     logger.info(f"Connected to port: {port.device}")
                     return True
                 except serial.SerialException:
+                    discovery.release(self.device.name)
                     continue
 
             raise ValueError("Failed to connect to any available serial port")
@@ -203,130 +767,726 @@ class SerialConnection:
             logger.error(f"Unexpected error in connect: {str(e)}")
             raise ValueError(f"Connection error: {str(e)}")
 
-    def send_command(self, command: Command, arguments: Dict[str, Any]) -> list[types.TextContent]:
-        """Send a command to the serial port and return result according to MCP protocol."""
+    def _connect_matching(self) -> bool:
+        """Find the device's port by USB ids and identify command, then open it."""
+        match = self.device.match
+        request = None
+        if match.identify:
+            # 识别命令在切换到二进制模式前以文本行发送
+            request = CommandTemplate(match.identify, self.device.line_ending, self.device.encoding).render({})
+        expected = (match.identify_response or self.device.response_start_string).encode(self.device.encoding)
+        port = discovery.find_port(self.device.name, match, self.baud_rate, request, expected,
+                                   self.read_timeout, port_map)
+        if port is None:
+            raise ValueError(f"No serial port matches device {self.device.name}")
         try:
-            # 确保连接
-            if not self.is_loopback and (not self.serial_port or not self.serial_port.is_open):
-                logger.info("No active connection, attempting to connect...")
-                if not self.connect():
-                    error_msg = f"[MCP2Serial v{VERSION}] Failed to establish serial connection.\n"
-                    error_msg += "Please check:\n"
-                    error_msg += "1. Serial port is correctly configured in config.yaml\n"
-                    error_msg += "2. Device is properly connected\n"
-                    error_msg += "3. No other program is using the port"
-                    return [types.TextContent(
-                        type="text",
-                        text=error_msg
-                    )]
+            self.serial_port = serial.Serial(
+                port=port,
+                baudrate=self.baud_rate,
+                timeout=READ_POLL_INTERVAL,
+                write_timeout=self.timeout
+            )
+        except serial.SerialException:
+            # 记住的串口已不可用，下次重新探测
+            discovery.release(self.device.name)
+            port_map.put(self.device.name, None)
+            raise
+        logger.info(f"Connected to port {port} for device {self.device.name}")
+        return True
 
-            # 准备命令
-            cmd_str = command.command.format(**arguments)
-            # 确保命令以\r\n结尾
-            cmd_str = cmd_str.rstrip() + '\r\n'  # 移除可能的空白字符，强制添加\r\n
+    def _read_frame(self, echo: bytes, response_start: bytes, deadline: float,
+                    error_start: Optional[bytes] = None) -> Tuple[Sequence[bytes], Optional[bytes]]:
+        """Read response lines until the frame is complete or the deadline expires.
 
-            cmd_bytes = cmd_str.encode()
-            logger.info(f"Sending command: {cmd_str.strip()}")
-            logger.info(f"Command bytes ({len(cmd_bytes)} bytes): {' '.join([f'0x{b:02X}' for b in cmd_bytes])}")
+        The frame is complete as soon as a line starting with ``response_start``
+        or ``error_start`` arrives that is not the device's echo of the command itself.
 
-            if self.is_loopback:
-                # 回环模式：直接返回发送的命令和OK响应
-                responses = [
-                    cmd_str.encode(),  # 命令回显
-                    f"{config.response_start_string}\r\n".encode()  # OK响应
-                ]
-            else:
-                # 清空缓冲区
-                self.serial_port.reset_input_buffer()
-                self.serial_port.reset_output_buffer()
+        Returns:
+            All lines received, and the line that completed the frame (None on timeout).
+            The lines are a view of the connection's receive buffer, valid until the next read.
+        """
+        rx = self._rx
+        rx.clear()
+        while time.monotonic() < deadline:
+            # 有数据时读出全部已到达的字节，否则最多等待一个轮询间隔
+            chunk = self._port_read()
+            if not chunk:
+                continue
+            rx.feed(chunk)
+            while True:
+                index = rx.next_line()
+                if index < 0:
+                    break
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Raw response: %r", rx.line(index))
+                if rx.line_equals(index, echo):
+                    continue
+                if rx.line_startswith(index, response_start) or (error_start and rx.line_startswith(index, error_start)):
+                    return rx.lines(), rx.line(index)
+        if logger.isEnabledFor(logging.DEBUG) and rx.tail() is not None:
+            # 超时前收到的不完整行也返回，便于排查
+            logger.debug("Raw response (incomplete): %r", rx.tail())
+        return rx.lines(), None
 
-                # 发送命令
-                bytes_written = self.serial_port.write(cmd_bytes)
-                logger.info(f"Wrote {bytes_written} bytes")
-                self.serial_port.flush()
-
-                # 等待一段时间确保命令被处理
-                time.sleep(0.1)
-
-                # 读取所有响应
-                responses = []
-                while self.serial_port.in_waiting:
-                    response = self.serial_port.readline()
-                    logger.info(f"Raw response: {response}")
-                    if response:
-                        responses.append(response)
-
-            if not responses:
-                logger.error("No response received within timeout")
-                error_msg = f"[MCP2Serial v{VERSION}] Command timeout - no response within {self.read_timeout} second(s)\n"
-                error_msg += f"Command sent: {cmd_str.strip()}\n"
-                error_msg += f"Command bytes ({len(cmd_bytes)} bytes): {' '.join([f'0x{b:02X}' for b in cmd_bytes])}\n"
+    def _ensure_connected(self) -> Optional[list[types.TextContent]]:
+        """Connect if needed. Returns an error result if no connection could be made."""
+        if not self.is_loopback and (not self.serial_port or not self.serial_port.is_open):
+            logger.info("No active connection, attempting to connect...")
+            try:
+                connected = self.connect()
+            except ValueError as e:
+                self._lost(str(e))
+                return self._unavailable_result()
+            if connected and not self.is_loopback:
+                self.supervisor.start()
+            if not connected:
+                error_msg = f"[MCP2Serial v{VERSION}] Failed to establish serial connection.\n"
                 error_msg += "Please check:\n"
-                error_msg += "1. Device is powered and responding\n"
-                error_msg += "2. Baud rate matches device settings\n"
-                error_msg += "3. Serial connection is stable\n"
+                error_msg += "1. Serial port is correctly configured in config.yaml\n"
+                error_msg += "2. Device is properly connected\n"
+                error_msg += "3. No other program is using the port"
                 return [types.TextContent(
                     type="text",
                     text=error_msg
                 )]
+        return None
+
+    def _lost(self, reason: str) -> None:
+        """Mark the device down; the supervisor reopens the port in the background."""
+        if not self.is_loopback:
+            self.supervisor.mark_down(reason)
+
+    def _unavailable_result(self) -> list[types.TextContent]:
+        """MCP result for a call on a device that is down."""
+        error_msg = f"[MCP2Serial v{VERSION}] Device {self.device.name} unavailable - reconnecting in the background\n"
+        error_msg += f"Last error: {self.supervisor.last_error}\n"
+        error_msg += "Please check:\n"
+        error_msg += "1. Device is plugged in and powered\n"
+        error_msg += "2. Serial port is correctly configured in config.yaml\n"
+        error_msg += "3. No other program is using the port"
+        return [types.TextContent(
+            type="text",
+            text=error_msg
+        )]
+
+    def _reopen(self) -> None:
+        """Close the lost port and open it again. Runs on the I/O thread."""
+        if self._reader is not None:
+            self._reader_stop.set()
+            self._reader.join()
+            self._reader = None
+        if self.serial_port is not None:
+            try:
+                self.serial_port.close()
+            except Exception:
+                pass
+            self.serial_port = None
+        self._binary_port = None
+        # 自动查找的串口重新查找，设备可能换到了另一个串口
+        discovery.release(self.device.name)
+        self.connect()
+        if self._health_command is not None and not self._probe():
+            raise DeviceUnavailableError("health check failed after reconnecting")
+
+    def _reconnect(self) -> None:
+        """Reopen the port on the I/O thread. Called by the supervisor; raises on failure."""
+        self.scheduler.submit(PRIORITIES["high"], self._reopen).result()
+
+    def _port_present(self) -> bool:
+        """Whether the device node of the port still exists (only checked for path-like ports)."""
+        port = self.serial_port.port if self.serial_port is not None else self.device.port
+        return not (port and port.startswith("/")) or os.path.exists(port)
+
+    def _probe(self) -> bool:
+        """Send the health check command and report whether the device answered. Runs on the I/O thread."""
+        if self.device.pipeline_depth > 1 and self.device.protocol != "binary":
+            pending = self._write_tagged(self._health_command, {})
+            try:
+                _, frame_end = pending.future.result(timeout=self.read_timeout)
+            except FutureTimeoutError:
+                self._abandon(pending)
+                return False
+            return frame_end is not None
+        return not is_error_result(self._transact(self._health_command, {}))
+
+    def _check_health(self) -> bool:
+        """Periodic check run by the supervisor while the device is up."""
+        if not self._port_present():
+            raise DeviceUnavailableError(f"port {self.device.port} disappeared")
+        if self._health_command is None:
+            return True
+        try:
+            return self.scheduler.submit(PRIORITIES["high"], self._probe).result()
+        except QueueFullError:
+            return True  # 队列已满说明设备正忙，跳过本次探测
+
+    def _prepare_command(self, command: Command, arguments: Dict[str, Any], tag: bytes = b"") -> bytes:
+        """Encode a command line, optionally prefixed with a pipeline tag."""
+        template = command.template or self.device.compile_command(command)
+        # 模板已预编码，末尾自动添加配置的行结束符
+        cmd_bytes = template.render(arguments, tag)
+        logger.info("Sending command: %r", cmd_bytes)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Command bytes (%d bytes): %s", len(cmd_bytes), hex_dump(cmd_bytes))
+        return cmd_bytes
+
+    def _decode(self, data: bytes) -> str:
+        """Decode received or sent bytes for display."""
+        return data.decode(self.device.encoding, errors='replace').strip()
+
+    def _response_settings(self, command: Command) -> Tuple[str, float]:
+        """Response string and read timeout for a command; command settings override the device.
+
+        With adaptive_timeout the read timeout is learned from the command's
+        recent response times; a configured command read_timeout is its upper bound.
+        """
+        response_start_string = command.response_start_string or self.device.response_start_string
+        if self.device.adaptive_timeout:
+            return response_start_string, self.deadlines.deadline(command.command, command.read_timeout)
+        read_timeout = command.read_timeout if command.read_timeout is not None else self.read_timeout
+        return response_start_string, read_timeout
 
-            # 解码第一行响应
-            first_response = responses[0]
-            first_line = first_response.decode().strip()
-            logger.info(f"Decoded first response: {first_line}")
-
-            # 检查是否有第二行响应
-            if len(responses) > 1:
-                second_response = responses[1]
-                if second_response.startswith(config.response_start_string.encode()):  # 使用配置的应答开始字符串
-                    if command.need_parse:
-                        return [types.TextContent(
-                            type="text",
-                            text=second_response.decode().strip()
-                        )]
-                    return []
-
-            # 如果响应不是预期的格式，返回详细的错误信息
-            error_msg = f"[MCP2Serial v{VERSION}] Command execution failed.\n"
-            error_msg += f"Command sent: {cmd_str.strip()}\n"
-            error_msg += f"Command bytes ({len(cmd_bytes)} bytes): {' '.join([f'0x{b:02X}' for b in cmd_bytes])}\n"
-            error_msg += "Responses received:\n"
-            for i, resp in enumerate(responses, 1):
-                error_msg += f"{i}. Raw: {resp!r}\n   Decoded: {resp.decode().strip()}\n"
-            error_msg += "\nPossible reasons:\n"
-            error_msg += f"- Device echoed the command but did not send {config.response_start_string} response\n"
-            error_msg += "- Command format may be incorrect\n"
-            error_msg += "- Device may be in wrong mode\n"
+    def _learn_latency(self, command: Command, replied: bool, elapsed: float) -> None:
+        """Feed one transaction into the command's adaptive deadline.
+
+        Any reply, including an error reply, is a response-time sample; only
+        a transaction that got no reply at all counts as a timeout.
+        """
+        if not self.device.adaptive_timeout:
+            return
+        if replied:
+            self.deadlines.observe(command.command, elapsed)
+        else:
+            self.deadlines.timed_out(command.command)
+
+    def _build_result(self, command: Command, cmd_bytes: bytes, responses: Sequence[bytes],
+                      frame_end: Optional[bytes], response_start_string: str,
+                      read_timeout: float) -> list[types.TextContent]:
+        """Turn the lines received for a command into an MCP result."""
+        if not responses:
+            logger.error("No response received within timeout")
+            error_msg = f"[MCP2Serial v{VERSION}] Command timeout - no response within {round(read_timeout, 3)} second(s)\n"
+            error_msg += f"Command sent: {self._decode(cmd_bytes)}\n"
+            error_msg += f"Command bytes ({len(cmd_bytes)} bytes): {hex_dump(cmd_bytes)}\n"
+            error_msg += "Please check:\n"
+            error_msg += "1. Device is powered and responding\n"
+            error_msg += "2. Baud rate matches device settings\n"
+            error_msg += "3. Serial connection is stable\n"
             return [types.TextContent(
                 type="text",
                 text=error_msg
             )]
 
-        except serial.SerialTimeoutException as e:
-            logger.error(f"Serial timeout: {str(e)}")
-            error_msg = f"[MCP2Serial v{VERSION}] Command timeout - {str(e)}\n"
+        if frame_end is not None:
+            if command.need_parse:
+                return [types.TextContent(
+                    type="text",
+                    text=self._format_response(command, frame_end)
+                )]
+            return []
+
+        # 如果响应不是预期的格式，返回详细的错误信息
+        error_msg = f"[MCP2Serial v{VERSION}] Command execution failed.\n"
+        error_msg += f"Command sent: {self._decode(cmd_bytes)}\n"
+        error_msg += f"Command bytes ({len(cmd_bytes)} bytes): {hex_dump(cmd_bytes)}\n"
+        error_msg += "Responses received:\n"
+        for i, resp in enumerate(responses, 1):
+            error_msg += f"{i}. Raw: {resp!r}\n   Decoded: {self._decode(resp)}\n"
+        error_msg += "\nPossible reasons:\n"
+        error_msg += f"- Device reported an error, or did not send a {response_start_string} response within {round(read_timeout, 3)} second(s)\n"
+        error_msg += "- Command format may be incorrect\n"
+        error_msg += "- Device may be in wrong mode\n"
+        return [types.TextContent(
+            type="text",
+            text=error_msg
+        )]
+
+    def _format_response(self, command: Command, data: bytes) -> str:
+        """Response data as returned to the client, according to response_format."""
+        if command.response_format == "hex":
+            return data.hex(' ')
+        if command.response_format == "base64":
+            return base64.b64encode(data).decode('ascii')
+        return self._decode(data)
+
+    def _ensure_binary_mode(self) -> None:
+        """Switch the device to the binary framed protocol once per connection."""
+        if self._binary_port is self.serial_port:
+            return
+        # 先发送分隔符结束设备端可能残留的半帧，再发送文本切换命令
+        self.serial_port.reset_input_buffer()
+        self._port_write(binary.FRAME_DELIMITER + binary.BINARY_MODE_COMMAND + b"\r\n" + binary.FRAME_DELIMITER)
+        _, ack = self._read_frame(binary.BINARY_MODE_COMMAND, b"OK", time.monotonic() + self.read_timeout)
+        if ack is None:
+            raise serial.SerialException("Device did not acknowledge the switch to binary mode")
+        logger.info(f"Device {self.device.name} switched to binary mode")
+        self._binary_port = self.serial_port
+
+    def _send_binary(self, command: Command, arguments: Dict[str, Any],
+                     trace: Trace = NULL_TRACE) -> list[types.TextContent]:
+        """Send a command as a binary frame and return result according to MCP protocol."""
+        with trace.span("format"):
+            cmd_bytes = self._prepare_command(command, arguments)
+        response_start_string, read_timeout = self._response_settings(command)
+
+        if self.is_loopback:
+            # 回环模式：直接返回 OK 状态帧
+            result = binary.BinaryResult(status=binary.STATUS_OK, attempts=1,
+                                         data=response_start_string.encode(self.device.encoding))
+            self.capture.record(TX, cmd_bytes)
+            self.capture.record(RX, result.data)
+        else:
+            with trace.span("binary_mode"):
+                self._ensure_binary_mode()
+            with trace.span("reset_buffers"):
+                self.serial_port.reset_input_buffer()
+            with self._pending_lock:
+                seq = self._next_seq % 256
+                self._next_seq = (self._next_seq + 1) % PIPELINE_SEQ_MODULO
+            port_write = self._port_write if not trace else (lambda data: self._port_write(data, trace))
+            # 重试时帧的写入和读取交替进行，整体记为 exchange，其中的写入单独记录
+            sent_at = time.monotonic()
+            with trace.span("exchange"):
+                result = binary.transact(
+                    self._port_read, port_write, seq, cmd_bytes, read_timeout, self.device.max_retries
+                )
+            # 只有首次发送即收到的应答计入响应时间，重发后的应答无法区分对应哪一次发送
+            if result.status is None and not result.crc_errors:
+                self._learn_latency(command, False, 0.0)
+            elif result.status is not None and result.attempts == 1:
+                self._learn_latency(command, True, time.monotonic() - sent_at)
+            if result.crc_errors:
+                logger.warning(f"Device {self.device.name}: {result.crc_errors} corrupted frame(s), "
+                               f"{result.attempts} attempt(s)")
+
+        if result.status == binary.STATUS_OK:
+            with trace.span("decode"):
+                return self._build_result(command, cmd_bytes, result.frames or [cmd_bytes], result.data,
+                                          response_start_string, read_timeout)
+        if result.status is None and result.crc_errors:
+            error_msg = f"[MCP2Serial v{VERSION}] Frame check failed - no valid response after {result.attempts} attempt(s)\n"
+            error_msg += f"Command sent: {self._decode(cmd_bytes)}\n"
+            error_msg += f"Corrupted frames: {result.crc_errors}\n"
             error_msg += "Please check:\n"
-            error_msg += "1. Device is powered and responding\n"
+            error_msg += "1. Cable and connectors are in good condition\n"
             error_msg += "2. Baud rate matches device settings\n"
-            error_msg += "3. Device is not busy with other operations"
+            error_msg += "3. max_retries in config.yaml is large enough for the link quality"
             return [types.TextContent(
                 type="text",
                 text=error_msg
             )]
-        except serial.SerialException as e:
+        # 超时或设备返回错误状态
+        responses = [b"NG " + result.data] if result.status == binary.STATUS_NG else result.frames
+        return self._build_result(command, cmd_bytes, responses, None, response_start_string, read_timeout)
+
+    def _serial_error_result(self, e: serial.SerialException) -> list[types.TextContent]:
+        """MCP result for a serial timeout or communication error."""
+        if isinstance(e, serial.SerialTimeoutException):
+            logger.error(f"Serial timeout: {str(e)}")
+            error_msg = f"[MCP2Serial v{VERSION}] Command timeout - {str(e)}\n"
+            error_msg += "Please check:\n"
+            error_msg += "1. Device is powered and responding\n"
+            error_msg += "2. Baud rate matches device settings\n"
+            error_msg += "3. Device is not busy with other operations"
+        else:
             logger.error(f"Serial error: {str(e)}")
             error_msg = f"[MCP2Serial v{VERSION}] Serial communication failed - {str(e)}\n"
             error_msg += "Please check:\n"
             error_msg += "1. Serial port is correctly configured in config.yaml\n"
             error_msg += "2. Device is properly connected\n"
             error_msg += "3. No other program is using the port"
-            return [types.TextContent(
-                type="text",
-                text=error_msg
-            )]
+        return [types.TextContent(
+            type="text",
+            text=error_msg
+        )]
+
+    def send_command(self, command: Command, arguments: Dict[str, Any],
+                     trace: Optional[Trace] = None) -> list[types.TextContent]:
+        """Send a command to the serial port and return result according to MCP protocol.
+
+        Args:
+            trace: Trace started when the call was queued; a new one is started if tracing is enabled
+        """
+        if trace is None:
+            trace = tracer.start(command.command, self.device.name)
+        elif trace:
+            trace.add("queue", trace.start, time.monotonic_ns())
+            trace.tid = threading.get_ident()  # 查看器中按设备的 I/O 线程显示
+        # 设备断线时排队中的调用立即失败，不再等待超时
+        if self.supervisor.is_down:
+            return self._finish_trace(trace, self._unavailable_result())
+        return self._finish_trace(trace, self._transact(command, arguments, trace))
+
+    def _finish_trace(self, trace: Trace, result: list[types.TextContent]) -> list[types.TextContent]:
+        """Record a finished transaction trace and attach its breakdown to the result if configured."""
+        if not trace:
+            return result
+        trace.finish()
+        for phase, start, end in trace.spans:
+            histogram = self.phases.get(phase)
+            if histogram is None:
+                histogram = self.phases[phase] = Histogram()
+            histogram.observe((end - start) / 1e9)
+        tracer.record(trace)
+        if tracer.include_in_result:
+            result = result + [types.TextContent(type="text", text=f"{TIMING_PREFIX} {trace.summary()}")]
+        return result
+
+    def _transact(self, command: Command, arguments: Dict[str, Any],
+                  trace: Trace = NULL_TRACE) -> list[types.TextContent]:
+        """Run one command transaction on the port."""
+        try:
+            # 确保连接
+            with trace.span("connect"):
+                error = self._ensure_connected()
+            if error:
+                return error
+
+            if self.device.protocol == "binary":
+                return self._send_binary(command, arguments, trace)
+
+            # 准备命令
+            with trace.span("format"):
+                cmd_bytes = self._prepare_command(command, arguments)
+
+            # 命令级配置优先于全局 serial 配置
+            response_start_string, read_timeout = self._response_settings(command)
+
+            if self.is_loopback:
+                # 回环模式：直接返回发送的命令和OK响应
+                responses = [
+                    cmd_bytes,  # 命令回显
+                    f"{response_start_string}\r\n".encode(self.device.encoding)  # OK响应
+                ]
+                frame_end = responses[1]
+                self.capture.record(TX, cmd_bytes)
+                self.capture.record(RX, frame_end)
+            else:
+                # 清空缓冲区
+                with trace.span("reset_buffers"):
+                    self.serial_port.reset_input_buffer()
+                    self.serial_port.reset_output_buffer()
+
+                # 发送命令
+                sent_at = time.monotonic()
+                bytes_written = self._port_write(cmd_bytes, trace)
+                logger.debug("Wrote %s bytes", bytes_written)
+
+                # 读取应答帧：收到应答行或错误行立即返回，否则直到截止时间
+                response_start = response_start_string.encode(self.device.encoding)
+                error_start = self.device.error_start_string
+                with trace.span("read"):
+                    responses, frame_end = self._read_frame(
+                        cmd_bytes.strip(),
+                        response_start,
+                        sent_at + read_timeout,
+                        error_start.encode(self.device.encoding) if error_start else None
+                    )
+                self._learn_latency(command, frame_end is not None, time.monotonic() - sent_at)
+                if frame_end is not None and not frame_end.strip().startswith(response_start):
+                    frame_end = None  # 设备返回错误，按失败报告收到的应答
+
+            with trace.span("decode"):
+                return self._build_result(command, cmd_bytes, responses, frame_end,
+                                          response_start_string, read_timeout)
+
+        except serial.SerialException as e:
+            if not isinstance(e, serial.SerialTimeoutException):
+                self._lost(str(e))
+            return self._serial_error_result(e)
+
+    def _send_tagged(self, command: Command, arguments: Dict[str, Any],
+                     trace: Trace = NULL_TRACE) -> PendingReply:
+        """Write a tagged command without waiting for its reply (pipelined mode).
+
+        Runs on the scheduler thread. Blocks while pipeline_depth replies are
+        already outstanding; the reply is delivered by the reader thread.
+        """
+        if trace:
+            trace.add("queue", trace.start, time.monotonic_ns())
+            trace.tid = threading.get_ident()
+        if self.supervisor.is_down:
+            raise DeviceUnavailableError(self.supervisor.last_error)
+        return self._write_tagged(command, arguments, trace)
+
+    def _write_tagged(self, command: Command, arguments: Dict[str, Any],
+                      trace: Trace = NULL_TRACE) -> PendingReply:
+        """Register and write one tagged command."""
+        with trace.span("connect"):
+            error = self._ensure_connected()
+        if error:
+            raise serial.SerialException(error[0].text)
+
+        response_start_string, _ = self._response_settings(command)
+        with trace.span("window"):
+            self._window.acquire()
+        try:
+            with self._pending_lock:
+                seq = self._next_seq
+                self._next_seq = (self._next_seq + 1) % PIPELINE_SEQ_MODULO
+            with trace.span("format"):
+                cmd_bytes = self._prepare_command(command, arguments, tag=f"#{seq} ".encode())
+        except Exception:
+            # 参数缺失等渲染错误时归还窗口，否则泄漏的位置最终会让 I/O 线程永久阻塞
+            self._window.release()
+            raise
+        pending = PendingReply(seq, cmd_bytes, response_start_string.encode(self.device.encoding))
+
+        if self.is_loopback:
+            # 回环模式：直接返回带标签的命令回显和OK响应
+            self._window.release()
+            reply = f"#{seq} {response_start_string}\r\n".encode(self.device.encoding)
+            self.capture.record(TX, cmd_bytes)
+            self.capture.record(RX, reply)
+            pending.future.set_result(([cmd_bytes, reply], reply[len(f"#{seq} "):]))
+            return pending
+
+        # 先登记再发送，避免应答先于登记到达
+        with self._pending_lock:
+            self._pending[seq] = pending
+        if self._reader is None or not self._reader.is_alive():
+            self._reader_stop.clear()
+            self._reader = threading.Thread(
+                target=self._read_tagged_replies, name=f"mcp2serial-reader-{self.device.name}", daemon=True
+            )
+            self._reader.start()
+        try:
+            bytes_written = self._port_write(cmd_bytes, trace)
+            logger.debug("Wrote %s bytes", bytes_written)
+        except Exception:
+            self._abandon(pending)
+            raise
+        return pending
+
+    def _abandon(self, pending: PendingReply) -> bool:
+        """Stop waiting for a tagged reply. Returns False if it was already delivered."""
+        with self._pending_lock:
+            if self._pending.pop(pending.seq, None) is None:
+                return False
+        self._window.release()
+        return True
+
+    def _deliver(self, pending: PendingReply, frame_end: Optional[bytes]) -> None:
+        """Complete a pending reply from the reader thread."""
+        if not self._abandon(pending):
+            return
+        try:
+            pending.future.set_result((pending.lines, frame_end))
+        except InvalidStateError:
+            pass  # 调用方已超时放弃
+
+    def _read_tagged_replies(self) -> None:
+        """Reader thread for pipelined mode: match tagged lines to pending commands."""
+        rx = ReceiveBuffer()
+        try:
+            while not self._reader_stop.is_set():
+                chunk = self._port_read()
+                if not chunk:
+                    continue
+                rx.compact()
+                rx.feed(chunk)
+                while True:
+                    index = rx.next_line()
+                    if index < 0:
+                        break
+                    # 每行都要交给某个等待的命令，这里才复制
+                    line = rx.line(index)
+                    logger.debug("Raw response: %r", line)
+                    match = PIPELINE_TAG_PATTERN.match(line.strip())
+                    if not match:
+                        logger.debug("Ignoring untagged line: %r", line)
+                        continue
+                    with self._pending_lock:
+                        pending = self._pending.get(int(match.group(1)))
+                    if pending is None:
+                        logger.warning("Reply for unknown or expired sequence number: %r", line)
+                        continue
+                    pending.lines.append(line)
+                    body = match.group(2)
+                    if line.strip() == pending.cmd_bytes.strip():
+                        continue  # 命令回显
+                    # 每个带标签的命令只有一行应答，非预期的应答也立即结束等待
+                    self._deliver(pending, body if body.startswith(pending.response_start) else None)
+        except Exception as e:
+            logger.error(f"Pipeline reader stopped: {str(e)}")
+            if not self._reader_stop.is_set():
+                self._lost(str(e))
+            with self._pending_lock:
+                failed = list(self._pending.values())
+            for pending in failed:
+                if self._abandon(pending):
+                    try:
+                        pending.future.set_exception(
+                            e if isinstance(e, serial.SerialException) else serial.SerialException(str(e))
+                        )
+                    except InvalidStateError:
+                        pass
+
+    async def _send_command_pipelined(self, command: Command, arguments: Dict[str, Any]) -> list[types.TextContent]:
+        """Send a tagged command and await its matching reply."""
+        trace = tracer.start(command.command, self.device.name)
+        future = self.scheduler.submit(PRIORITIES[command.priority], self._send_tagged, command, arguments, trace)
+        pending = await asyncio.wrap_future(future)
+        response_start_string, read_timeout = self._response_settings(command)
+        sent_at = time.monotonic()
+        replied = True
+        with trace.span("reply"):
+            try:
+                responses, frame_end = await asyncio.wait_for(asyncio.wrap_future(pending.future), read_timeout)
+            except asyncio.TimeoutError:
+                self._abandon(pending)
+                responses, frame_end = list(pending.lines), None
+                replied = False
+        if not self.is_loopback:
+            # 非预期的应答（例如 NG）也已结束等待，只有完全没有应答才算超时
+            self._learn_latency(command, replied, time.monotonic() - sent_at)
+        with trace.span("decode"):
+            result = self._build_result(command, pending.cmd_bytes, responses, frame_end,
+                                        response_start_string, read_timeout)
+        return self._finish_trace(trace, result)
+
+    async def send_command_async(self, command: Command, arguments: Dict[str, Any],
+                                 tool: Optional[str] = None) -> list[types.TextContent]:
+        """Run send_command on this port's I/O thread and await the result.
+
+        The blocking write/flush/read sequence runs on a dedicated per-port worker
+        thread, so the event loop keeps serving other MCP requests (list_tools,
+        pings, cancellations) while the device is mid-transaction. Calls on the
+        same port execute one at a time, most urgent priority first. With
+        pipeline_depth > 1 commands are tagged with sequence numbers and up to
+        pipeline_depth of them await their replies at the same time.
+
+        Results of commands with cache_ttl are served from the device's cache
+        until they expire; any other command on the device clears the cache,
+        since it may change what the device reports. Entries are keyed by the
+        tool name and arguments, so tools sharing a template but parsing the
+        reply differently never see each other's results.
+        """
+        if not command.cache_ttl:
+            self.cache.invalidate()
+            result = await self._send_uncached(command, arguments)
+            self.cache.invalidate()
+            return result
+
+        # 未给出工具名时以 Command 对象区分；重载配置会清空缓存，不会误用旧对象的 id
+        key = (tool if tool is not None else id(command),
+               tuple(sorted((name, str(value)) for name, value in arguments.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.info("Cache hit for %s on device %s", command.command, self.device.name)
+            return cached
+        generation = self.cache.generation
+        result = await self._send_uncached(command, arguments)
+        if not is_error_result(result):
+            # 耗时明细只属于这一次事务，不缓存
+            cached = [content for content in result if not content.text.startswith(TIMING_PREFIX)]
+            self.cache.put(key, cached, command.cache_ttl, generation)
+        return result
+
+    async def _send_uncached(self, command: Command, arguments: Dict[str, Any]) -> list[types.TextContent]:
+        """Send a command through the queue or pipeline without consulting the cache."""
+        if self.supervisor.is_down:
+            return self._unavailable_result()
+        try:
+            if self.device.pipeline_depth > 1 and self.device.protocol != "binary":
+                return await self._send_command_pipelined(command, arguments)
+            priority = PRIORITIES[command.priority]
+            if tracer.enabled:
+                # 在入队时开始计时，trace 中包含排队等待的时间
+                trace = tracer.start(command.command, self.device.name)
+                future = self.scheduler.submit(priority, self.send_command, command, arguments, trace)
+            else:
+                future = self.scheduler.submit(priority, self.send_command, command, arguments)
+            return await asyncio.wrap_future(future)
+        except DeviceUnavailableError:
+            return self._unavailable_result()
+        except serial.SerialException as e:
+            return self._serial_error_result(e)
+        except QueueFullError as e:
+            return self._busy_result(e)
+
+    def _busy_result(self, e: QueueFullError) -> list[types.TextContent]:
+        """MCP result for a call rejected or shed by the device queue."""
+        logger.warning(f"Device {self.device.name} busy: {e}")
+        error_msg = f"[MCP2Serial v{VERSION}] Device busy - {str(e)}\n"
+        error_msg += "Please check:\n"
+        error_msg += "1. Tool calls are not sent faster than the device can answer\n"
+        error_msg += "2. max_queue_depth in config.yaml is large enough\n"
+        error_msg += "3. Urgent commands are configured with priority: high"
+        return [types.TextContent(
+            type="text",
+            text=error_msg
+        )]
+
+    def send_commands(self, calls: List[Tuple[Command, Dict[str, Any]]],
+                      stop_on_error: bool = False) -> List[list[types.TextContent]]:
+        """Send several commands back-to-back and return one result per command sent.
+
+        Stops after the first failed command when stop_on_error is set, so the
+        returned list may be shorter than calls.
+        """
+        results = []
+        for command, arguments in calls:
+            result = self.send_command(command, arguments)
+            results.append(result)
+            if stop_on_error and is_error_result(result):
+                break
+        return results
+
+    async def send_batch_async(self, calls: List[Tuple[Command, Dict[str, Any]]],
+                               stop_on_error: bool = False) -> List[list[types.TextContent]]:
+        """Run several commands on this device as one unit.
+
+        In stop-and-wait mode the whole batch is a single queue entry, run
+        back-to-back on the I/O thread with no other call in between. In
+        pipelined mode all commands are written without waiting for replies,
+        unless stop_on_error requires each reply before the next write.
+        Batches bypass the result cache; a batch with any non-cacheable
+        command clears it.
+        """
+        if not all(command.cache_ttl for command, _ in calls):
+            self.cache.invalidate()
+            try:
+                return await self._send_batch_uncached(calls, stop_on_error)
+            finally:
+                self.cache.invalidate()
+        return await self._send_batch_uncached(calls, stop_on_error)
+
+    async def _send_batch_uncached(self, calls: List[Tuple[Command, Dict[str, Any]]],
+                                   stop_on_error: bool) -> List[list[types.TextContent]]:
+        """Run a batch through the queue or pipeline."""
+        if self.supervisor.is_down:
+            return [self._unavailable_result()]
+        if self.device.pipeline_depth > 1 and self.device.protocol != "binary":
+            if not stop_on_error:
+                return list(await asyncio.gather(
+                    *[self._send_uncached(command, arguments) for command, arguments in calls]
+                ))
+            results = []
+            for command, arguments in calls:
+                result = await self._send_uncached(command, arguments)
+                results.append(result)
+                if is_error_result(result):
+                    break
+            return results
+
+        # 整批命令按其中最紧急的优先级排队
+        priority = min(PRIORITIES[command.priority] for command, _ in calls)
+        try:
+            future = self.scheduler.submit(priority, self.send_commands, calls, stop_on_error)
+            return await asyncio.wrap_future(future)
+        except QueueFullError as e:
+            return [self._busy_result(e)]
 
     def close(self) -> None:
         """Close the serial port connection if open."""
+        # 先停止后台重连，再等待 I/O 线程中已排队的事务结束后关闭串口
+        self.supervisor.close()
+        self.scheduler.close()
+        if self._reader is not None:
+            self._reader_stop.set()
+            self._reader.join()
+            self._reader = None
         if self.serial_port and self.serial_port.is_open:
             try:
                 self.serial_port.close()
@@ -334,41 +1494,303 @@ class SerialConnection:
             except Exception as e:
                 logger.error(f"Error closing port: {str(e)}")
             self.serial_port = None
+        discovery.release(self.device.name)
 
-serial_connection = SerialConnection()
+class DevicePool:
+    """One SerialConnection, with its own I/O thread, per configured device.
 
-@server.list_tools()
-async def handle_list_tools() -> list[types.Tool]:
-    """List available tools for the MCP service."""
-    logger.info("Listing available tools")
-    tools = []
-    
-    for cmd_id, command in config.commands.items():
-        # 从命令字符串中提取参数名
-        import re
-        param_names = re.findall(r'\{(\w+)\}', command.command)
-        properties = {name: {"type": "string"} for name in param_names}
-        
-        tools.append(types.Tool(
-            name=cmd_id,
-            description=f"Execute {cmd_id} command",
-            inputSchema={
-                "type": "object",
-                "properties": properties,
-                "required": param_names
-            },
-            prompts=command.prompts
+    Transactions on different devices run in parallel; transactions on the
+    same device are serialized by that device's connection.
+    """
+
+    def __init__(self):
+        self.connections: Dict[str, SerialConnection] = {}
+
+    def get(self, device: DeviceConfig) -> SerialConnection:
+        """Return the connection for a device, creating it on first use."""
+        connection = self.connections.get(device.name)
+        if connection is None:
+            connection = SerialConnection(device)
+            self.connections[device.name] = connection
+        return connection
+
+    def close(self) -> None:
+        """Close every device connection."""
+        for connection in self.connections.values():
+            connection.close()
+        self.connections.clear()
+
+device_pool = DevicePool()
+
+# 配置文件检查间隔（秒），文件修改后自动重新加载
+CONFIG_POLL_INTERVAL = 1.0
+
+# 旧版 mcp 解析请求时会丢弃 params 中的 cursor，分页会让客户端反复收到第一页，此时总是一次返回全部工具
+TOOLS_PAGINATION_SUPPORTED = hasattr(types, "PaginatedRequestParams")
+
+# 当前客户端会话，配置重新加载后用于发送工具列表变更通知
+_session: Optional[Any] = None
+
+STATUS_URI = "mcp2serial://status"
+METRICS_URI = "mcp2serial://metrics"
+CAPTURE_URI_PREFIX = "mcp2serial://capture/"
+
+# 每个工具的调用次数、结果和延迟，只在事件循环中更新
+tool_metrics: Dict[str, ToolMetrics] = {}
+
+def metrics_snapshot() -> Dict[str, Any]:
+    """Per-tool and per-device metrics as a JSON-serializable dict."""
+    devices = {}
+    for name, connection in device_pool.connections.items():
+        stats = connection.scheduler.stats
+        devices[name] = {
+            **connection.metrics.as_dict(),
+            "queue_depth": stats.depth,
+            "queue_wait": stats.wait.as_dict(),
+            "reconnects": connection.supervisor.reconnects,
+            "connection_failures": connection.supervisor.failures,
+            "up": not connection.supervisor.is_down,
+            "phases": {phase: histogram.as_dict() for phase, histogram in connection.phases.items()}
+        }
+    return {
+        "tools": {name: tool.as_dict() for name, tool in tool_metrics.items()},
+        "devices": devices
+    }
+
+def prometheus_metrics() -> str:
+    """Per-tool and per-device metrics in the Prometheus text format."""
+    text = PrometheusText()
+    tools = list(tool_metrics.items())
+    text.counter("mcp2serial_tool_calls_total", "Tool calls",
+                 [({"tool": name}, tool.calls) for name, tool in tools])
+    text.counter("mcp2serial_tool_timeouts_total", "Tool calls that timed out waiting for the device",
+                 [({"tool": name}, tool.timeouts) for name, tool in tools])
+    text.counter("mcp2serial_tool_failures_total", "Tool calls that failed for other reasons",
+                 [({"tool": name}, tool.failures) for name, tool in tools])
+    text.histogram("mcp2serial_tool_latency_seconds", "Tool call latency",
+                   [({"tool": name}, tool.latency) for name, tool in tools])
+    connections = list(device_pool.connections.items())
+    text.counter("mcp2serial_port_bytes_written_total", "Bytes written to the serial port",
+                 [({"device": name}, c.metrics.bytes_written) for name, c in connections])
+    text.counter("mcp2serial_port_bytes_read_total", "Bytes read from the serial port",
+                 [({"device": name}, c.metrics.bytes_read) for name, c in connections])
+    text.gauge("mcp2serial_queue_depth", "Transactions waiting in the device queue",
+               [({"device": name}, c.scheduler.stats.depth) for name, c in connections])
+    text.histogram("mcp2serial_queue_wait_seconds", "Time transactions waited in the device queue",
+                   [({"device": name}, c.scheduler.stats.wait) for name, c in connections])
+    text.counter("mcp2serial_reconnects_total", "Successful reconnects after the device was lost",
+                 [({"device": name}, c.supervisor.reconnects) for name, c in connections])
+    text.counter("mcp2serial_connection_failures_total", "Times the device was marked down",
+                 [({"device": name}, c.supervisor.failures) for name, c in connections])
+    text.gauge("mcp2serial_device_up", "Whether the device is connected",
+               [({"device": name}, 0 if c.supervisor.is_down else 1) for name, c in connections])
+    text.histogram("mcp2serial_phase_seconds", "Time spent in each phase of a serial transaction (tracing only)",
+                   [({"device": name, "phase": phase}, histogram)
+                    for name, c in connections for phase, histogram in list(c.phases.items())])
+    return text.render()
+
+async def write_metrics_file(path: str, interval: float) -> None:
+    """Write Prometheus metrics to a file every interval seconds, e.g. for the node_exporter textfile collector."""
+    while True:
+        metrics.write_file(path, prometheus_metrics())
+        await asyncio.sleep(interval)
+
+def dump_traffic(device_name: Optional[str] = None, max_bytes: int = DEFAULT_DUMP_BYTES) -> str:
+    """Recent raw traffic of a configured device as text."""
+    devices = {device.name: device for device in config.device_configs()}
+    if device_name is None:
+        device_name = next(iter(devices))
+    if device_name not in devices:
+        raise ValueError(f"Unknown device: {device_name}")
+    connection = device_pool.connections.get(device_name)
+    text = connection.capture.dump(max_bytes) if connection is not None else ""
+    return text or f"No traffic recorded for device {device_name}"
+
+@server.list_resources()
+async def handle_list_resources() -> list[types.Resource]:
+    """List status resources of the MCP service."""
+    resources = [types.Resource(
+        uri=STATUS_URI,
+        name="Device queue status",
+        description="Queue depth, wait time and result cache statistics of every device",
+        mimeType="application/json"
+    ), types.Resource(
+        uri=METRICS_URI,
+        name="Metrics",
+        description="Latency histograms, outcomes and I/O counters per tool and per device",
+        mimeType="application/json"
+    )]
+    for device in config.device_configs():
+        resources.append(types.Resource(
+            uri=f"{CAPTURE_URI_PREFIX}{device.name}",
+            name=f"Raw traffic of {device.name}",
+            description=f"Last {DEFAULT_DUMP_BYTES} bytes sent to and received from device {device.name}",
+            mimeType="text/plain"
         ))
-    
-    return tools
+    return resources
+
+@server.read_resource()
+async def handle_read_resource(uri: AnyUrl) -> str:
+    """Return the content of a status resource."""
+    if str(uri).startswith(CAPTURE_URI_PREFIX):
+        return dump_traffic(str(uri)[len(CAPTURE_URI_PREFIX):])
+    if str(uri) == METRICS_URI:
+        return json.dumps(metrics_snapshot(), indent=2)
+    if str(uri) != STATUS_URI:
+        raise ValueError(f"Unknown resource: {uri}")
+    status = {
+        name: {
+            "port": connection.serial_port.port if connection.serial_port is not None else connection.device.port,
+            "baud_rate": connection.baud_rate,
+            "queue": connection.scheduler.stats.as_dict(),
+            "cache": connection.cache.as_dict(),
+            "connection": connection.supervisor.as_dict(),
+            "deadlines": connection.deadlines.as_dict()
+        }
+        for name, connection in device_pool.connections.items()
+    }
+    return json.dumps(status, indent=2)
+
+async def list_tools_page(cursor: Optional[str]) -> types.ListToolsResult:
+    """One page of tools/list, tools_page_size tools starting at cursor."""
+    page_size = config.tools_page_size if TOOLS_PAGINATION_SUPPORTED else 0
+    tools, next_cursor = config.registry.page(cursor, page_size)
+    return types.ListToolsResult(tools=tools, nextCursor=next_cursor)
+
+async def _handle_list_tools_request(request: types.ListToolsRequest) -> types.ServerResult:
+    """tools/list handler with cursor pagination."""
+    global _session
+    try:
+        _session = server.request_context.session
+    except LookupError:
+        pass  # 不在 MCP 请求中调用（例如测试）
+    cursor = getattr(request.params, "cursor", None)
+    logger.debug("Listing available tools from cursor %r", cursor)
+    return types.ServerResult(await list_tools_page(cursor))
+
+# 注册分页的 tools/list 处理函数（Server.list_tools 装饰器不支持 cursor）
+server.request_handlers[types.ListToolsRequest] = _handle_list_tools_request
+
+async def handle_batch(arguments: Dict[str, Any]) -> list[types.TextContent]:
+    """Execute the commands of a batch tool call.
+
+    All entries are validated before anything is sent. Consecutive entries for
+    the same device are sent to it as one unit. Without stop_on_error the
+    devices involved run in parallel; with it, entries run in order and
+    everything after the first failure is skipped.
+    """
+    entries = arguments.get("commands")
+    stop_on_error = bool(arguments.get("stop_on_error", False))
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("batch requires a non-empty 'commands' list")
+
+    registry = config.registry
+    calls = []
+    problems = []
+    for i, entry in enumerate(entries, 1):
+        tool_name = entry.get("tool") if isinstance(entry, dict) else None
+        entry_args = (entry.get("arguments") or {}) if isinstance(entry, dict) else None
+        entry_tool = registry.get(tool_name)
+        if entry_tool is None:
+            problems.append(f"{i}. Unknown tool '{tool_name}'")
+            continue
+        if not isinstance(entry_args, dict):
+            problems.append(f"{i}. Arguments of {tool_name} must be an object")
+            continue
+        device, command = entry_tool.device, entry_tool.command
+        missing = [name for name in entry_tool.params if name not in entry_args]
+        if missing:
+            problems.append(f"{i}. {tool_name} is missing arguments: {', '.join(missing)}")
+            continue
+        calls.append((tool_name, device, command, entry_args))
+
+    if problems:
+        error_msg = f"[MCP2Serial v{VERSION}] Error: Invalid batch, nothing was sent\n"
+        error_msg += "\n".join(problems)
+        return [types.TextContent(
+            type="text",
+            text=error_msg
+        )]
+
+    results: List[Optional[list[types.TextContent]]] = [None] * len(calls)
+
+    async def run_group(indices: List[int]) -> None:
+        device = calls[indices[0]][1]
+        group = [(calls[i][2], calls[i][3]) for i in indices]
+        try:
+            group_results = await device_pool.get(device).send_batch_async(group, stop_on_error)
+        except Exception as e:
+            logger.error(f"Error running batch on device {device.name}: {str(e)}")
+            group_results = [[types.TextContent(type="text", text=f"[MCP2Serial v{VERSION}] Error: {str(e)}")]]
+        for i, result in zip(indices, group_results):
+            results[i] = result
+
+    if stop_on_error:
+        # 相邻的同一设备命令为一组，按顺序执行，出错后不再继续
+        start = 0
+        while start < len(calls):
+            end = start + 1
+            while end < len(calls) and calls[end][1].name == calls[start][1].name:
+                end += 1
+            await run_group(list(range(start, end)))
+            if any(results[i] is None or is_error_result(results[i]) for i in range(start, end)):
+                break
+            start = end
+    else:
+        groups: Dict[str, List[int]] = {}
+        for i, (_, device, _, _) in enumerate(calls):
+            groups.setdefault(device.name, []).append(i)
+        await asyncio.gather(*[run_group(indices) for indices in groups.values()])
+
+    contents = []
+    for i, (tool_name, _, command, _) in enumerate(calls):
+        result = results[i]
+        # 批量结果只报告设备响应，不报告单条命令的耗时明细
+        texts = [content.text for content in result or [] if not content.text.startswith(TIMING_PREFIX)]
+        if result is None:
+            text = "Skipped after a previous failure"
+        elif texts:
+            text = texts[0]
+        else:
+            text = "OK"
+        contents.append(types.TextContent(type="text", text=f"{i + 1}. {tool_name}: {text}"))
+    return contents
 
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: dict[str, Any] | None) -> list[types.TextContent]:
-    """Handle tool execution requests according to MCP protocol."""
-    logger.info(f"Tool call received - Name: {name}, Arguments: {arguments}")
+    """Handle tool execution requests according to MCP protocol and record their metrics."""
+    start = time.perf_counter()
+    result = await _call_tool(name, arguments)
+    # 只统计已知工具，避免未知工具名使指标无限增长
+    if name in config.registry or name in (BATCH_TOOL, DUMP_TOOL):
+        tool = tool_metrics.get(name)
+        if tool is None:
+            tool = tool_metrics[name] = ToolMetrics()
+        tool.record(time.perf_counter() - start, _outcome(result))
+    return result
+
+def _outcome(result: list[types.TextContent]) -> str:
+    """Classify a tool result for the metrics."""
+    if not is_error_result(result):
+        return SUCCESS
+    if result[0].text.startswith(f"[MCP2Serial v{VERSION}] Command timeout"):
+        return TIMEOUT
+    return FAILURE
+
+async def _call_tool(name: str, arguments: dict[str, Any] | None) -> list[types.TextContent]:
+    """Execute a tool call."""
+    logger.info("Tool call received - Name: %s, Arguments: %s", name, arguments)
     
     try:
-        if name not in config.commands:
+        entry = config.registry.get(name)
+        if entry is None and name == BATCH_TOOL:
+            return await handle_batch(arguments or {})
+        if entry is None and name == DUMP_TOOL:
+            arguments = arguments or {}
+            text = dump_traffic(arguments.get("device"), int(arguments.get("max_bytes", DEFAULT_DUMP_BYTES)))
+            return [types.TextContent(type="text", text=text)]
+
+        if entry is None:
             error_msg = f"[MCP2Serial v{VERSION}] Error: Unknown tool '{name}'\n"
             error_msg += "Please check:\n"
             error_msg += "1. Tool name is correct\n"
@@ -378,12 +1800,12 @@ async def handle_call_tool(name: str, arguments: dict[str, Any] | None) -> list[
                 text=error_msg
             )]
 
-        command = config.commands[name]
+        device, command = entry.device, entry.command
         if arguments is None:
             arguments = {}
         
-        # 发送命令并返回 MCP 格式的响应
-        return serial_connection.send_command(command, arguments)
+        # 发送命令并返回 MCP 格式的响应（在该设备的串口 I/O 线程中执行，不阻塞事件循环）
+        return await device_pool.get(device).send_command_async(command, arguments, name)
 
     except Exception as e:
         logger.error(f"Error handling tool call: {str(e)}")
@@ -396,12 +1818,87 @@ async def handle_call_tool(name: str, arguments: dict[str, Any] | None) -> list[
             text=error_msg
         )]
 
-async def main(config_name: str = None) -> None:
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """Modification time and size of a file, None if it cannot be read."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+async def reload_config() -> bool:
+    """Load the active config file again and apply the differences.
+
+    Tools whose command and device settings are unchanged are kept as they
+    are. Devices whose serial settings changed, or that were removed, have
+    their connection closed; the next call reconnects with the new settings.
+    Other connections stay open. Clients are notified when the tool or
+    resource list changed. A file that fails to load leaves the running
+    configuration in place.
+
+    Returns:
+        Whether the new configuration was applied
+    """
+    global config
+    if config.path is None:
+        return False
+    old_config = config
+    try:
+        new_config = Config.from_file(old_config.path, old_config.registry)
+    except Exception as e:
+        logger.warning(f"Keeping current configuration, error reloading {old_config.path}: {e}")
+        return False
+
+    devices = {device.name: device for device in new_config.device_configs()}
+    stale = []
+    for name, connection in list(device_pool.connections.items()):
+        device = devices.get(name)
+        if device is None or device.settings() != connection.device.settings():
+            stale.append(device_pool.connections.pop(name))
+        elif device.commands != connection.device.commands:
+            # 命令变化后缓存的结果可能不再适用
+            connection.device = device
+            connection.cache.invalidate()
+    config = new_config
+    for connection in stale:
+        logger.info(f"Settings of device {connection.device.name} changed, reconnecting")
+        await asyncio.to_thread(connection.close)
+
+    old_tools, new_tools = old_config.registry, new_config.registry
+    reused = sum(1 for name in new_tools if new_tools.get(name) is old_tools.get(name))
+    logger.info(f"Reloaded configuration from {new_config.path}: {len(new_tools)} tools, "
+                f"{len(new_tools) - reused} added or changed, "
+                f"{sum(1 for name in old_tools if name not in new_tools)} removed")
+    if _session is not None:
+        try:
+            if new_tools.tool_list != old_tools.tool_list:
+                await _session.send_tool_list_changed()
+            if [d.name for d in new_config.device_configs()] != [d.name for d in old_config.device_configs()]:
+                await _session.send_resource_list_changed()
+        except Exception as e:
+            logger.warning(f"Could not notify client of configuration change: {e}")
+    return True
+
+async def watch_config(interval: float = CONFIG_POLL_INTERVAL) -> None:
+    """Reload the configuration whenever its file changes."""
+    signature = _file_signature(config.path)
+    while True:
+        await asyncio.sleep(interval)
+        current = _file_signature(config.path)
+        if current is not None and current != signature:
+            signature = current
+            await reload_config()
+
+async def main(config_name: str = None, log_level: Optional[str] = None) -> None:
     """Run the MCP server.
     
     Args:
         config_name: Optional configuration name. If not provided, uses default config.yaml
+        log_level: Optional log level. Overrides MCP2SERIAL_LOG_LEVEL and log_level in the config file
     """
+    # 日志级别优先级：命令行参数 > 环境变量 > 配置文件 > INFO
+    explicit_level = log_level or os.environ.get("MCP2SERIAL_LOG_LEVEL")
+    log_listener = setup_logging(explicit_level or DEFAULT_LOG_LEVEL)
     logger.info("Starting MCP2Serial server")
     
     # 处理配置文件名
@@ -414,6 +1911,25 @@ async def main(config_name: str = None) -> None:
     # 加载配置
     global config
     config = Config.load(config_name)
+    if not explicit_level and config.log_level:
+        # 配置文件中的拼写错误只记录警告，不影响启动
+        level = resolve_log_level(config.log_level)
+        if level is None:
+            logger.warning(f"Unknown log_level {config.log_level!r} in {config.path}, keeping {DEFAULT_LOG_LEVEL}")
+        else:
+            logging.getLogger().setLevel(level)
+    watcher = asyncio.create_task(watch_config()) if config.path is not None else None
+    if config.trace_enabled:
+        tracer.configure(True, config.trace_file, config.trace_in_result)
+    metrics_writer = None
+    if config.metrics_file:
+        metrics_writer = asyncio.create_task(write_metrics_file(config.metrics_file, config.metrics_interval))
+    metrics_server = None
+    if config.metrics_port is not None:
+        try:
+            metrics_server = metrics.serve_http(config.metrics_port, prometheus_metrics)
+        except OSError as e:
+            logger.error(f"Could not serve metrics on port {config.metrics_port}: {e}")
     
     try:
         async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
@@ -424,7 +1940,7 @@ async def main(config_name: str = None) -> None:
                     server_name="mcp2serial",
                     server_version=VERSION,
                     capabilities=server.get_capabilities(
-                        notification_options=NotificationOptions(),
+                        notification_options=NotificationOptions(tools_changed=True, resources_changed=True),
                         experimental_capabilities={},
                     ),
                 ),
@@ -432,7 +1948,15 @@ async def main(config_name: str = None) -> None:
     except Exception as e:
         logger.error(f"Server error: {e}")
     finally:
-        serial_connection.close()
+        if watcher is not None:
+            watcher.cancel()
+        if metrics_writer is not None:
+            metrics_writer.cancel()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        device_pool.close()
+        tracer.close()
+        log_listener.stop()
 
 if __name__ == "__main__":
     import sys
@@ -0,0 +1,417 @@
+# ====================================================
+# Project: MCP2Serial
+# Description: A protocol conversion tool that enables 
+#              hardware devices to communicate with 
+#              large language models (LLM) through serial ports.
+# Repository: https://github.com/mcp2everything/mcp2serial.git
+# License: MIT License
+# Author: mcp2everything
+# Copyright (c) 2024 mcp2everything
+#
+# Permission is hereby granted, free of charge, to any person 
+# obtaining a copy of this software and associated documentation 
+# files (the "Software"), to deal in the Software without restriction, 
+# including without limitation the rights to use, copy, modify, merge, 
+# publish, distribute, sublicense, and/or sell copies of the Software, 
+# and to permit persons to whom the Software is furnished to do so, 
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be 
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. 
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, 
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS 
+# IN THE SOFTWARE.
+"""Simulated reference-firmware device on a pseudo-terminal.
+
+DeviceSimulator opens a pty pair and answers on the master side the way
+firmware/src/main.py does: "PWM <duty>", "PICO_INFO" and "LED <on|off>" text
+commands, "#<seq> " pipeline tags, the BINARY switch to COBS frames with
+CRC16, and BAUD rate queries and switches. The slave side is a normal
+serial port path such as /dev/pts/7 that the server opens like a real
+board. Latency, jitter, a baud-rate throughput cap, partial writes, NG
+replies, dropped and corrupted replies, unsolicited output and baud-rate
+mismatches can all be configured, so the request path can be tested and
+load-tested without hardware. Every instance has its own pty and thread;
+run as many as needed at once.
+
+    python -m mcp2serial.simulator --count 3 --latency-ms 5
+"""
+from typing import Deque, Dict, List, Optional, Tuple
+from collections import deque
+import argparse
+import logging
+import os
+import random
+import select
+import termios
+import threading
+import time
+import tty
+
+from . import binary
+from .baud import STANDARD_BAUD_RATES
+
+logger = logging.getLogger(__name__)
+
+# 读取主机数据时检查停止标志的间隔（秒）
+POLL_INTERVAL = 0.05
+# 保留的最近收到的命令数
+RECEIVED_HISTORY = 256
+# BAUD 查询在未限制速率时报告的波特率
+DEFAULT_BAUD_RATE = 115200
+# 主机端串口设置的 termios 速率常量到波特率的映射
+_TERMIOS_RATES = {getattr(termios, f"B{rate}"): rate for rate in STANDARD_BAUD_RATES if hasattr(termios, f"B{rate}")}
+
+
+class DeviceSimulator:
+    """One simulated board behind a pseudo-terminal.
+
+    Args:
+        name: Board name reported by PICO_INFO
+        latency: Seconds before every reply
+        command_latency: Per-command latency overriding latency, keyed by PWM / PICO_INFO / LED
+        jitter: Random extra latency, uniformly 0..jitter seconds
+        baud_rate: UART rate of the board; output is capped at baud_rate / 10 bytes per second and
+            "BAUD <rate>" changes it (None = as fast as possible, like USB, where BAUD changes nothing)
+        write_chunk: Write replies in pieces of this many bytes (0 = one write per reply)
+        echo: Echo every received line back, like a REPL
+        ng_rate: Probability that a valid command is answered with NG
+        drop_rate: Probability that a command gets no reply at all
+        corrupt_rate: Probability that one byte of a reply is flipped
+        unsolicited_interval: Emit a LOG line every this many seconds (0 = never)
+        seed: Seed of the random source for reproducible faults
+        strict_baud: Garble all traffic while the host's port is set to a rate other than baud_rate
+        unreliable_above: Garble all traffic while baud_rate is above this, like an adapter that cannot keep up
+        baud_confirm_timeout: Seconds after a switch within which a recognised command must arrive at the
+            new rate; otherwise the previous rate is restored, as the firmware does
+    """
+
+    def __init__(self, name: str = "Simulated Pico", latency: float = 0.0,
+                 command_latency: Optional[Dict[str, float]] = None, jitter: float = 0.0,
+                 baud_rate: Optional[int] = None, write_chunk: int = 0, echo: bool = False,
+                 ng_rate: float = 0.0, drop_rate: float = 0.0, corrupt_rate: float = 0.0,
+                 unsolicited_interval: float = 0.0, seed: Optional[int] = None,
+                 strict_baud: bool = False, unreliable_above: Optional[int] = None,
+                 baud_confirm_timeout: float = 2.0):
+        self.name = name
+        self.latency = latency
+        self.command_latency = dict(command_latency or {})
+        self.jitter = jitter
+        self.baud_rate = baud_rate
+        self.write_chunk = write_chunk
+        self.echo = echo
+        self.ng_rate = ng_rate
+        self.drop_rate = drop_rate
+        self.corrupt_rate = corrupt_rate
+        self.unsolicited_interval = unsolicited_interval
+        self.random = random.Random(seed)
+        self.strict_baud = strict_baud
+        self.unreliable_above = unreliable_above
+        self.baud_confirm_timeout = baud_confirm_timeout
+        self._baud_fallback: Optional[int] = None  # 切换后等待确认期间为原速率
+        self._baud_deadline = 0.0
+        # 模拟的设备状态
+        self.duty = 50
+        self.led = False
+        self.binary_mode = False
+        self.commands_handled = 0
+        self._last_seq: Optional[int] = None  # 二进制模式下上一个请求的序号和应答帧
+        self._last_frame = b""
+        self.received: Deque[bytes] = deque(maxlen=RECEIVED_HISTORY)  # 最近收到的命令行或帧，便于测试检查
+        self.port: Optional[str] = None
+        self._master: Optional[int] = None
+        self._slave: Optional[int] = None
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> str:
+        """Open the pty and start answering. Returns the port path for the server."""
+        self._master, self._slave = os.openpty()
+        # 主机打开串口前保持原始模式，避免行规程回显或转换换行
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._run, name=f"simulator-{self.port}", daemon=True)]
+        if self.unsolicited_interval > 0:
+            self._threads.append(threading.Thread(
+                target=self._chatter, name=f"simulator-log-{self.port}", daemon=True
+            ))
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Simulated device {self.name} on {self.port}")
+        return self.port
+
+    def stop(self) -> None:
+        """Stop answering and close the pty."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        for fd in (self._slave, self._master):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def __enter__(self) -> 'DeviceSimulator':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def handle_command(self, command: str) -> Optional[str]:
+        """Reply to one text command, as handle_command in the firmware; None for unknown commands."""
+        if command.startswith("PWM"):
+            try:
+                duty = float(command.split(" ")[1])
+            except (IndexError, ValueError):
+                return "NG"
+            if not 0 <= duty <= 100:
+                return "NG"
+            self.duty = int(duty)
+            return "OK"
+        if command.strip() == "PICO_INFO":
+            return (f"OK Board: {self.name}, MicroPython: simulated, Freq: 125 MHz, "
+                    f"Memory: 233024 bytes, Disk: Total 1441792 bytes, Free 1396736 bytes")
+        if command.startswith("LED"):
+            state = command[3:].strip().lower()
+            if state not in ("on", "off", "1", "0"):
+                return "NG"
+            self.led = state in ("on", "1")
+            return "OK"
+        return None
+
+    def _host_rate(self) -> Optional[int]:
+        """Baud rate the host has set on its side of the pty (None if not a standard rate)."""
+        return _TERMIOS_RATES.get(termios.tcgetattr(self._slave)[5])
+
+    def _garbled(self) -> bool:
+        """Whether traffic is currently unreadable: mismatched rates or a rate the link cannot carry."""
+        if not self.baud_rate:
+            return False
+        if self.unreliable_above and self.baud_rate > self.unreliable_above:
+            return True
+        return self.strict_baud and self._host_rate() != self.baud_rate
+
+    def _handle_baud(self, line: str) -> None:
+        """Answer "BAUD" with the current rate, or switch to the rate of "BAUD <rate>" after replying."""
+        parts = line.split()
+        if len(parts) == 1:
+            self._confirm_baud()
+            self.write(f"OK {self.baud_rate or DEFAULT_BAUD_RATE}\r\n".encode())
+            return
+        try:
+            rate = int(parts[1])
+        except ValueError:
+            rate = None
+        if rate not in STANDARD_BAUD_RATES:
+            self.write(b"NG\r\n")
+            return
+        self.write(f"OK {rate}\r\n".encode())
+        if self.baud_rate and rate != self.baud_rate:
+            if self._baud_fallback is None:
+                self._baud_fallback = self.baud_rate
+            self.baud_rate = rate
+            self._baud_deadline = time.monotonic() + self.baud_confirm_timeout
+
+    def _confirm_baud(self) -> None:
+        self._baud_fallback = None
+
+    def _check_baud_fallback(self) -> None:
+        """Return to the previous rate if a switch was not confirmed in time."""
+        if self._baud_fallback is not None and time.monotonic() >= self._baud_deadline:
+            self.baud_rate, self._baud_fallback = self._baud_fallback, None
+
+    def _delay(self, command: str) -> None:
+        """Sleep for the configured latency of a command."""
+        name = command.split(" ", 1)[0].strip()
+        delay = self.command_latency.get(name, self.latency)
+        if self.jitter:
+            delay += self.random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _reply(self, command: str) -> Tuple[bool, Optional[str]]:
+        """Reply to a command with faults applied.
+
+        Returns:
+            Whether the reply is dropped, and the reply (None for unknown commands)
+        """
+        self.commands_handled += 1
+        self._delay(command)
+        if self.drop_rate and self.random.random() < self.drop_rate:
+            return True, None
+        reply = self.handle_command(command)
+        if reply is not None:
+            self._confirm_baud()
+        if reply is not None and reply.startswith("OK") and self.ng_rate and self.random.random() < self.ng_rate:
+            reply = "NG"
+        return False, reply
+
+    def _corrupt(self, data: bytes) -> bytes:
+        """Flip one bit of a reply with probability corrupt_rate, keeping line and frame delimiters."""
+        if not self.corrupt_rate or self.random.random() >= self.corrupt_rate:
+            return data
+        body_length = len(data.rstrip(b"\r\n\x00"))
+        if not body_length:
+            return data
+        index = self.random.randrange(body_length)
+        corrupted = bytearray(data)
+        corrupted[index] ^= 0x01 if corrupted[index] != 0x01 else 0x02
+        return bytes(corrupted)
+
+    def write(self, data: bytes) -> None:
+        """Send bytes to the host, paced by baud_rate and split by write_chunk."""
+        if self._garbled():
+            data = b"\xff" * len(data)  # 波特率不匹配时主机只能收到帧错误
+        chunk_size = self.write_chunk or len(data)
+        with self._write_lock:
+            for start in range(0, len(data), chunk_size):
+                chunk = data[start:start + chunk_size]
+                if self.baud_rate:
+                    # 数据在线路上传输完毕后才到达主机，每字节 10 位（8N1）
+                    time.sleep(len(chunk) * 10 / self.baud_rate)
+                elif self.write_chunk and start:
+                    time.sleep(0.001)  # 让主机有机会读到不完整的应答
+                os.write(self._master, chunk)
+
+    def _run(self) -> None:
+        """Reader thread: split host input into lines or frames and answer them."""
+        pending = b""
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._master], [], [], POLL_INTERVAL)
+            self._check_baud_fallback()
+            if not ready:
+                continue
+            try:
+                pending += os.read(self._master, 4096)
+            except OSError:
+                # 主机关闭串口时读取会失败，等待重新打开
+                time.sleep(POLL_INTERVAL)
+                continue
+            while True:
+                separator = binary.FRAME_DELIMITER if self.binary_mode else b"\n"
+                end = pending.find(separator)
+                if end < 0:
+                    break
+                unit, pending = pending[:end], pending[end + 1:]
+                if self._garbled():
+                    continue  # 以错误速率收到的数据无法识别
+                if self.binary_mode:
+                    self._handle_frame(unit)
+                else:
+                    self._handle_line(unit)
+
+    def _handle_line(self, raw: bytes) -> None:
+        """Answer one text line, with an optional "#<seq> " pipeline tag."""
+        line = raw.decode("utf-8", errors="replace").strip("\x00\r\n ")
+        if not line:
+            return
+        self.received.append(raw)
+        if self.echo:
+            self.write(raw.rstrip(b"\r").lstrip(b"\x00") + b"\r\n")
+        if line == "BINARY":
+            self.binary_mode = True
+            self.write(b"OK\r\n")
+            return
+        if line.split(" ", 1)[0] == "BAUD":
+            self._handle_baud(line)
+            return
+        tag = ""
+        if line.startswith("#"):
+            tag, _, line = line.partition(" ")
+            tag += " "
+        dropped, reply = self._reply(line)
+        if dropped or (reply is None and not tag):
+            return
+        if reply is None:
+            reply = "NG"  # 带标签的未知命令必须应答
+        self.write(self._corrupt(f"{tag}{reply}\r\n".encode()))
+
+    def _handle_frame(self, raw: bytes) -> None:
+        """Answer one binary frame like binary_loop in the firmware."""
+        if not raw.strip():
+            return
+        self.received.append(raw)
+        if raw.strip() == binary.BINARY_MODE_COMMAND:
+            self.write(b"OK\r\n")
+            return
+        if raw.strip().startswith(b"BAUD"):
+            self._handle_baud(raw.strip().decode("utf-8", errors="replace"))
+            return
+        try:
+            payload = binary.decode_frame(raw)
+        except binary.FrameError:
+            self.write(binary.encode_frame(bytes([0xFF, binary.STATUS_NAK])))
+            return
+        seq = payload[0]
+        if seq == self._last_seq:
+            # 重发的请求只重发上次的应答
+            self.write(self._corrupt(self._last_frame))
+            return
+        dropped, reply = self._reply(payload[1:].decode("utf-8", errors="replace"))
+        if dropped:
+            return
+        self._confirm_baud()
+        status = binary.STATUS_OK if reply and reply.startswith("OK") else binary.STATUS_NG
+        self._last_seq = seq
+        self._last_frame = binary.encode_frame(bytes([seq, status]) + (reply or "NG").encode())
+        self.write(self._corrupt(self._last_frame))
+
+    def _chatter(self) -> None:
+        """Unsolicited output thread: periodic log lines the host has to skip."""
+        count = 0
+        while not self._stop.wait(self.unsolicited_interval):
+            if self.binary_mode:
+                continue  # 二进制模式下没有文本输出
+            count += 1
+            self.write(f"LOG heartbeat {count} duty={self.duty}\r\n".encode())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run simulated MCP2Serial reference devices on pseudo-terminals")
+    parser.add_argument("--count", type=int, default=1, help="Number of simulated devices")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--baud-rate", type=int, default=None, help="Throughput cap (bits per second)")
+    parser.add_argument("--write-chunk", type=int, default=0, help="Split replies into writes of this many bytes")
+    parser.add_argument("--echo", action="store_true", help="Echo received lines like a REPL")
+    parser.add_argument("--ng-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--corrupt-rate", type=float, default=0.0)
+    parser.add_argument("--unsolicited-interval", type=float, default=0.0, help="Seconds between LOG lines")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--strict-baud", action="store_true",
+                        help="Ignore traffic while the host's baud rate differs from --baud-rate")
+    args = parser.parse_args()
+
+    simulators = [
+        DeviceSimulator(
+            name=f"Simulated Pico {i + 1}", latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+            baud_rate=args.baud_rate, write_chunk=args.write_chunk, echo=args.echo,
+            ng_rate=args.ng_rate, drop_rate=args.drop_rate, corrupt_rate=args.corrupt_rate,
+            unsolicited_interval=args.unsolicited_interval,
+            seed=None if args.seed is None else args.seed + i, strict_baud=args.strict_baud
+        )
+        for i in range(args.count)
+    ]
+    for simulator in simulators:
+        print(f"{simulator.name}: {simulator.start()}", flush=True)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for simulator in simulators:
+            simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
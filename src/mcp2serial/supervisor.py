@@ -0,0 +1,162 @@
+# ====================================================
+# Project: MCP2Serial
+# Description: A protocol conversion tool that enables 
+#              hardware devices to communicate with 
+#              large language models (LLM) through serial ports.
+# Repository: https://github.com/mcp2everything/mcp2serial.git
+# License: MIT License
+# Author: mcp2everything
+# Copyright (c) 2024 mcp2everything
+#
+# Permission is hereby granted, free of charge, to any person 
+# obtaining a copy of this software and associated documentation 
+# files (the "Software"), to deal in the Software without restriction, 
+# including without limitation the rights to use, copy, modify, merge, 
+# publish, distribute, sublicense, and/or sell copies of the Software, 
+# and to permit persons to whom the Software is furnished to do so, 
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be 
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. 
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, 
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS 
+# IN THE SOFTWARE.
+from typing import Any, Callable, Dict, Optional
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceUnavailableError(Exception):
+    """Raised for calls on a device that is disconnected and being reconnected."""
+
+
+class Backoff:
+    """Exponential backoff delays between initial and maximum seconds."""
+
+    def __init__(self, initial: float = 0.5, maximum: float = 30.0, factor: float = 2.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self._next = initial
+
+    def next(self) -> float:
+        """Delay before the next attempt; each call grows the following one."""
+        delay = self._next
+        self._next = min(self._next * self.factor, self.maximum)
+        return delay
+
+    def reset(self) -> None:
+        self._next = self.initial
+
+
+class ConnectionSupervisor:
+    """Background thread that tracks whether a device is reachable.
+
+    While the device is up it periodically runs ``check``; a failed check, or
+    an I/O error reported through mark_down, marks the device down. While it
+    is down the thread calls ``reconnect`` with exponential backoff until it
+    succeeds. Callers look at ``is_down`` to fail fast instead of waiting for
+    a timeout on a dead port.
+    """
+
+    def __init__(self, name: str, reconnect: Callable[[], Any], check: Callable[[], bool],
+                 backoff: Optional[Backoff] = None, check_interval: float = 5.0):
+        self.name = name
+        self._reconnect = reconnect  # 失败时抛出异常
+        self._check = check  # 返回 False 表示设备已不可用
+        self.backoff = backoff or Backoff()
+        self.check_interval = check_interval
+        self.reconnects = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._down_since: Optional[float] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @property
+    def is_down(self) -> bool:
+        return self._down_since is not None
+
+    def start(self) -> None:
+        """Start the supervising thread if it is not running."""
+        with self._lock:
+            if self._closed or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"mcp2serial-supervisor-{self.name}", daemon=True)
+            self._thread.start()
+
+    def mark_down(self, reason: str) -> None:
+        """Record that the device was lost and start reconnecting in the background."""
+        with self._lock:
+            if self._down_since is None:
+                logger.warning(f"Device {self.name} lost: {reason}")
+                self._down_since = time.monotonic()
+                self.failures += 1
+            self.last_error = reason
+        self._wake.set()
+        self.start()
+
+    def _mark_up(self) -> None:
+        with self._lock:
+            down_for = time.monotonic() - self._down_since
+            self._down_since = None
+            self.reconnects += 1
+            self.backoff.reset()
+        logger.info(f"Device {self.name} reconnected after {down_for:.1f}s")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self.is_down:
+                try:
+                    self._reconnect()
+                except Exception as e:
+                    delay = self.backoff.next()
+                    self.last_error = str(e)
+                    logger.debug(f"Reconnecting device {self.name} failed, retrying in {delay:.1f}s: {e}")
+                    self._stop.wait(delay)
+                    continue
+                self._mark_up()
+                continue
+            self._wake.wait(self.check_interval)
+            self._wake.clear()
+            if self._stop.is_set() or self.is_down:
+                continue
+            try:
+                healthy = self._check()
+                reason = "health check failed"
+            except Exception as e:
+                healthy, reason = False, f"health check failed: {e}"
+            if not healthy:
+                self.mark_down(reason)
+
+    def close(self) -> None:
+        """Stop the supervising thread for good."""
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            self._closed = True
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def as_dict(self) -> Dict[str, Any]:
+        down_since = self._down_since
+        return {
+            "state": "down" if down_since is not None else "up",
+            "down_for": round(time.monotonic() - down_since, 3) if down_since is not None else 0.0,
+            "failures": self.failures,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
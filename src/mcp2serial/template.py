@@ -0,0 +1,90 @@
+# ====================================================
+# Project: MCP2Serial
+# Description: A protocol conversion tool that enables 
+#              hardware devices to communicate with 
+#              large language models (LLM) through serial ports.
+# Repository: https://github.com/mcp2everything/mcp2serial.git
+# License: MIT License
+# Author: mcp2everything
+# Copyright (c) 2024 mcp2everything
+#
+# Permission is hereby granted, free of charge, to any person 
+# obtaining a copy of this software and associated documentation 
+# files (the "Software"), to deal in the Software without restriction, 
+# including without limitation the rights to use, copy, modify, merge, 
+# publish, distribute, sublicense, and/or sell copies of the Software, 
+# and to permit persons to whom the Software is furnished to do so, 
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be 
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. 
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, 
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS 
+# IN THE SOFTWARE.
+from typing import Any, Dict, List, Optional, Tuple
+from string import Formatter
+
+DEFAULT_LINE_ENDING = "\r\n"
+DEFAULT_ENCODING = "utf-8"
+
+
+class CommandTemplate:
+    """A command template compiled into fixed byte segments and parameter slots.
+
+    "PWM {frequency}" with line ending "\\r\\n" compiles to the parts
+    [prefix, b"PWM ", <frequency>, b"\\r\\n"]. Rendering a call encodes only the
+    argument values and joins the parts once; literal text is encoded at
+    compile time. Like the original str.format based path, trailing
+    whitespace of the command is removed before the line ending is added.
+    """
+
+    __slots__ = ("template", "params", "encoding", "line_ending", "_parts", "_slots", "_strip_tail")
+
+    def __init__(self, template: str, line_ending: str = DEFAULT_LINE_ENDING, encoding: str = DEFAULT_ENCODING):
+        self.template = template
+        self.encoding = encoding
+        self.line_ending = line_ending.encode(encoding)
+        parts: List[bytes] = [b""]  # parts[0] 预留给流水线标签等前缀
+        slots: List[Tuple[int, str, str, Optional[str]]] = []
+        params: List[str] = []
+        parsed = list(Formatter().parse(template))
+        for i, (literal, name, spec, conversion) in enumerate(parsed):
+            if i == len(parsed) - 1 and name is None:
+                literal = literal.rstrip()  # 末尾的固定文本在编译时去掉空白
+            if literal:
+                parts.append(literal.encode(encoding))
+            if name is not None:
+                if not name or not name.isidentifier():
+                    raise ValueError(f"Unsupported placeholder {{{name}}} in command template {template!r}")
+                slots.append((len(parts), name, spec or "", conversion))
+                parts.append(b"")
+                if name not in params:
+                    params.append(name)
+        # 最后一个非空片段是参数时（包括 "PWM {x} " 这类末尾空白已去掉的模板），
+        # 参数值末尾的空白只能在渲染时去掉
+        self._strip_tail = bool(slots) and slots[-1][0] == len(parts) - 1
+        self._parts = parts
+        self._slots = tuple(slots)
+        self.params = tuple(params)
+
+    def render(self, arguments: Dict[str, Any], prefix: bytes = b"") -> bytes:
+        """Encode one command line, including prefix and line ending."""
+        parts = self._parts.copy()
+        parts[0] = prefix
+        for index, name, spec, conversion in self._slots:
+            value = arguments[name]
+            if conversion == "r":
+                value = repr(value)
+            elif conversion == "a":
+                value = ascii(value)
+            text = format(value, spec) if spec or not isinstance(value, str) else value
+            parts[index] = text.encode(self.encoding)
+        if self._strip_tail:
+            return b"".join(parts).rstrip() + self.line_ending
+        parts.append(self.line_ending)
+        return b"".join(parts)
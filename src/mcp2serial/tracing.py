@@ -0,0 +1,226 @@
+# ====================================================
+# Project: MCP2Serial
+# Description: A protocol conversion tool that enables 
+#              hardware devices to communicate with 
+#              large language models (LLM) through serial ports.
+# Repository: https://github.com/mcp2everything/mcp2serial.git
+# License: MIT License
+# Author: mcp2everything
+# Copyright (c) 2024 mcp2everything
+#
+# Permission is hereby granted, free of charge, to any person 
+# obtaining a copy of this software and associated documentation 
+# files (the "Software"), to deal in the Software without restriction, 
+# including without limitation the rights to use, copy, modify, merge, 
+# publish, distribute, sublicense, and/or sell copies of the Software, 
+# and to permit persons to whom the Software is furnished to do so, 
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be 
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. 
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, 
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, 
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS 
+# IN THE SOFTWARE.
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 附加到工具结果中的耗时明细以此开头，缓存结果时去掉
+TIMING_PREFIX = "[MCP2Serial timing]"
+
+
+class _Span:
+    """Context manager timing one phase of a trace."""
+
+    __slots__ = ("trace", "phase", "start")
+
+    def __init__(self, trace: 'Trace', phase: str):
+        self.trace = trace
+        self.phase = phase
+
+    def __enter__(self) -> '_Span':
+        self.start = time.monotonic_ns()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.trace.add(self.phase, self.start, time.monotonic_ns())
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    """Monotonic nanosecond timestamps of the phases of one serial transaction."""
+
+    __slots__ = ("name", "device", "start", "end", "tid", "spans")
+
+    def __init__(self, name: str, device: str):
+        self.name = name
+        self.device = device
+        self.start = time.monotonic_ns()
+        self.end: Optional[int] = None
+        self.tid = threading.get_ident()
+        self.spans: List[Tuple[str, int, int]] = []
+
+    def __bool__(self) -> bool:
+        return True
+
+    def span(self, phase: str) -> _Span:
+        """Time the enclosed block as one phase."""
+        return _Span(self, phase)
+
+    def add(self, phase: str, start: int, end: int) -> None:
+        self.spans.append((phase, start, end))
+
+    def finish(self) -> None:
+        self.end = time.monotonic_ns()
+
+    def breakdown(self) -> Dict[str, float]:
+        """Milliseconds spent in each phase (summed over repeats), plus the total."""
+        phases: Dict[str, float] = {}
+        for phase, start, end in self.spans:
+            phases[phase] = phases.get(phase, 0.0) + (end - start) / 1e6
+        phases["total"] = ((self.end or time.monotonic_ns()) - self.start) / 1e6
+        return phases
+
+    def summary(self) -> str:
+        """One-line breakdown, e.g. 'queue=0.021ms write=0.140ms read=4.822ms total=5.101ms'."""
+        return " ".join(f"{phase}={ms:.3f}ms" for phase, ms in self.breakdown().items())
+
+    def events(self, pid: int) -> List[Dict[str, Any]]:
+        """The trace as complete ("X") events of the Trace Event Format, timestamps in microseconds."""
+        end = self.end or time.monotonic_ns()
+        events = [{
+            "name": self.name, "cat": "transaction", "ph": "X", "pid": pid, "tid": self.tid,
+            "ts": self.start / 1000, "dur": (end - self.start) / 1000, "args": {"device": self.device}
+        }]
+        for phase, start, span_end in self.spans:
+            events.append({
+                "name": phase, "cat": "phase", "ph": "X", "pid": pid, "tid": self.tid,
+                "ts": start / 1000, "dur": (span_end - start) / 1000
+            })
+        return events
+
+
+class NullTrace:
+    """Trace used while tracing is off; every operation is a no-op."""
+
+    __slots__ = ()
+
+    def __bool__(self) -> bool:
+        return False
+
+    def span(self, phase: str) -> _NullSpan:
+        return _NULL_SPAN
+
+    def add(self, phase: str, start: int, end: int) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+
+class TraceWriter:
+    """Stream trace events to a JSON file that chrome://tracing and Perfetto can open.
+
+    The file is a JSON array of events. The closing bracket is written by
+    close(); viewers also load a file whose writer was killed before that.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+        self._file.write("[")
+        self._first = True
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._named_threads: Dict[int, str] = {}
+
+    def _write_event(self, event: Dict[str, Any]) -> None:
+        self._file.write("\n" if self._first else ",\n")
+        self._first = False
+        self._file.write(json.dumps(event, separators=(",", ":")))
+
+    def write(self, trace: Trace) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            if self._named_threads.get(trace.tid) != trace.device:
+                # 线程名元数据事件，让查看器按设备显示各 I/O 线程
+                self._named_threads[trace.tid] = trace.device
+                self._write_event({"name": "thread_name", "ph": "M", "pid": self._pid, "tid": trace.tid,
+                                   "args": {"name": trace.device}})
+            for event in trace.events(self._pid):
+                self._write_event(event)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.write("\n]\n")
+                self._file.close()
+                self._file = None
+
+
+class Tracer:
+    """Starts traces while tracing is enabled and reports the finished ones."""
+
+    def __init__(self):
+        self.enabled = False
+        self.include_in_result = False
+        self.writer: Optional[TraceWriter] = None
+
+    def configure(self, enabled: bool, path: Optional[str] = None, include_in_result: bool = False) -> None:
+        """Turn tracing on or off; path receives the trace events, include_in_result adds timings to tool results."""
+        self.close()
+        self.enabled = enabled
+        self.include_in_result = enabled and include_in_result
+        if enabled and path:
+            try:
+                self.writer = TraceWriter(path)
+                logger.info(f"Writing transaction traces to {path}")
+            except OSError as e:
+                logger.error(f"Could not open trace file {path}: {e}")
+
+    def start(self, name: str, device: str) -> Any:
+        """A new Trace, or NULL_TRACE while tracing is off."""
+        if not self.enabled:
+            return NULL_TRACE
+        return Trace(name, device)
+
+    def record(self, trace: Trace) -> None:
+        """Log a finished trace and append it to the trace file."""
+        logger.debug("Timing of %s on device %s: %s", trace.name, trace.device, trace.summary())
+        if self.writer is not None:
+            try:
+                self.writer.write(trace)
+            except OSError as e:
+                logger.warning(f"Could not write trace file {self.writer.path}: {e}")
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
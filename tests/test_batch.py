@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+import mcp.types as types
+
+from mcp2serial import server
+from mcp2serial.server import SerialConnection, Config, Command, DeviceConfig, DevicePool
+
+
+@pytest.fixture
+def config(monkeypatch):
+    config = Config(port="LOOP_BACK")
+    config.commands["set_pwm"] = Command(command="PWM {frequency}", need_parse=False, prompts=[])
+    config.commands["get_pico_info"] = Command(command="PICO_INFO", need_parse=True, prompts=[])
+    config.devices["pico2"] = DeviceConfig(name="pico2", port="LOOP_BACK", commands={
+        "led_control": Command(command="LED {state}", need_parse=False, prompts=[])
+    })
+    monkeypatch.setattr(server, "config", config)
+    pool = DevicePool()
+    monkeypatch.setattr(server, "device_pool", pool)
+    yield config
+    pool.close()
+
+
+def list_tools():
+    request = types.ListToolsRequest(method="tools/list")
+    return asyncio.run(server.server.request_handlers[types.ListToolsRequest](request)).root.tools
+
+
+def call_batch(arguments):
+    return asyncio.run(server.handle_call_tool("batch", arguments))
+
+
+def test_batch_tool_listed(config):
+    tools = {tool.name: tool for tool in list_tools()}
+    assert "commands" in tools["batch"].inputSchema["properties"]
+
+
+def test_batch_returns_one_result_per_entry(config):
+    results = call_batch({"commands": [
+        {"tool": "set_pwm", "arguments": {"frequency": "50"}},
+        {"tool": "pico2_led_control", "arguments": {"state": "on"}},
+        {"tool": "get_pico_info"},
+    ]})
+    assert [result.text for result in results] == [
+        "1. set_pwm: OK",
+        "2. pico2_led_control: OK",
+        "3. get_pico_info: OK",
+    ]
+    assert set(server.device_pool.connections) == {"default", "pico2"}
+
+
+def test_batch_validates_before_sending(config, monkeypatch):
+    sent = []
+    monkeypatch.setattr(SerialConnection, "send_command", lambda self, command, arguments: sent.append(command))
+    results = call_batch({"commands": [
+        {"tool": "set_pwm", "arguments": {}},
+        {"tool": "unknown"},
+    ]})
+    assert len(results) == 1
+    assert "missing arguments: frequency" in results[0].text
+    assert "Unknown tool 'unknown'" in results[0].text
+    assert sent == []
+
+
+def test_batch_stop_on_error(config, monkeypatch):
+    original = SerialConnection.send_command
+
+    def failing_pwm(self, command, arguments):
+        if command.command.startswith("PWM"):
+            return [server.types.TextContent(type="text", text=f"[MCP2Serial v{server.VERSION}] Command execution failed.")]
+        return original(self, command, arguments)
+
+    monkeypatch.setattr(SerialConnection, "send_command", failing_pwm)
+    entries = [
+        {"tool": "get_pico_info"},
+        {"tool": "set_pwm", "arguments": {"frequency": "50"}},
+        {"tool": "get_pico_info"},
+        {"tool": "pico2_led_control", "arguments": {"state": "on"}},
+    ]
+
+    results = call_batch({"commands": entries, "stop_on_error": True})
+    texts = [result.text for result in results]
+    assert texts[0] == "1. get_pico_info: OK"
+    assert "Command execution failed" in texts[1]
+    assert texts[2] == "3. get_pico_info: Skipped after a previous failure"
+    assert texts[3] == "4. pico2_led_control: Skipped after a previous failure"
+
+    results = call_batch({"commands": entries})
+    assert results[2].text == "3. get_pico_info: OK"
+    assert results[3].text == "4. pico2_led_control: OK"
+
+
+def test_batch_reports_response_not_timing(config, monkeypatch):
+    def timed_send_command(self, command, arguments):
+        return [server.types.TextContent(type="text", text=f"{server.TIMING_PREFIX} total=1.0ms")]
+
+    monkeypatch.setattr(SerialConnection, "send_command", timed_send_command)
+    results = call_batch({"commands": [{"tool": "set_pwm", "arguments": {"frequency": "50"}}]})
+    assert [result.text for result in results] == ["1. set_pwm: OK"]
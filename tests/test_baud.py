@@ -0,0 +1,81 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from mcp2serial import baud, server
+from mcp2serial.server import Config, DeviceConfig, Command, DevicePool
+
+pytest.importorskip("termios", reason="needs a pseudo-terminal")
+from mcp2serial.simulator import DeviceSimulator
+
+INFO = Command(command="PICO_INFO", need_parse=True, prompts=[])
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = DevicePool()
+    monkeypatch.setattr(server, "device_pool", pool)
+    yield pool
+    pool.close()
+
+
+def call_info(simulator, monkeypatch, **settings):
+    device = DeviceConfig(name="pico", port=simulator.port, read_timeout=0.3, commands={"info": INFO}, **settings)
+    monkeypatch.setattr(server, "config", Config(devices={"pico": device}))
+    result = asyncio.run(server.handle_call_tool("pico_info", {}))
+    status = json.loads(asyncio.run(server.handle_read_resource(server.STATUS_URI)))
+    return result, status["pico"]["baud_rate"]
+
+
+def test_detects_the_device_rate(pool, monkeypatch):
+    with DeviceSimulator(baud_rate=57600, strict_baud=True) as simulator:
+        result, rate = call_info(simulator, monkeypatch, baud_rates=(9600, 57600))
+    assert result[0].text.startswith("OK Board")
+    assert rate == 57600
+
+
+def test_wrong_rate_without_detection_times_out(pool, monkeypatch):
+    with DeviceSimulator(baud_rate=57600, strict_baud=True) as simulator:
+        result, rate = call_info(simulator, monkeypatch)
+    assert "Command timeout" in result[0].text
+    assert rate == 115200
+
+
+def test_negotiates_a_higher_rate(pool, monkeypatch):
+    with DeviceSimulator(baud_rate=115200, strict_baud=True) as simulator:
+        result, rate = call_info(simulator, monkeypatch, switch_baud_rate=921600)
+        assert simulator.baud_rate == 921600
+    assert result[0].text.startswith("OK Board")
+    assert rate == 921600
+
+
+def test_falls_back_when_the_new_rate_fails(pool, monkeypatch):
+    monkeypatch.setattr(baud, "CONFIRM_TIMEOUT", 0.3)
+    with DeviceSimulator(baud_rate=115200, strict_baud=True, unreliable_above=230400,
+                         baud_confirm_timeout=0.3) as simulator:
+        result, rate = call_info(simulator, monkeypatch, switch_baud_rate=921600)
+        assert simulator.baud_rate == 115200
+    assert result[0].text.startswith("OK Board")
+    assert rate == 115200
+
+
+def test_unsupported_rate_is_declined(pool, monkeypatch):
+    with DeviceSimulator(baud_rate=115200, strict_baud=True) as simulator:
+        start = time.monotonic()
+        result, rate = call_info(simulator, monkeypatch, switch_baud_rate=2000000)
+        assert time.monotonic() - start < 0.5
+    assert result[0].text.startswith("OK Board")
+    assert rate == 115200
+
+
+def test_reconnect_finds_the_switched_rate(pool, monkeypatch):
+    with DeviceSimulator(baud_rate=115200, strict_baud=True) as simulator:
+        call_info(simulator, monkeypatch, switch_baud_rate=921600)
+        # 主机重新打开串口时设备仍在切换后的速率，应先试上次成功的速率
+        connection = pool.connections["pico"]
+        connection.scheduler.submit(0, connection._reopen).result()
+        assert connection.serial_port.baudrate == 921600
+        result = asyncio.run(server.handle_call_tool("pico_info", {}))
+    assert result[0].text.startswith("OK Board")
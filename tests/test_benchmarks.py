@@ -0,0 +1,38 @@
+import importlib.util
+import os
+import pathlib
+
+import pytest
+
+from mcp2serial import server
+
+BENCHMARKS = pathlib.Path(__file__).resolve().parent.parent / "benchmarks"
+
+
+def load(name):
+    spec = importlib.util.spec_from_file_location(f"benchmarks_{name}", BENCHMARKS / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def request_path(monkeypatch):
+    # 基准测试会替换全局配置和设备池，测试结束后恢复
+    monkeypatch.setattr(server, "config", server.config)
+    monkeypatch.setattr(server, "device_pool", server.device_pool)
+    return load("request_path")
+
+
+def test_loopback_benchmark_reports_metrics(request_path):
+    result = request_path.bench("loopback", 0, calls=20, concurrency=2)
+    assert result["calls"] == 20
+    assert result["latency_ms"]["p50"] <= result["latency_ms"]["p99"] <= result["latency_ms"]["max"]
+    assert result["calls_per_second"] > 0 and result["bytes_per_second"] > 0
+
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs pseudo-terminals")
+def test_pty_benchmark_talks_to_simulated_device(request_path):
+    result = request_path.bench("pty", 2, calls=10, concurrency=1)
+    assert result["latency_ms"]["p50"] >= 2
+    assert result["bytes_per_second"] > 0
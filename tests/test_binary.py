@@ -0,0 +1,108 @@
+import os
+import random
+import threading
+
+import pytest
+
+from mcp2serial import binary
+from mcp2serial.binary import cobs_encode, cobs_decode, encode_frame, decode_frame, FrameError
+from mcp2serial.server import SerialConnection, DeviceConfig, Command
+
+
+@pytest.mark.parametrize("size", [0, 1, 253, 254, 255, 600])
+def test_cobs_round_trip(size):
+    rng = random.Random(size)
+    data = bytes(rng.choice([0, rng.randrange(256)]) for _ in range(size))
+    encoded = cobs_encode(data)
+    assert b"\x00" not in encoded
+    assert cobs_decode(encoded) == data
+
+
+def test_corrupted_frame_rejected():
+    frame = bytearray(encode_frame(b"\x05\x00Board: Pico")[:-1])
+    assert decode_frame(bytes(frame)) == b"\x05\x00Board: Pico"
+    frame[4] ^= 0x40
+    with pytest.raises(FrameError):
+        decode_frame(bytes(frame))
+
+
+class BinaryDevice:
+    """Speaks the binary protocol on a pty; corrupts the first `corrupt` responses"""
+
+    def __init__(self, corrupt=0):
+        self.master, self._slave = os.openpty()
+        self.port = os.ttyname(self._slave)
+        self.corrupt = corrupt
+        self.requests = []
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        buffer = b""
+        while True:
+            try:
+                buffer += os.read(self.master, 1024)
+            except OSError:
+                return
+            while b"\x00" in buffer:
+                raw, buffer = buffer.split(b"\x00", 1)
+                if not raw:
+                    continue
+                if raw.strip() == b"BINARY":
+                    os.write(self.master, b"OK\r\n")
+                    continue
+                payload = decode_frame(raw)
+                self.requests.append(payload)
+                command = payload[1:].decode()
+                status = binary.STATUS_OK if command.startswith("PICO_INFO") else binary.STATUS_NG
+                frame = bytearray(encode_frame(bytes([payload[0], status]) + b"OK Board: Pico"))
+                if self.corrupt:
+                    self.corrupt -= 1
+                    frame[3] ^= 0xFF
+                os.write(self.master, bytes(frame))
+
+    def close(self):
+        os.close(self.master)
+        os.close(self._slave)
+
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pseudo-terminal")
+@pytest.mark.parametrize("corrupt, max_retries, expected_requests", [(0, 2, 1), (2, 2, 3)])
+def test_binary_transaction_with_retransmit(corrupt, max_retries, expected_requests):
+    device = BinaryDevice(corrupt=corrupt)
+    connection = SerialConnection(DeviceConfig(name="bin", port=device.port, protocol="binary",
+                                               max_retries=max_retries, read_timeout=0.5))
+    try:
+        result = connection.send_command(Command(command="PICO_INFO", need_parse=True, prompts=[]), {})
+        assert result[0].text == "OK Board: Pico"
+        assert len(device.requests) == expected_requests
+        # 重发使用相同的序号
+        assert len({request[0] for request in device.requests}) == 1
+        assert all(request[1:] == b"PICO_INFO" for request in device.requests)
+    finally:
+        connection.close()
+        device.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pseudo-terminal")
+def test_binary_retries_exhausted_and_ng():
+    device = BinaryDevice(corrupt=5)
+    connection = SerialConnection(DeviceConfig(name="bin", port=device.port, protocol="binary",
+                                               max_retries=1, read_timeout=0.5))
+    try:
+        result = connection.send_command(Command(command="PICO_INFO", need_parse=True, prompts=[]), {})
+        assert "Frame check failed" in result[0].text
+        assert len(device.requests) == 2
+
+        device.corrupt = 0
+        result = connection.send_command(Command(command="PWM {frequency}", need_parse=False, prompts=[]),
+                                         {"frequency": "500"})
+        assert "Command execution failed" in result[0].text
+    finally:
+        connection.close()
+        device.close()
+
+
+def test_binary_loopback_hex_format():
+    connection = SerialConnection(DeviceConfig(port="LOOP_BACK", protocol="binary"))
+    command = Command(command="READ", need_parse=True, prompts=[], response_format="hex")
+    assert connection.send_command(command, {})[0].text == "4f 4b"
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from mcp2serial import server
+from mcp2serial.cache import ResponseCache
+from mcp2serial.server import SerialConnection, Config, Command, DevicePool
+
+
+def test_lru_eviction_and_expiry():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", 1, ttl=10, generation=cache.generation)
+    cache.put("b", 2, ttl=10, generation=cache.generation)
+    assert cache.get("a") == 1
+    cache.put("c", 3, ttl=10, generation=cache.generation)
+    assert cache.get("b") is None  # 最久未使用的条目被淘汰
+    assert cache.evictions == 1
+
+    cache.put("d", 4, ttl=0.01, generation=cache.generation)
+    time.sleep(0.02)
+    assert cache.get("d") is None
+
+
+def test_stale_put_is_ignored():
+    cache = ResponseCache()
+    generation = cache.generation
+    cache.invalidate()
+    cache.put("a", 1, ttl=10, generation=generation)
+    assert cache.get("a") is None
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    config = Config(port="LOOP_BACK")
+    config.commands["get_pico_info"] = Command(command="PICO_INFO", need_parse=True, prompts=[], cache_ttl=60)
+    config.commands["set_pwm"] = Command(command="PWM {frequency}", need_parse=False, prompts=[])
+    monkeypatch.setattr(server, "config", config)
+    pool = DevicePool()
+    monkeypatch.setattr(server, "device_pool", pool)
+
+    sent = []
+    original = SerialConnection.send_command
+
+    def counting_send_command(self, command, arguments):
+        sent.append(command.command)
+        return original(self, command, arguments)
+
+    monkeypatch.setattr(SerialConnection, "send_command", counting_send_command)
+    yield sent
+    pool.close()
+
+
+def test_cached_command_skips_device(counted):
+    async def run():
+        first = await server.handle_call_tool("get_pico_info", {})
+        second = await server.handle_call_tool("get_pico_info", {})
+        await server.handle_call_tool("set_pwm", {"frequency": "50"})
+        third = await server.handle_call_tool("get_pico_info", {})
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first == second == third
+    assert counted == ["PICO_INFO", "PWM {frequency}", "PICO_INFO"]
+
+    status = json.loads(asyncio.run(server.handle_read_resource(server.STATUS_URI)))
+    assert status["default"]["cache"]["hits"] == 1
+    assert status["default"]["cache"]["misses"] == 2
+    assert status["default"]["cache"]["invalidations"] == 1
+
+
+def test_tools_sharing_a_template_do_not_share_results(counted):
+    server.config.commands["info_check"] = Command(command="PICO_INFO", need_parse=False, prompts=[], cache_ttl=60)
+    server.config.commands["info_raw"] = Command(command="PICO_INFO", need_parse=True, prompts=[], cache_ttl=60)
+
+    async def run():
+        check = await server.handle_call_tool("info_check", {})
+        raw = await server.handle_call_tool("info_raw", {})
+        return check, raw
+
+    check, raw = asyncio.run(run())
+    assert check == []
+    assert [content.text for content in raw] == ["OK"]
+    assert counted == ["PICO_INFO", "PICO_INFO"]
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from mcp2serial import server
+from mcp2serial.capture import TrafficCapture, TX, RX
+from mcp2serial.server import Config, Command, DevicePool
+
+
+def test_ring_keeps_latest_bytes():
+    capture = TrafficCapture(size=16, max_records=4)
+    capture.record(TX, b"PICO_INFO\r\n")
+    capture.record(RX, b"OK Pico\r\n")
+    records = capture.snapshot()
+    # 第一条记录已被部分覆盖，只保留完整的最新记录
+    assert [(direction, data) for _, direction, data in records] == [(RX, b"OK Pico\r\n")]
+
+    capture.record(TX, b"A")
+    capture.record(TX, b"B")
+    capture.record(RX, b"C")
+    capture.record(RX, b"D")
+    assert [data for _, _, data in capture.snapshot()] == [b"A", b"B", b"C", b"D"]
+
+
+def test_snapshot_limits_bytes():
+    capture = TrafficCapture(size=64)
+    capture.record(TX, b"PWM 1000\r\n")
+    capture.record(RX, b"OK\r\n")
+    records = capture.snapshot(max_bytes=6)
+    assert [data for _, _, data in records] == [b"\r\n", b"OK\r\n"]
+    assert "RX" in capture.dump() and "TX" in capture.dump()
+
+
+def test_disabled_capture_records_nothing():
+    capture = TrafficCapture(size=0)
+    capture.record(TX, b"PICO_INFO\r\n")
+    assert capture.snapshot() == []
+
+
+@pytest.fixture
+def config(monkeypatch):
+    config = Config(port="LOOP_BACK", response_start_string="OK")
+    config.commands["get_pico_info"] = Command(command="PICO_INFO", need_parse=True, prompts=[])
+    monkeypatch.setattr(server, "config", config)
+    pool = DevicePool()
+    monkeypatch.setattr(server, "device_pool", pool)
+    yield config
+    pool.close()
+
+
+def test_traffic_exposed_as_resource_and_tool(config):
+    async def run():
+        await server.handle_call_tool("get_pico_info", {})
+        resources = await server.handle_list_resources()
+        uris = [str(resource.uri) for resource in resources]
+        assert "mcp2serial://capture/default" in uris
+        text = await server.handle_read_resource("mcp2serial://capture/default")
+        dumped = await server.handle_call_tool("dump_traffic", {"max_bytes": 4})
+        return text, dumped
+
+    text, dumped = asyncio.run(run())
+    assert "TX" in text and "b'PICO_INFO\\r\\n'" in text
+    assert "RX" in text and "b'OK\\r\\n'" in text
+    assert dumped[0].text.endswith("b'OK\\r\\n'")
+    assert "TX" not in dumped[0].text
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from mcp2serial import configcache
+from mcp2serial.configcache import cache_path, load_yaml
+
+CONFIG_YAML = """
+serial:
+  port: LOOP_BACK
+commands:
+  get_pico_info:
+    command: "PICO_INFO"
+    prompts: ["Show board info", "Which board is connected?"]
+"""
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(CONFIG_YAML, encoding="utf-8")
+    return str(path)
+
+
+def fail_parse(content):
+    raise AssertionError("YAML parsed although the cache is current")
+
+
+def test_repeat_load_skips_parsing(config_file, monkeypatch):
+    first = load_yaml(config_file)
+    assert os.path.exists(cache_path(config_file))
+    monkeypatch.setattr(configcache, "_parse", fail_parse)
+    assert load_yaml(config_file) == first
+    assert first["commands"]["get_pico_info"]["prompts"][1] == "Which board is connected?"
+
+
+def test_touched_but_unchanged_file_hits_cache(config_file, monkeypatch):
+    load_yaml(config_file)
+    stat = os.stat(config_file)
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    monkeypatch.setattr(configcache, "_parse", fail_parse)
+    assert load_yaml(config_file)["serial"]["port"] == "LOOP_BACK"
+
+
+def test_changed_file_is_parsed_again(config_file):
+    load_yaml(config_file)
+    with open(config_file, "w", encoding="utf-8") as f:
+        f.write(CONFIG_YAML.replace("LOOP_BACK", "COM11"))
+    assert load_yaml(config_file)["serial"]["port"] == "COM11"
+
+
+def test_same_size_edit_within_one_mtime_tick_is_parsed_again(config_file):
+    with open(config_file, "w", encoding="utf-8") as f:
+        f.write(CONFIG_YAML.replace("LOOP_BACK", "COM3"))
+    stat = os.stat(config_file)
+    assert load_yaml(config_file)["serial"]["port"] == "COM3"
+    with open(config_file, "w", encoding="utf-8") as f:
+        f.write(CONFIG_YAML.replace("LOOP_BACK", "COM4"))
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert load_yaml(config_file)["serial"]["port"] == "COM4"
+
+
+def test_old_file_skips_hashing(config_file, monkeypatch):
+    stat = os.stat(config_file)
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10 * 10**9))
+    load_yaml(config_file)
+
+    def fail_hash(content):
+        raise AssertionError("config hashed although mtime and size are current")
+
+    monkeypatch.setattr(configcache.hashlib, "sha256", fail_hash)
+    assert load_yaml(config_file)["serial"]["port"] == "LOOP_BACK"
+
+
+def test_corrupt_cache_is_ignored(config_file):
+    with open(cache_path(config_file), "wb") as f:
+        f.write(b"\x00garbage")
+    assert load_yaml(config_file)["serial"]["port"] == "LOOP_BACK"
+
+
+def test_unwritable_directory_still_loads(config_file, monkeypatch):
+    monkeypatch.setattr(configcache, "cache_path", lambda path: os.path.join(path + ".missing", "cache"))
+    assert load_yaml(config_file)["serial"]["port"] == "LOOP_BACK"
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from mcp2serial import server
+from mcp2serial.deadline import AdaptiveDeadlines, LatencyStats, WARMUP_SAMPLES
+from mcp2serial.server import Config, DeviceConfig, Command, DevicePool
+
+
+def test_deadline_tracks_latency_within_bounds():
+    stats = LatencyStats()
+    assert stats.deadline(0.001, 2.0) == 2.0
+    for _ in range(WARMUP_SAMPLES):
+        stats.observe(0.010)
+    deadline = stats.deadline(0.001, 2.0)
+    assert 0.015 <= deadline < 0.02
+    assert stats.deadline(0.05, 2.0) == 0.05
+    assert stats.deadline(0.001, 0.012) == 0.012
+
+
+def test_timeouts_back_off_until_an_answer():
+    stats = LatencyStats()
+    for _ in range(WARMUP_SAMPLES):
+        stats.observe(0.010)
+    deadline = stats.deadline(0.001, 2.0)
+    stats.timed_out()
+    stats.timed_out()
+    assert stats.deadline(0.001, 2.0) == pytest.approx(deadline * 4)
+    stats.observe(0.010)
+    assert stats.deadline(0.001, 2.0) < deadline * 2
+
+
+def test_commands_are_tracked_separately():
+    deadlines = AdaptiveDeadlines(0.001, 2.0)
+    for _ in range(WARMUP_SAMPLES):
+        deadlines.observe("PICO_INFO", 0.005)
+        deadlines.observe("PWM {frequency}", 0.5)
+    assert deadlines.deadline("PICO_INFO") < 0.01
+    assert deadlines.deadline("PWM {frequency}") >= 0.75
+    assert deadlines.deadline("PWM {frequency}", maximum=0.6) == 0.6
+    assert deadlines.deadline("LED {state}") == 2.0
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = DevicePool()
+    monkeypatch.setattr(server, "device_pool", pool)
+    yield pool
+    pool.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pseudo-terminal")
+def test_learned_deadline_fails_fast_and_keeps_slow_commands(pool, monkeypatch):
+    from mcp2serial.simulator import DeviceSimulator
+
+    commands = {
+        "info": Command(command="PICO_INFO", need_parse=True, prompts=[]),
+        "pwm": Command(command="PWM {frequency}", need_parse=False, prompts=[])
+    }
+    with DeviceSimulator(latency=0.005, command_latency={"PWM": 0.15}) as simulator:
+        device = DeviceConfig(name="pico", port=simulator.port, read_timeout=2.0, adaptive_timeout=True,
+                              min_read_timeout=0.01, commands=commands)
+        monkeypatch.setattr(server, "config", Config(devices={"pico": device}))
+
+        async def calls():
+            for _ in range(WARMUP_SAMPLES):
+                assert not server.is_error_result(await server.handle_call_tool("pico_info", {}))
+                assert not server.is_error_result(await server.handle_call_tool("pico_pwm", {"frequency": 1}))
+
+            # 设备不再应答时，快速命令在毫秒级而不是 read_timeout 后失败
+            simulator.drop_rate = 1.0
+            start = time.monotonic()
+            result = await server.handle_call_tool("pico_info", {})
+            assert "Command timeout" in result[0].text
+            assert time.monotonic() - start < 0.3
+            simulator.drop_rate = 0.0
+
+            # 慢命令保留按自身响应时间确定的余量
+            assert not server.is_error_result(await server.handle_call_tool("pico_pwm", {"frequency": 2}))
+
+        asyncio.run(calls())
+        status = json.loads(asyncio.run(server.handle_read_resource(server.STATUS_URI)))
+
+    deadlines = status["pico"]["deadlines"]
+    assert deadlines["PICO_INFO"]["timeouts"] == 1
+    assert deadlines["PWM {frequency}"]["samples"] == WARMUP_SAMPLES + 1
+    assert deadlines["PWM {frequency}"]["deadline_ms"] >= 150
+
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pseudo-terminal")
+@pytest.mark.parametrize("pipeline_depth", [0, 4])
+def test_error_replies_are_not_timeouts(pool, monkeypatch, pipeline_depth):
+    from mcp2serial.simulator import DeviceSimulator
+
+    commands = {"pwm": Command(command="PWM {frequency}", need_parse=False, prompts=[])}
+    with DeviceSimulator() as simulator:
+        device = DeviceConfig(name="pico", port=simulator.port, read_timeout=2.0, adaptive_timeout=True,
+                              pipeline_depth=pipeline_depth, commands=commands)
+        monkeypatch.setattr(server, "config", Config(devices={"pico": device}))
+
+        async def calls():
+            for _ in range(WARMUP_SAMPLES):
+                await server.handle_call_tool("pico_pwm", {"frequency": 1})
+            start = time.monotonic()
+            result = await server.handle_call_tool("pico_pwm", {"frequency": 150})
+            assert time.monotonic() - start < 0.5
+            return result
+
+        result = asyncio.run(calls())
+        status = json.loads(asyncio.run(server.handle_read_resource(server.STATUS_URI)))
+    assert "Command execution failed" in result[0].text
+    stats = status["pico"]["deadlines"]["PWM {frequency}"]
+    assert stats["timeouts"] == 0
+    assert stats["samples"] == WARMUP_SAMPLES + 1
+
+
+def test_write_timeout_comes_from_config():
+    connection = server.SerialConnection(DeviceConfig(port="LOOP_BACK", timeout=0.5))
+    assert connection.timeout == 0.5
+    connection.close()
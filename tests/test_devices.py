@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+import mcp.types as types
+
+from mcp2serial import server
+from mcp2serial.server import SerialConnection, Config, DevicePool
+
+CONFIG_YAML = """
+serial:
+  port: LOOP_BACK
+  read_timeout: 0.5
+  response_start_string: OK
+
+commands:
+  get_pico_info:
+    command: "PICO_INFO"
+    need_parse: true
+
+devices:
+  pico1:
+    port: LOOP_BACK
+    commands:
+      set_pwm:
+        command: "PWM {frequency}"
+  pico2:
+    port: LOOP_BACK
+    response_start_string: DONE
+    commands:
+      set_pwm:
+        command: "PWM {frequency}"
+"""
+
+
+def list_tools():
+    request = types.ListToolsRequest(method="tools/list")
+    return asyncio.run(server.server.request_handlers[types.ListToolsRequest](request)).root.tools
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    path = tmp_path / "devices_config.yaml"
+    path.write_text(CONFIG_YAML, encoding="utf-8")
+    config = Config.load(str(path))
+    monkeypatch.setattr(server, "config", config)
+    pool = DevicePool()
+    monkeypatch.setattr(server, "device_pool", pool)
+    yield config
+    pool.close()
+
+
+def test_devices_loaded(config):
+    assert set(config.devices) == {"pico1", "pico2"}
+    assert config.devices["pico1"].read_timeout == 0.5
+    assert config.devices["pico2"].response_start_string == "DONE"
+    assert set(config.registry) == {"get_pico_info", "pico1_set_pwm", "pico2_set_pwm"}
+
+
+def test_tools_are_namespaced(config):
+    tools = list_tools()
+    names = {tool.name: tool for tool in tools}
+    assert "pico1" in names["pico1_set_pwm"].description
+    assert names["pico2_set_pwm"].inputSchema["required"] == ["frequency"]
+
+
+def test_devices_run_in_parallel(config, monkeypatch):
+    original = SerialConnection.send_command
+
+    def slow_send_command(self, command, arguments):
+        time.sleep(0.2)
+        return original(self, command, arguments)
+
+    monkeypatch.setattr(SerialConnection, "send_command", slow_send_command)
+
+    async def run():
+        return await asyncio.gather(
+            server.handle_call_tool("pico1_set_pwm", {"frequency": "10"}),
+            server.handle_call_tool("pico2_set_pwm", {"frequency": "20"}),
+            server.handle_call_tool("get_pico_info", {}),
+        )
+
+    start = time.monotonic()
+    results = asyncio.run(run())
+    assert time.monotonic() - start < 0.4
+    assert results[0] == [] and results[1] == []
+    assert results[2][0].text == "OK"
+    assert set(server.device_pool.connections) == {"default", "pico1", "pico2"}
+
+
+def test_tool_registry_built_once(config):
+    first = list_tools()
+    second = list_tools()
+    assert all(a is b for a, b in zip(first, second))
+    assert config.registry.get("pico1_set_pwm").params == ("frequency",)
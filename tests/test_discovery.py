@@ -0,0 +1,120 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+import serial
+
+from mcp2serial import discovery
+from mcp2serial.discovery import PortMap, PortMatch, find_port
+
+
+def list_port(device, vid=0x2E8A, pid=0x0005, serial_number=None):
+    return SimpleNamespace(device=device, vid=vid, pid=pid, serial_number=serial_number or device)
+
+
+class FakeDevice:
+    """Answers the identify command after a delay, like a board on a USB adapter."""
+
+    def __init__(self, answer=None, delay=0.0):
+        self.answer = answer
+        self.delay = delay
+        self.written = None
+        self.in_waiting = 0
+
+    def reset_input_buffer(self):
+        pass
+
+    def write(self, data):
+        self.written = time.monotonic()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def read(self, size):
+        if self.answer is None or time.monotonic() - self.written < self.delay:
+            time.sleep(0.01)
+            return b""
+        answer, self.answer = self.answer, None
+        return answer
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def release_ports():
+    yield
+    for name in ("pico", "other"):
+        discovery.release(name)
+
+
+def opener(devices, opened=None):
+    def open_port(port, **kwargs):
+        if opened is not None:
+            opened.append(port)
+        if port not in devices:
+            raise serial.SerialException(f"could not open port {port}")
+        return devices[port]
+    return open_port
+
+
+def test_match_parses_hex_ids():
+    match = PortMatch.from_dict({"vid": "2E8A", "pid": "0x0005", "identify": "PICO_INFO"})
+    assert (match.vid, match.pid) == (0x2E8A, 0x0005)
+    assert match.matches_hardware(list_port("/dev/ttyACM0"))
+    assert not match.matches_hardware(list_port("/dev/ttyUSB0", vid=0x0403))
+
+
+def test_probes_ports_concurrently(tmp_path):
+    ports = [list_port(f"/dev/ttyACM{i}") for i in range(4)]
+    devices = {
+        "/dev/ttyACM0": FakeDevice(b"ERROR\r\n", delay=0.2),
+        "/dev/ttyACM1": FakeDevice(None),
+        "/dev/ttyACM2": FakeDevice(b"OK Pico\r\n", delay=0.2),
+        "/dev/ttyACM3": FakeDevice(None),
+    }
+    start = time.monotonic()
+    port = find_port("pico", PortMatch(identify="PICO_INFO"), 115200, b"PICO_INFO\r\n", b"OK", 0.5,
+                     PortMap(str(tmp_path / "port_map.json")), ports, opener(devices))
+    assert port == "/dev/ttyACM2"
+    assert time.monotonic() - start < 0.45
+
+
+def test_port_map_makes_restart_skip_probing(tmp_path):
+    port_map = PortMap(str(tmp_path / "port_map.json"))
+    match = PortMatch(identify="PICO_INFO")
+    ports = [list_port("/dev/ttyACM0"), list_port("/dev/ttyACM1")]
+    devices = {"/dev/ttyACM1": FakeDevice(b"OK\r\n")}
+    assert find_port("pico", match, 115200, b"PICO_INFO\r\n", b"OK", 0.5, port_map, ports,
+                     opener(devices)) == "/dev/ttyACM1"
+    assert port_map.get("pico")["port"] == "/dev/ttyACM1"
+    discovery.release("pico")
+
+    opened = []
+    assert find_port("pico", match, 115200, b"PICO_INFO\r\n", b"OK", 0.5, port_map, ports,
+                     opener(devices, opened)) == "/dev/ttyACM1"
+    assert opened == []
+
+
+def test_remembered_port_ignored_when_config_changes(tmp_path):
+    port_map = PortMap(str(tmp_path / "port_map.json"))
+    port_map.put("pico", {"port": "/dev/ttyACM0", "serial_number": "/dev/ttyACM0",
+                          "match": PortMatch(identify="OLD").key()})
+    ports = [list_port("/dev/ttyACM0"), list_port("/dev/ttyACM1")]
+    devices = {"/dev/ttyACM1": FakeDevice(b"OK\r\n")}
+    assert find_port("pico", PortMatch(identify="PICO_INFO"), 115200, b"PICO_INFO\r\n", b"OK", 0.5,
+                     port_map, ports, opener(devices)) == "/dev/ttyACM1"
+
+
+def test_claimed_ports_are_skipped(tmp_path):
+    ports = [list_port("/dev/ttyACM0"), list_port("/dev/ttyACM1")]
+    assert find_port("other", PortMatch(), 115200, None, b"OK", 0.5, None, ports) == "/dev/ttyACM0"
+    assert find_port("pico", PortMatch(), 115200, None, b"OK", 0.5, None, ports) == "/dev/ttyACM1"
+    discovery.release("other")
+    assert discovery.claim("/dev/ttyACM0", "pico")
+
+
+def test_echo_is_not_an_identify_response():
+    device = FakeDevice(b"OK_QUERY\r\n")
+    assert not discovery.probe("/dev/ttyACM0", 115200, b"OK_QUERY\r\n", b"OK", 0.1, opener({"/dev/ttyACM0": device}))
@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+from mcp2serial import server
+from mcp2serial.server import SerialConnection, Config, Command
+
+
+class FakePort:
+    """Minimal stand-in for serial.Serial that replays scripted chunks"""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.written = b""
+        self.is_open = True
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size=1):
+        if not self.chunks:
+            time.sleep(0.005)
+            return b""
+        return self.chunks.pop(0)
+
+    def write(self, data):
+        self.written += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        pass
+
+    def reset_output_buffer(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    monkeypatch.setattr(server, "config", Config(port="/dev/null", read_timeout=0.2, response_start_string="OK"))
+    connection = SerialConnection()
+    yield connection
+    connection.serial_port = None
+
+
+def test_frame_returns_on_response_line(connection):
+    connection.serial_port = FakePort([b"PICO_INFO\r\n", b"OK Board: ", b"Pico\r\n", b"trailing\r\n"])
+    command = Command(command="PICO_INFO", need_parse=True, prompts=[])
+
+    start = time.monotonic()
+    result = connection.send_command(command, {})
+    assert time.monotonic() - start < 0.1
+    assert result[0].text == "OK Board: Pico"
+    assert connection.serial_port.written == b"PICO_INFO\r\n"
+
+
+def test_echo_matching_prefix_is_skipped(connection):
+    connection.serial_port = FakePort([b"OK_PING\r\n", b"OK pong\r\n"])
+    command = Command(command="OK_PING", need_parse=True, prompts=[])
+    assert connection.send_command(command, {})[0].text == "OK pong"
+
+
+def test_per_command_prefix_and_timeout(connection):
+    connection.serial_port = FakePort([b"PWM 50\r\n", b"OK\r\n"])
+    command = Command(command="PWM {frequency}", need_parse=False, prompts=[],
+                      response_start_string="DONE", read_timeout=0.05)
+
+    start = time.monotonic()
+    result = connection.send_command(command, {"frequency": "50"})
+    elapsed = time.monotonic() - start
+    assert 0.05 <= elapsed < 0.2
+    assert "Command execution failed" in result[0].text
+    assert "DONE" in result[0].text
+
+
+def test_no_response_times_out(connection):
+    connection.serial_port = FakePort([])
+    command = Command(command="PICO_INFO", need_parse=True, prompts=[])
+    result = connection.send_command(command, {})
+    assert "Command timeout" in result[0].text
+
+
+def test_error_reply_ends_the_frame(connection):
+    connection.serial_port = FakePort([b"PWM 150\r\n", b"NG\r\n"])
+    command = Command(command="PWM {frequency}", need_parse=False, prompts=[], read_timeout=1.0)
+
+    start = time.monotonic()
+    result = connection.send_command(command, {"frequency": "150"})
+    assert time.monotonic() - start < 0.1
+    assert "Command execution failed" in result[0].text
+    assert "Raw: b'NG\\r\\n'" in result[0].text
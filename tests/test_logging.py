@@ -0,0 +1,60 @@
+import logging
+
+import pytest
+
+from mcp2serial import server
+from mcp2serial.server import SerialConnection, DeviceConfig, Command, setup_logging
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield root
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_setup_logging_uses_queue_handler(restore_root_logger):
+    listener = setup_logging("warning")
+    try:
+        assert restore_root_logger.level == logging.WARNING
+        assert [type(h) for h in restore_root_logger.handlers] == [logging.handlers.QueueHandler]
+    finally:
+        listener.stop()
+
+
+def test_hex_dump_skipped_when_debug_disabled(restore_root_logger, monkeypatch):
+    listener = setup_logging("INFO")
+    calls = []
+    monkeypatch.setattr(server, "hex_dump", lambda data: calls.append(data) or "")
+    try:
+        device = DeviceConfig(port="LOOP_BACK")
+        connection = SerialConnection(device)
+        connection.send_command(Command(command="PICO_INFO", need_parse=True, prompts=[]), {})
+        assert calls == []
+
+        restore_root_logger.setLevel(logging.DEBUG)
+        connection.send_command(Command(command="PICO_INFO", need_parse=True, prompts=[]), {})
+        assert calls == [b"PICO_INFO\r\n"]
+    finally:
+        listener.stop()
+
+
+@pytest.mark.parametrize("level", ["verbose", "", 10, None])
+def test_unknown_level_falls_back_to_info(restore_root_logger, level):
+    listener = setup_logging(level)
+    try:
+        assert restore_root_logger.level == logging.INFO
+    finally:
+        listener.stop()
+
+
+def test_resolve_log_level():
+    assert server.resolve_log_level(" debug ") == logging.DEBUG
+    assert server.resolve_log_level("WARNING") == logging.WARNING
+    assert server.resolve_log_level("loud") is None
+    assert server.resolve_log_level(["INFO"]) is None
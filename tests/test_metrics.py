@@ -0,0 +1,93 @@
+import asyncio
+import json
+import os
+import urllib.request
+
+import pytest
+
+from mcp2serial import server, metrics
+from mcp2serial.metrics import Histogram, PrometheusText
+from mcp2serial.server import Config, DeviceConfig, Command, DevicePool
+
+INFO = Command(command="PICO_INFO", need_parse=True, prompts=[])
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = DevicePool()
+    monkeypatch.setattr(server, "device_pool", pool)
+    monkeypatch.setattr(server, "tool_metrics", {})
+    yield pool
+    pool.close()
+
+
+def test_histogram_buckets():
+    histogram = Histogram((0.01, 0.1, 1.0))
+    for value in (0.005, 0.01, 0.05, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [(0.01, 2), (0.1, 3), (1.0, 4), (float("inf"), 5)]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(1.0) == 1.0
+
+
+def test_prometheus_text_format():
+    text = PrometheusText()
+    histogram = Histogram((0.1,))
+    histogram.observe(0.05)
+    text.counter("calls_total", "Calls", [({"tool": 'say "hi"'}, 3)])
+    text.histogram("latency_seconds", "Latency", [({"tool": "a"}, histogram)])
+    assert text.render().splitlines() == [
+        "# HELP calls_total Calls",
+        "# TYPE calls_total counter",
+        'calls_total{tool="say \\"hi\\""} 3',
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{tool="a",le="0.1"} 1',
+        'latency_seconds_bucket{tool="a",le="+Inf"} 1',
+        'latency_seconds_sum{tool="a"} 0.05',
+        'latency_seconds_count{tool="a"} 1',
+    ]
+
+
+def test_tool_calls_are_recorded(pool, monkeypatch):
+    monkeypatch.setattr(server, "config", Config(port="LOOP_BACK", commands={"get_pico_info": INFO}))
+    for _ in range(3):
+        asyncio.run(server.handle_call_tool("get_pico_info", {}))
+    asyncio.run(server.handle_call_tool("no_such_tool", {}))
+
+    snapshot = json.loads(asyncio.run(server.handle_read_resource(server.METRICS_URI)))
+    assert set(snapshot["tools"]) == {"get_pico_info"}
+    assert snapshot["tools"]["get_pico_info"]["calls"] == 3
+    assert snapshot["tools"]["get_pico_info"]["latency"]["count"] == 3
+    assert snapshot["devices"]["default"]["queue_wait"]["count"] == 3
+
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pseudo-terminal")
+def test_timeouts_and_port_bytes(pool, monkeypatch):
+    from mcp2serial.simulator import DeviceSimulator
+
+    with DeviceSimulator(drop_rate=1.0) as simulator:
+        device = DeviceConfig(name="pico", port=simulator.port, read_timeout=0.05, commands={"info": INFO})
+        monkeypatch.setattr(server, "config", Config(devices={"pico": device}))
+        asyncio.run(server.handle_call_tool("pico_info", {}))
+        text = server.prometheus_metrics()
+    assert 'mcp2serial_tool_timeouts_total{tool="pico_info"} 1' in text
+    assert 'mcp2serial_port_bytes_written_total{device="pico"} 11' in text
+    assert 'mcp2serial_device_up{device="pico"} 1' in text
+
+
+def test_http_and_file_export(pool, tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "config", Config(port="LOOP_BACK", commands={"get_pico_info": INFO}))
+    asyncio.run(server.handle_call_tool("get_pico_info", {}))
+
+    http_server = metrics.serve_http(0, server.prometheus_metrics)
+    try:
+        url = f"http://127.0.0.1:{http_server.server_port}/metrics"
+        body = urllib.request.urlopen(url, timeout=2).read().decode()
+    finally:
+        http_server.shutdown()
+    assert 'mcp2serial_tool_calls_total{tool="get_pico_info"} 1' in body
+
+    path = tmp_path / "mcp2serial.prom"
+    metrics.write_file(str(path), server.prometheus_metrics())
+    assert path.read_text() == body
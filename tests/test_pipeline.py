@@ -0,0 +1,141 @@
+import asyncio
+import os
+import re
+import threading
+import time
+
+import pytest
+
+from mcp2serial.server import SerialConnection, DeviceConfig, Command
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pseudo-terminal")
+
+
+class TaggedDevice:
+    """Answers tagged commands on the master side of a pty after a fixed latency"""
+
+    def __init__(self, latency=0.05):
+        self.master, slave = os.openpty()
+        self.port = os.ttyname(slave)
+        self._slave = slave
+        self.latency = latency
+        self.received = []
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _reply(self, text):
+        os.write(self.master, text.encode() + b"\r\n")
+
+    def _run(self):
+        buffer = b""
+        while self._running:
+            try:
+                buffer += os.read(self.master, 1024)
+            except OSError:
+                return
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                line = line.strip().decode()
+                self.received.append(line)
+                match = re.match(r"(#\d+ )(.*)", line)
+                tag, body = match.groups()
+                reply = f"{tag}NG" if body.startswith("PWM 999") else f"{tag}OK {body}"
+                # 每条命令独立计时应答，模拟设备侧可并发处理
+                threading.Timer(self.latency, self._reply, args=(reply,)).start()
+
+    def close(self):
+        self._running = False
+        os.close(self.master)
+        os.close(self._slave)
+
+
+@pytest.fixture
+def device():
+    device = TaggedDevice()
+    yield device
+    device.close()
+
+
+def make_connection(port, depth):
+    return SerialConnection(DeviceConfig(name="pipe", port=port, read_timeout=1.0, pipeline_depth=depth))
+
+
+def test_pipelined_calls_overlap(device):
+    connection = make_connection(device.port, depth=5)
+    command = Command(command="PWM {frequency}", need_parse=True, prompts=[])
+
+    async def run():
+        return await asyncio.gather(*[
+            connection.send_command_async(command, {"frequency": str(i)}) for i in range(10)
+        ])
+
+    try:
+        start = time.monotonic()
+        results = asyncio.run(run())
+        elapsed = time.monotonic() - start
+    finally:
+        connection.close()
+
+    # 每个应答都匹配到自己的命令，且标签已从结果中去掉
+    assert [result[0].text for result in results] == [f"OK PWM {i}" for i in range(10)]
+    # 串行执行需要 10 * 50 ms，流水线最多 5 条同时在途
+    assert elapsed < 0.35
+    assert all(line.startswith("#") for line in device.received)
+
+
+def test_pipelined_error_reply_fails_fast(device):
+    connection = make_connection(device.port, depth=4)
+    command = Command(command="PWM {frequency}", need_parse=False, prompts=[])
+    try:
+        start = time.monotonic()
+        result = asyncio.run(connection.send_command_async(command, {"frequency": "999"}))
+        assert time.monotonic() - start < 0.5
+    finally:
+        connection.close()
+    assert "Command execution failed" in result[0].text
+    assert "NG" in result[0].text
+
+
+def test_pipelined_loopback():
+    connection = make_connection("LOOP_BACK", depth=4)
+    command = Command(command="PICO_INFO", need_parse=True, prompts=[])
+    try:
+        result = asyncio.run(connection.send_command_async(command, {}))
+    finally:
+        connection.close()
+    assert result[0].text == "OK"
+
+
+def test_pipelined_batch_bypasses_cache(device):
+    connection = make_connection(device.port, depth=4)
+    command = Command(command="PWM {frequency}", need_parse=True, prompts=[], cache_ttl=60)
+
+    async def run():
+        await connection.send_command_async(command, {"frequency": "1"})
+        return await connection.send_batch_async([(command, {"frequency": "1"})] * 2)
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        connection.close()
+    assert [result[0].text for result in results] == ["OK PWM 1", "OK PWM 1"]
+    assert len(device.received) == 3
+    assert connection.cache.hits == 0
+
+
+def test_render_errors_do_not_leak_window_slots(device):
+    connection = make_connection(device.port, depth=2)
+    command = Command(command="PWM {frequency}", need_parse=True, prompts=[])
+
+    async def run():
+        for _ in range(3):
+            with pytest.raises(KeyError):
+                await connection.send_command_async(command, {})
+        return await asyncio.wait_for(connection.send_command_async(command, {"frequency": "1"}), 2.0)
+
+    try:
+        result = asyncio.run(run())
+    finally:
+        connection.close()
+    assert result[0].text == "OK PWM 1"
@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import mcp.types as types
+
+from mcp2serial import server
+from mcp2serial.server import Config, ToolRegistry, DeviceConfig, Command
+
+
+def catalog(count):
+    return {f"cmd{i}": Command(command=f"CMD{i} {{value}}", need_parse=False, prompts=("Shared prompt",))
+            for i in range(count)}
+
+
+@pytest.fixture
+def config(monkeypatch):
+    monkeypatch.setattr(server, "TOOLS_PAGINATION_SUPPORTED", True)
+    config = Config(port="LOOP_BACK", commands=catalog(25), tools_page_size=10)
+    monkeypatch.setattr(server, "config", config)
+    return config
+
+
+def list_request(cursor=None):
+    return SimpleNamespace(method="tools/list", params=SimpleNamespace(cursor=cursor))
+
+
+def test_tools_list_is_paginated(config):
+    names = []
+    cursor = None
+    pages = 0
+    for _ in range(10):
+        result = asyncio.run(server.server.request_handlers[types.ListToolsRequest](list_request(cursor))).root
+        names.extend(tool.name for tool in result.tools)
+        pages += 1
+        cursor = result.nextCursor
+        if cursor is None:
+            break
+    # 25 个命令加内置的 batch 和 dump_traffic
+    assert pages == 3
+    assert names == [tool.name for tool in config.registry.tool_list]
+
+
+def test_unpaginated_by_default(config):
+    config.tools_page_size = 0
+    result = asyncio.run(server.list_tools_page(None))
+    assert len(result.tools) == 27 and result.nextCursor is None
+
+
+def test_unpaginated_when_mcp_drops_cursor(config, monkeypatch):
+    monkeypatch.setattr(server, "TOOLS_PAGINATION_SUPPORTED", False)
+    result = asyncio.run(server.list_tools_page(None))
+    assert len(result.tools) == 27 and result.nextCursor is None
+
+
+@pytest.mark.parametrize("cursor", ["abc", "-1", "1000"])
+def test_invalid_cursor_rejected(config, cursor):
+    with pytest.raises(ValueError):
+        config.registry.page(cursor, 10)
+
+
+def test_tools_share_prompts_and_schema():
+    registry = ToolRegistry.build([DeviceConfig(commands=catalog(3))])
+    first, second = registry.get("cmd0").tool, registry.get("cmd1").tool
+    assert first.prompts is second.prompts or first.prompts[0] is second.prompts[0]
+    assert first.inputSchema["properties"]["value"] is second.inputSchema["properties"]["value"]
+    assert first.model_dump()["inputSchema"]["required"] == ["value"]
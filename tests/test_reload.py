@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from mcp2serial import server
+from mcp2serial.server import Config, DevicePool
+
+CONFIG_YAML = """
+serial:
+  port: LOOP_BACK
+  read_timeout: 0.5
+
+commands:
+  get_pico_info:
+    command: "PICO_INFO"
+    need_parse: true
+
+devices:
+  pico1:
+    port: LOOP_BACK
+    baud_rate: 115200
+    commands:
+      set_pwm:
+        command: "PWM {frequency}"
+  pico2:
+    port: LOOP_BACK
+    commands:
+      set_pwm:
+        command: "PWM {frequency}"
+"""
+
+
+class FakeSession:
+    def __init__(self):
+        self.notifications = []
+
+    async def send_tool_list_changed(self):
+        self.notifications.append("tools")
+
+    async def send_resource_list_changed(self):
+        self.notifications.append("resources")
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "reload_config.yaml"
+    path.write_text(CONFIG_YAML, encoding="utf-8")
+    monkeypatch.setattr(server, "config", Config.from_file(str(path)))
+    pool = DevicePool()
+    monkeypatch.setattr(server, "device_pool", pool)
+    session = FakeSession()
+    monkeypatch.setattr(server, "_session", session)
+    yield path, session
+    pool.close()
+
+
+def connect_all():
+    async def run():
+        await server.handle_call_tool("pico1_set_pwm", {"frequency": "10"})
+        await server.handle_call_tool("pico2_set_pwm", {"frequency": "10"})
+    asyncio.run(run())
+    return dict(server.device_pool.connections)
+
+
+def test_reload_rebuilds_only_changed_tools(config_file):
+    path, session = config_file
+    before = server.config.registry
+    connections = connect_all()
+
+    path.write_text(CONFIG_YAML.replace('command: "PWM {frequency}"', 'command: "PWM {frequency} {duty}"', 1),
+                    encoding="utf-8")
+    assert asyncio.run(server.reload_config())
+
+    after = server.config.registry
+    assert after.get("get_pico_info") is before.get("get_pico_info")
+    assert after.get("pico2_set_pwm") is before.get("pico2_set_pwm")
+    assert after.get("pico1_set_pwm").params == ("frequency", "duty")
+    # 只改了命令，串口连接保持不变
+    assert server.device_pool.connections == connections
+    assert session.notifications == ["tools"]
+
+
+def test_changed_serial_settings_reconnect_only_that_device(config_file, monkeypatch):
+    path, session = config_file
+    connections = connect_all()
+    closed = []
+    original_close = server.SerialConnection.close
+
+    def recording_close(self):
+        closed.append(self.device.name)
+        original_close(self)
+
+    monkeypatch.setattr(server.SerialConnection, "close", recording_close)
+    path.write_text(CONFIG_YAML.replace("baud_rate: 115200", "baud_rate: 921600"), encoding="utf-8")
+    assert asyncio.run(server.reload_config())
+
+    assert closed == ["pico1"]
+    assert server.device_pool.connections == {"pico2": connections["pico2"]}
+    assert server.config.devices["pico1"].baud_rate == 921600
+    assert session.notifications == []
+
+
+def test_removed_device_is_closed(config_file):
+    path, session = config_file
+    connect_all()
+    path.write_text(CONFIG_YAML[:CONFIG_YAML.index("  pico2:")], encoding="utf-8")
+    assert asyncio.run(server.reload_config())
+
+    assert set(server.device_pool.connections) == {"pico1"}
+    assert "pico2_set_pwm" not in server.config.registry
+    assert session.notifications == ["tools", "resources"]
+
+
+def test_invalid_file_keeps_running_config(config_file):
+    path, session = config_file
+    current = server.config
+    path.write_text("serial: [unclosed", encoding="utf-8")
+    assert not asyncio.run(server.reload_config())
+    assert server.config is current
+    assert session.notifications == []
+
+
+def test_watcher_reloads_on_change(config_file):
+    path, _ = config_file
+
+    async def run():
+        watcher = asyncio.create_task(server.watch_config(interval=0.01))
+        await asyncio.sleep(0.05)
+        path.write_text(CONFIG_YAML + "  pico3:\n    port: LOOP_BACK\n", encoding="utf-8")
+        for _ in range(100):
+            if "pico3" in server.config.devices:
+                break
+            await asyncio.sleep(0.01)
+        watcher.cancel()
+
+    asyncio.run(run())
+    assert "pico3" in server.config.devices
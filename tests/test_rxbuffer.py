@@ -0,0 +1,57 @@
+import tracemalloc
+
+from mcp2serial import server
+from mcp2serial.rxbuffer import ReceiveBuffer
+from mcp2serial.server import SerialConnection, Config, Command
+
+from .test_framing import FakePort
+
+
+def test_lines_split_in_place():
+    rx = ReceiveBuffer(size=8, max_lines=1)
+    rx.feed(b"PICO_INFO\r\nOK Bo")
+    assert rx.next_line() == 0
+    assert rx.next_line() == -1
+    rx.feed(b"ard: Pico\r\npartial")
+    assert rx.next_line() == 1
+    assert rx.line_equals(0, b"PICO_INFO")
+    assert not rx.line_equals(1, b"OK")
+    assert rx.line_startswith(1, b"OK Board")
+    assert list(rx.lines()) == [b"PICO_INFO\r\n", b"OK Board: Pico\r\n", b"partial"]
+    assert rx.lines()[-1] == b"partial"
+
+
+def test_compact_keeps_incomplete_tail():
+    rx = ReceiveBuffer(size=16)
+    rx.feed(b"#1 OK\r\n#2 O")
+    assert rx.next_line() == 0
+    rx.compact()
+    rx.feed(b"K\r\n")
+    assert rx.next_line() == 0
+    assert rx.line(0) == b"#2 OK\r\n"
+    assert rx.capacity == 16
+
+
+def test_receive_churn_is_constant(monkeypatch):
+    monkeypatch.setattr(server, "config", Config(port="/dev/null", read_timeout=0.5))
+    connection = SerialConnection()
+    command = Command(command="PICO_INFO", need_parse=True, prompts=[])
+    noise = [b"status line %d with some payload\r\n" % i for i in range(200)]
+
+    def transaction():
+        connection.serial_port = FakePort(noise + [b"OK Pico\r\n"])
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        result = connection.send_command(command, {})
+        assert result[0].text == "OK Pico"
+        return tracemalloc.get_traced_memory()[1] - start
+
+    tracemalloc.start()
+    try:
+        transaction()  # 预热：接收缓冲区扩容到所需大小
+        peaks = [transaction() for _ in range(3)]
+    finally:
+        tracemalloc.stop()
+        connection.serial_port = None
+    # 收到约 7 KB 数据，但每个事务的临时分配与行数无关
+    assert max(peaks) < 4096
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from mcp2serial import server
+from mcp2serial.scheduler import CommandScheduler, QueueFullError, PRIORITIES
+from mcp2serial.server import SerialConnection, Config, Command, DevicePool
+
+
+def test_priority_order():
+    scheduler = CommandScheduler("test")
+    gate = threading.Event()
+    order = []
+    try:
+        # 第一个任务占住工作线程，其余任务排队
+        first = scheduler.submit(PRIORITIES["normal"], gate.wait)
+        futures = [
+            scheduler.submit(PRIORITIES["low"], order.append, "low"),
+            scheduler.submit(PRIORITIES["normal"], order.append, "normal1"),
+            scheduler.submit(PRIORITIES["high"], order.append, "high"),
+            scheduler.submit(PRIORITIES["normal"], order.append, "normal2"),
+        ]
+        gate.set()
+        for future in [first] + futures:
+            future.result(timeout=1)
+        assert order == ["high", "normal1", "normal2", "low"]
+        assert scheduler.stats.executed == 5
+        assert scheduler.stats.max_depth_seen >= 4
+    finally:
+        scheduler.close()
+
+
+def test_full_queue_rejects_and_sheds():
+    scheduler = CommandScheduler("test", max_depth=2)
+    gate = threading.Event()
+    try:
+        scheduler.submit(PRIORITIES["normal"], gate.wait)
+        time.sleep(0.05)  # 等待第一个任务开始执行
+        scheduler.submit(PRIORITIES["normal"], lambda: "normal1")
+        normal2 = scheduler.submit(PRIORITIES["normal"], lambda: "normal2")
+
+        with pytest.raises(QueueFullError):
+            scheduler.submit(PRIORITIES["normal"], lambda: "rejected")
+        assert scheduler.stats.rejected == 1
+
+        # 更紧急的任务挤掉最后提交的普通任务
+        high = scheduler.submit(PRIORITIES["high"], lambda: "high")
+        with pytest.raises(QueueFullError):
+            normal2.result(timeout=1)
+        assert scheduler.stats.shed == 1
+
+        gate.set()
+        assert high.result(timeout=1) == "high"
+    finally:
+        gate.set()
+        scheduler.close()
+
+
+@pytest.fixture
+def busy_device(monkeypatch):
+    config = Config(port="LOOP_BACK", max_queue_depth=1)
+    config.commands["get_pico_info"] = Command(command="PICO_INFO", need_parse=True, prompts=[], priority="low")
+    monkeypatch.setattr(server, "config", config)
+    pool = DevicePool()
+    monkeypatch.setattr(server, "device_pool", pool)
+
+    original = SerialConnection.send_command
+
+    def slow_send_command(self, command, arguments):
+        time.sleep(0.1)
+        return original(self, command, arguments)
+
+    monkeypatch.setattr(SerialConnection, "send_command", slow_send_command)
+    yield config
+    pool.close()
+
+
+def test_busy_device_reports_error_and_status(busy_device):
+    async def call(delay):
+        await asyncio.sleep(delay)
+        return await server.handle_call_tool("get_pico_info", {})
+
+    async def run():
+        # 第一个调用开始执行后，第二个排队，第三个因队列已满被拒绝
+        return await asyncio.gather(call(0), call(0.03), call(0.06))
+
+    results = asyncio.run(run())
+    texts = [result[0].text for result in results]
+    assert texts[0] == "OK" and texts[1] == "OK"
+    assert "Device busy" in texts[2]
+
+    status = json.loads(asyncio.run(server.handle_read_resource(server.STATUS_URI)))
+    queue = status["default"]["queue"]
+    assert queue["executed"] == 2
+    assert queue["rejected"] == 1
+    assert queue["max_wait_ms"] > 0
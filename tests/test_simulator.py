@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import pytest
+
+from mcp2serial import server
+from mcp2serial.server import SerialConnection, DeviceConfig, Config, Command, DevicePool, is_error_result
+
+pytest.importorskip("termios", reason="needs a pseudo-terminal")
+from mcp2serial.simulator import DeviceSimulator
+
+PWM = Command(command="PWM {frequency}", need_parse=False, prompts=[])
+INFO = Command(command="PICO_INFO", need_parse=True, prompts=[])
+LED = Command(command="LED {state}", need_parse=False, prompts=[])
+
+
+@pytest.fixture
+def simulator():
+    with DeviceSimulator() as simulator:
+        yield simulator
+
+
+def connect(port, **settings):
+    settings.setdefault("read_timeout", 0.5)
+    return SerialConnection(DeviceConfig(name="sim", port=port, **settings))
+
+
+def test_firmware_commands(simulator):
+    connection = connect(simulator.port)
+    try:
+        assert connection.send_command(PWM, {"frequency": "75"}) == []
+        assert simulator.duty == 75
+        assert connection.send_command(LED, {"state": "on"}) == [] and simulator.led
+        assert "Board: Simulated Pico" in connection.send_command(INFO, {})[0].text
+        assert is_error_result(connection.send_command(PWM, {"frequency": "150"}))
+    finally:
+        connection.close()
+
+
+def test_latency_and_unsolicited_output():
+    with DeviceSimulator(command_latency={"PICO_INFO": 0.1}, unsolicited_interval=0.01, echo=True) as simulator:
+        connection = connect(simulator.port)
+        try:
+            start = time.monotonic()
+            result = connection.send_command(INFO, {})
+            assert time.monotonic() - start >= 0.1
+            assert result[0].text.startswith("OK Board")
+            start = time.monotonic()
+            assert connection.send_command(PWM, {"frequency": "10"}) == []
+            assert time.monotonic() - start < 0.1
+        finally:
+            connection.close()
+
+
+def test_throughput_cap_and_partial_writes():
+    with DeviceSimulator(baud_rate=9600, write_chunk=8) as simulator:
+        connection = connect(simulator.port)
+        try:
+            start = time.monotonic()
+            text = connection.send_command(INFO, {})[0].text
+            # 约 150 字节，9600 波特时每字节约 1 ms
+            assert time.monotonic() - start >= len(text) * 10 / 9600
+        finally:
+            connection.close()
+
+
+def test_injected_faults():
+    with DeviceSimulator(ng_rate=1.0) as simulator:
+        connection = connect(simulator.port)
+        try:
+            assert "NG" in connection.send_command(PWM, {"frequency": "10"})[0].text
+        finally:
+            connection.close()
+    with DeviceSimulator(drop_rate=1.0) as simulator:
+        connection = connect(simulator.port, read_timeout=0.1)
+        try:
+            assert "timeout" in connection.send_command(PWM, {"frequency": "10"})[0].text
+        finally:
+            connection.close()
+
+
+def test_pipelined_and_binary_protocols(simulator):
+    connection = connect(simulator.port, pipeline_depth=4)
+    try:
+        async def run():
+            return await asyncio.gather(*[
+                connection.send_command_async(PWM, {"frequency": str(i)}) for i in range(8)
+            ])
+
+        results = asyncio.run(run())
+        assert results == [[]] * 8
+    finally:
+        connection.close()
+
+    with DeviceSimulator(corrupt_rate=0.5, seed=3) as simulator:
+        connection = connect(simulator.port, protocol="binary", max_retries=10)
+        try:
+            for duty in range(5):
+                assert connection.send_command(PWM, {"frequency": str(duty)}) == []
+            assert simulator.binary_mode and simulator.duty == 4
+        finally:
+            connection.close()
+
+
+def test_several_devices_through_the_server(monkeypatch):
+    simulators = [DeviceSimulator(name=f"Pico {i}", latency=0.05) for i in range(3)]
+    for simulator in simulators:
+        simulator.start()
+    try:
+        config = Config(devices={
+            f"pico{i}": DeviceConfig(name=f"pico{i}", port=simulator.port, commands={"get_info": INFO})
+            for i, simulator in enumerate(simulators)
+        })
+        monkeypatch.setattr(server, "config", config)
+        pool = DevicePool()
+        monkeypatch.setattr(server, "device_pool", pool)
+
+        async def run():
+            return await asyncio.gather(*[server.handle_call_tool(f"pico{i}_get_info", {}) for i in range(3)])
+
+        start = time.monotonic()
+        results = asyncio.run(run())
+        # 三个设备并行应答
+        assert time.monotonic() - start < 0.15
+        assert [result[0].text.split(",")[0] for result in results] == [f"OK Board: Pico {i}" for i in range(3)]
+        pool.close()
+    finally:
+        for simulator in simulators:
+            simulator.stop()
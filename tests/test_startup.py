@@ -0,0 +1,16 @@
+import subprocess
+import sys
+
+CHECK_IMPORT = """
+import sys
+import mcp2serial.server as server
+assert server.config.commands == {} and server.config.devices == {}, "config loaded at import"
+assert "yaml" not in sys.modules, "yaml imported at import"
+assert "serial.tools.list_ports" not in sys.modules, "list_ports imported at import"
+"""
+
+
+def test_import_has_no_side_effects(tmp_path):
+    (tmp_path / "config.yaml").write_text("serial:\n  port: LOOP_BACK\ncommands:\n  ping:\n    command: PING\n")
+    subprocess.run([sys.executable, "-c", CHECK_IMPORT], cwd=tmp_path, check=True)
+
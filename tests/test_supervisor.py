@@ -0,0 +1,122 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from mcp2serial.server import SerialConnection, DeviceConfig, Command
+from mcp2serial.supervisor import Backoff, ConnectionSupervisor
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def test_backoff_grows_to_maximum():
+    backoff = Backoff(0.5, 3.0)
+    assert [backoff.next() for _ in range(5)] == [0.5, 1.0, 2.0, 3.0, 3.0]
+    backoff.reset()
+    assert backoff.next() == 0.5
+
+
+def test_supervisor_reconnects_with_backoff():
+    attempts = []
+
+    def reconnect():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise OSError("no such device")
+
+    supervisor = ConnectionSupervisor("pico", reconnect, lambda: True, Backoff(0.02, 0.1), check_interval=1.0)
+    try:
+        supervisor.mark_down("read failed")
+        assert supervisor.is_down
+        wait_for(lambda: not supervisor.is_down)
+    finally:
+        supervisor.close()
+    assert len(attempts) == 3
+    assert attempts[2] - attempts[1] >= attempts[1] - attempts[0]
+    assert supervisor.as_dict()["reconnects"] == 1
+    assert supervisor.as_dict()["failures"] == 1
+
+
+def test_failed_health_check_marks_down():
+    healthy = threading.Event()
+    healthy.set()
+
+    def reconnect():
+        raise OSError("still unplugged")
+
+    supervisor = ConnectionSupervisor("pico", reconnect, healthy.is_set, Backoff(1.0, 1.0), check_interval=0.02)
+    try:
+        supervisor.start()
+        healthy.clear()
+        wait_for(lambda: supervisor.is_down)
+    finally:
+        supervisor.close()
+    assert supervisor.as_dict()["failures"] == 1
+
+
+class PlugDevice:
+    """Answers OK to every line on a pty reachable through a stable symlink"""
+
+    def __init__(self, link):
+        self.link = link
+        self.master = None
+
+    def plug(self):
+        self.master, self._slave = os.openpty()
+        if os.path.lexists(self.link):
+            os.remove(self.link)
+        os.symlink(os.ttyname(self._slave), self.link)
+        self._running = True
+        threading.Thread(target=self._run, args=(self.master,), daemon=True).start()
+
+    def unplug(self):
+        self._running = False
+        os.remove(self.link)
+        os.close(self.master)
+        os.close(self._slave)
+
+    def _run(self, master):
+        buffer = b""
+        while self._running:
+            try:
+                buffer += os.read(master, 1024)
+            except OSError:
+                return
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                os.write(master, b"OK " + line.strip() + b"\r\n")
+
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pseudo-terminal")
+def test_unplug_fails_fast_and_reconnects(tmp_path):
+    device = PlugDevice(str(tmp_path / "ttyPICO"))
+    device.plug()
+    connection = SerialConnection(DeviceConfig(
+        name="pico", port=device.link, read_timeout=1.0, reconnect_delay=0.02,
+        reconnect_max_delay=0.05, health_check="PING", health_check_interval=0.02
+    ))
+    command = Command(command="PICO_INFO", need_parse=True, prompts=[])
+    try:
+        assert asyncio.run(connection.send_command_async(command, {}))[0].text == "OK PICO_INFO"
+
+        device.unplug()
+        wait_for(lambda: connection.supervisor.is_down)
+        start = time.monotonic()
+        result = asyncio.run(connection.send_command_async(command, {}))
+        assert time.monotonic() - start < 0.1
+        assert "unavailable" in result[0].text
+
+        device.plug()
+        wait_for(lambda: not connection.supervisor.is_down)
+        assert asyncio.run(connection.send_command_async(command, {}))[0].text == "OK PICO_INFO"
+        assert connection.supervisor.as_dict()["reconnects"] == 1
+    finally:
+        connection.close()
+        device._running = False
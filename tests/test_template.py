@@ -0,0 +1,40 @@
+import pytest
+
+from mcp2serial.template import CommandTemplate
+from mcp2serial.server import SerialConnection, DeviceConfig, Command
+
+
+@pytest.mark.parametrize("template, arguments", [
+    ("PWM {frequency}", {"frequency": "50"}),
+    ("PICO_INFO", {}),
+    ("PWM {frequency}\n", {"frequency": "50"}),
+    ("LED {state}", {"state": "on  "}),
+    ("PWM {x} ", {"x": "5  "}),
+    ("{a}{b}  ", {"a": "1 ", "b": " "}),
+    ("SET {a} {b} {a}", {"a": "1", "b": "2"}),
+    ("RAW {{literal}} {value:>4}", {"value": "7"}),
+])
+def test_render_matches_str_format(template, arguments):
+    expected = (template.format(**arguments).rstrip() + "\r\n").encode()
+    assert CommandTemplate(template).render(arguments) == expected
+
+
+def test_params_prefix_line_ending_and_encoding():
+    template = CommandTemplate("显示 {text}", line_ending="\n", encoding="gbk")
+    assert template.params == ("text",)
+    assert template.render({"text": "你好"}, prefix=b"#3 ") == "#3 显示 你好\n".encode("gbk")
+
+
+def test_missing_argument_raises():
+    with pytest.raises(KeyError):
+        CommandTemplate("PWM {frequency}").render({})
+
+
+def test_device_line_ending_used_on_the_wire():
+    device = DeviceConfig(port="LOOP_BACK", line_ending="\r", commands={
+        "set_pwm": Command(command="PWM {frequency}", need_parse=False, prompts=[]),
+        "get_info": Command(command="INFO", need_parse=False, prompts=[], line_ending="\n"),
+    })
+    connection = SerialConnection(device)
+    assert connection._prepare_command(device.commands["set_pwm"], {"frequency": "5"}) == b"PWM 5\r"
+    assert connection._prepare_command(device.commands["get_info"], {}) == b"INFO\n"
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from mcp2serial import server
+from mcp2serial.server import Config, DeviceConfig, Command, DevicePool
+from mcp2serial.tracing import Trace, Tracer, NULL_TRACE, TIMING_PREFIX
+
+INFO = Command(command="PICO_INFO", need_parse=True, prompts=[])
+
+
+@pytest.fixture
+def traced(monkeypatch, tmp_path):
+    pool = DevicePool()
+    tracer = Tracer()
+    monkeypatch.setattr(server, "device_pool", pool)
+    monkeypatch.setattr(server, "tracer", tracer)
+    yield tracer
+    pool.close()
+    tracer.close()
+
+
+def timing(result):
+    return [content.text for content in result if content.text.startswith(TIMING_PREFIX)]
+
+
+def test_trace_breakdown_and_events():
+    trace = Trace("PICO_INFO", "pico")
+    trace.add("write", trace.start + 1000, trace.start + 3000)
+    trace.add("read", trace.start + 3000, trace.start + 8000)
+    trace.add("write", trace.start + 8000, trace.start + 9000)
+    trace.end = trace.start + 10000
+    breakdown = trace.breakdown()
+    assert breakdown["write"] == pytest.approx(0.003)
+    assert breakdown["read"] == pytest.approx(0.005)
+    assert breakdown["total"] == pytest.approx(0.01)
+
+    events = trace.events(pid=1)
+    assert [(event["name"], event["ph"]) for event in events] == [
+        ("PICO_INFO", "X"), ("write", "X"), ("read", "X"), ("write", "X")
+    ]
+    assert events[2]["ts"] - events[0]["ts"] == pytest.approx(3.0)
+    assert events[2]["dur"] == pytest.approx(5.0)
+
+
+def test_disabled_tracing_adds_nothing(traced, monkeypatch):
+    monkeypatch.setattr(server, "config", Config(port="LOOP_BACK", commands={"get_pico_info": INFO}))
+    assert traced.start("PICO_INFO", "default") is NULL_TRACE
+    result = asyncio.run(server.handle_call_tool("get_pico_info", {}))
+    assert timing(result) == []
+    assert server.device_pool.connections["default"].phases == {}
+
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pseudo-terminal")
+def test_phases_of_a_serial_transaction(traced, tmp_path, monkeypatch):
+    path = tmp_path / "trace.json"
+    from mcp2serial.simulator import DeviceSimulator
+
+    traced.configure(True, str(path), include_in_result=True)
+    with DeviceSimulator(latency=0.02) as simulator:
+        device = DeviceConfig(name="pico", port=simulator.port, commands={"info": INFO})
+        monkeypatch.setattr(server, "config", Config(devices={"pico": device}))
+        result = asyncio.run(server.handle_call_tool("pico_info", {}))
+    traced.close()
+
+    assert result[0].text.startswith("OK")
+    [line] = timing(result)
+    phases = dict(item.split("=") for item in line[len(TIMING_PREFIX):].split())
+    assert list(phases) == ["queue", "connect", "format", "reset_buffers", "write", "flush", "read", "decode", "total"]
+    assert float(phases["read"][:-2]) >= 20
+
+    events = json.loads(path.read_text())
+    assert events[0] == {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": events[0]["tid"],
+                         "args": {"name": "pico"}}
+    transaction = events[1]
+    assert (transaction["name"], transaction["cat"]) == ("PICO_INFO", "transaction")
+    for event in events[2:]:
+        assert event["tid"] == transaction["tid"]
+        assert transaction["ts"] <= event["ts"]
+        assert event["ts"] + event["dur"] <= transaction["ts"] + transaction["dur"] + 0.001
+
+    snapshot = server.metrics_snapshot()
+    assert snapshot["devices"]["pico"]["phases"]["read"]["count"] == 1
+    assert 'mcp2serial_phase_seconds_count{device="pico",phase="read"} 1' in server.prometheus_metrics()
+
+
+def test_cached_results_do_not_repeat_timings(traced, monkeypatch):
+    traced.configure(True, include_in_result=True)
+    command = Command(command="PICO_INFO", need_parse=True, prompts=[], cache_ttl=60)
+    monkeypatch.setattr(server, "config", Config(port="LOOP_BACK", commands={"get_pico_info": command}))
+    first = asyncio.run(server.handle_call_tool("get_pico_info", {}))
+    second = asyncio.run(server.handle_call_tool("get_pico_info", {}))
+    assert len(timing(first)) == 1
+    assert timing(second) == []
+    assert second == first[:1]
+
+
+def test_pipelined_commands_are_traced(traced, monkeypatch):
+    traced.configure(True, include_in_result=True)
+    monkeypatch.setattr(server, "config", Config(port="LOOP_BACK", pipeline_depth=4, commands={"get_pico_info": INFO}))
+    result = asyncio.run(server.handle_call_tool("get_pico_info", {}))
+    [line] = timing(result)
+    assert "queue=" in line and "reply=" in line and "decode=" in line
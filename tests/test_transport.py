@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import pytest
+
+from mcp2serial import server
+from mcp2serial.server import SerialConnection, Config, Command
+
+
+@pytest.fixture
+def loopback_config(monkeypatch):
+    """Use LOOP_BACK mode so no real serial device is needed"""
+    config = Config(port="LOOP_BACK", response_start_string="OK")
+    config.commands["set_pwm"] = Command(command="PWM {frequency}", need_parse=False, prompts=[])
+    config.commands["get_pico_info"] = Command(command="PICO_INFO", need_parse=True, prompts=[])
+    monkeypatch.setattr(server, "config", config)
+    return config
+
+
+class SlowConnection(SerialConnection):
+    """Simulates a device that takes a while to answer"""
+
+    def send_command(self, command, arguments):
+        time.sleep(0.2)
+        return super().send_command(command, arguments)
+
+
+def test_send_command_async_loopback(loopback_config):
+    connection = SerialConnection()
+    try:
+        result = asyncio.run(connection.send_command_async(loopback_config.commands["set_pwm"], {"frequency": "50"}))
+        assert result == []
+    finally:
+        connection.close()
+
+
+def test_event_loop_not_blocked(loopback_config):
+    """The event loop keeps running while a transaction is in flight"""
+    connection = SlowConnection()
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await connection.send_command_async(loopback_config.commands["get_pico_info"], {})
+        task.cancel()
+        return ticks
+
+    try:
+        assert asyncio.run(run()) >= 5
+    finally:
+        connection.close()